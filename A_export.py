@@ -0,0 +1,34 @@
+#--------------------------------------------------------------------------------------------------
+# EXPORT OF BINARY OUTPUT: writes the text output files (.dat) of the binary output stores of an output
+# folder written with the card 'store binary'.
+#
+# usage: python3 A_export.py [folder] [-f file ...]
+#
+# The folder is the latest one of ./output by default; -f limits the export to the listed files, e.g.
+# python3 A_export.py -f signal.dat fluid-temp-PIPE1.dat
+#--------------------------------------------------------------------------------------------------
+from B0B_store import export_folder
+
+import argparse
+import os
+import sys
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Export text output files of binary output stores of ROOSTER.')
+    parser.add_argument('folder', nargs = '?', help = 'output folder (the latest one of ./output by default)')
+    parser.add_argument('-f', nargs = '*', help = 'files to export (all files by default)')
+    args = parser.parse_args()
+
+    path = args.folder
+    if path is None:
+        if not os.path.isdir('output') or len(os.listdir('output')) == 0:
+            print('****ERROR: there is no output folder to export.')
+            sys.exit()
+        path = 'output' + os.sep + sorted(os.listdir('output'))[-1]
+    for file in export_folder(path, args.f):
+        print(file)
+
+if __name__ == '__main__':
+    main()
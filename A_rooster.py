@@ -2,3 +2,4 @@ from B_reactor import Reactor
 
 # create and solve
 r = Reactor()
+r.run()
@@ -0,0 +1,233 @@
+#--------------------------------------------------------------------------------------------------
+# PARAMETER SWEEP: runs copies of a base input deck with card overrides in a pool of processes, every
+# case in its own folder, and collects a summary of requested signals per case.
+#
+# usage: python3 A_sweep.py deck table [-n nproc] [-o folder] [-s signal ...] [-e common|member]
+#
+# The table is a text file: the first line lists the case-name column followed by override specifiers,
+# the next lines list the case name followed by the override values. Lines starting with # are comments.
+# An override specifier key/n replaces word n (the keyword is word 0) of the card key, while key/id/n
+# replaces word n of the card key whose word 1 is id, e.g.:
+#
+# case      mat/NA/4  power0/1  signal/FLOW/2
+# hot       773       1e9       100.0
+# cold      673       1e9       100.0
+#
+# With -e the cases overriding only values (not the model structure) run as an ensemble in one process:
+# with a common step size (common) or with step size control per case (member).
+#--------------------------------------------------------------------------------------------------
+import argparse
+import multiprocessing
+import numpy
+import os
+import re
+import sys
+import time
+
+#--------------------------------------------------------------------------------------------------
+# read the table of overrides: returns the list of override specifiers and the list of cases (name, values)
+def read_table(path):
+
+    f = open(path, 'r')
+    lines = [x.split('#')[0].split() for x in f.read().split('\n') if not x.startswith('#')]
+    f.close()
+    lines = [x for x in lines if len(x) > 0]
+    if len(lines) < 2:
+        print('****ERROR: sweep table ' + path + ' should have a header line and at least one case line.')
+        sys.exit()
+
+    spec = []
+    for x in lines[0][1:]:
+        word = x.split('/')
+        if len(word) not in [2, 3] or not word[-1].isdigit() or int(word[-1]) == 0:
+            print('****ERROR: override specifier ' + x + ' in sweep table should be key/n or key/id/n with word index n > 0.')
+            sys.exit()
+        spec.append({'key':word[0].lower(), 'id':word[1] if len(word) == 3 else None, 'n':int(word[-1])})
+
+    cases = []
+    for x in lines[1:]:
+        if len(x) != len(spec) + 1:
+            print('****ERROR: case ' + x[0] + ' in sweep table should have ' + str(len(spec)) + ' values.')
+            sys.exit()
+        if x[0] in [c[0] for c in cases]:
+            print('****ERROR: case ' + x[0] + ' in sweep table is not unique.')
+            sys.exit()
+        cases.append((x[0], x[1:]))
+    return spec, cases
+
+#--------------------------------------------------------------------------------------------------
+# apply overrides to the text of the base deck: returns the text of the case deck
+def override_deck(deck, spec, values):
+
+    lines = deck.split('\n')
+    for s, value in zip(spec, values):
+        found = False
+        for i in range(len(lines)):
+            # words of the line without comment
+            line = lines[i].split('#')[0]
+            words = list(re.finditer(r'\S+', line))
+            if len(words) == 0 or words[0].group().lower() != s['key']:
+                continue
+            if s['id'] is not None and (len(words) < 2 or words[1].group() != s['id']):
+                continue
+            if s['n'] >= len(words):
+                print('****ERROR: card ' + s['key'] + ' has no word ' + str(s['n']) + ' to override.')
+                sys.exit()
+            # replace the word keeping the columns of the rest of the line
+            word = words[s['n']]
+            lines[i] = lines[i][:word.start()] + value + lines[i][word.end():]
+            found = True
+        if not found:
+            print('****ERROR: card ' + s['key'] + ('' if s['id'] is None else ' ' + s['id']) + ' to override is not in the base deck.')
+            sys.exit()
+    return '\n'.join(lines)
+
+#--------------------------------------------------------------------------------------------------
+# run one case in its folder: called in a worker process, returns (name, status, wall time)
+def run_case(args):
+
+    name, path = args
+    tic = time.time()
+    os.chdir(path)
+    # the solver prints its progress: redirect to the case log
+    sys.stdout = open('log.txt', 'w')
+    try:
+        from B_reactor import Reactor
+        Reactor().run()
+        status = 'ok'
+    # input errors end with sys.exit()
+    except SystemExit:
+        status = 'failed'
+    except Exception as e:
+        print('****ERROR: ' + repr(e))
+        status = 'failed'
+    sys.stdout.close()
+    return name, status, time.time() - tic
+
+#--------------------------------------------------------------------------------------------------
+# run all cases as an ensemble in this process, step is common or member, log is the path of the log file: returns
+# dictionaries of (status, wall time) and of signal histories per case
+def run_ensemble(jobs, step, log):
+
+    tic = time.time()
+    decks = []
+    for name, path in jobs:
+        f = open(path + os.sep + 'input', 'r')
+        decks.append(f.read())
+        f.close()
+    # signals of all cases at output times
+    history = []
+    stdout = sys.stdout
+    sys.stdout = open(log, 'w')
+    try:
+        from B_ensemble import Ensemble
+        ensemble = Ensemble(decks, step, sinks = [lambda ensemble, t: history.append(ensemble.get_signals())])
+        ensemble.run()
+        status = 'ok' if ensemble.successful() else 'failed'
+    # input errors end with sys.exit()
+    except SystemExit:
+        status = 'failed'
+    except Exception as e:
+        print('****ERROR: ' + repr(e))
+        status = 'failed'
+    sys.stdout.close()
+    sys.stdout = stdout
+
+    result = {name:(status, time.time() - tic) for name, path in jobs}
+    signal = {}
+    if status == 'ok':
+        ids = ensemble.member[0].control.input['signalid']
+        history = numpy.array(history)
+        for k, (name, path) in enumerate(jobs):
+            signal[name] = {id:history[:,k,j] for j, id in enumerate(ids)}
+    return result, signal
+
+#--------------------------------------------------------------------------------------------------
+# read signal history of the case: returns dictionary of signal arrays
+def read_signals(path):
+
+    path += os.sep + 'output'
+    if not os.path.isdir(path) or len(os.listdir(path)) == 0:
+        return {}
+    path += os.sep + sorted(os.listdir(path))[-1] + os.sep + 'signal'
+    if os.path.isfile(path + '.bin'):
+        # binary output store
+        from B0B_store import read
+        index, data = read(path)
+        ids = index['files'][0]['columns']
+    elif os.path.isfile(path + '.dat'):
+        path += '.dat'
+        f = open(path, 'r')
+        ids = f.readline().split()[1:]
+        f.close()
+        data = numpy.loadtxt(path, skiprows = 1, ndmin = 2)
+    else:
+        return {}
+    if data.shape[0] == 0:
+        return {}
+    return {id:data[:,j+1] for j, id in enumerate(ids)}
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Run a parameter sweep over copies of a ROOSTER input deck.')
+    parser.add_argument('deck', help = 'base input deck')
+    parser.add_argument('table', help = 'table of card overrides (one case per line)')
+    parser.add_argument('-n', type = int, default = os.cpu_count(), help = 'number of processes')
+    parser.add_argument('-o', default = 'sweep', help = 'folder for case folders and summary')
+    parser.add_argument('-s', nargs = '*', default = [], help = 'signals to summarize (final, minimum and maximum values)')
+    parser.add_argument('-e', choices = ['common', 'member'], help = 'run cases as an ensemble in one process with a common step size or step size control per case')
+    args = parser.parse_args()
+
+    f = open(args.deck, 'r')
+    deck = f.read()
+    f.close()
+    spec, cases = read_table(args.table)
+
+    # prepare a folder with the input deck for every case
+    if not os.path.isdir(args.o): os.mkdir(args.o)
+    jobs = []
+    for name, values in cases:
+        path = os.path.abspath(args.o + os.sep + name)
+        if not os.path.isdir(path): os.mkdir(path)
+        f = open(path + os.sep + 'input', 'w')
+        f.write(override_deck(deck, spec, values))
+        f.close()
+        jobs.append((name, path))
+
+    if args.e is None:
+        # run cases in a pool of processes: one case per process to start every case from fresh modules
+        result = {}
+        pool = multiprocessing.Pool(processes = args.n, maxtasksperchild = 1)
+        for name, status, wall in pool.imap_unordered(run_case, jobs):
+            result[name] = (status, wall)
+            print(name.ljust(13) + status.ljust(8) + '{0:.3f}'.format(wall) + ' s')
+        pool.close()
+        pool.join()
+    else:
+        # run cases as an ensemble: the wall time is the one of the whole ensemble
+        result, history = run_ensemble(jobs, args.e, args.o + os.sep + 'log.txt')
+        for name, values in cases:
+            print(name.ljust(13) + result[name][0].ljust(8) + '{0:.3f}'.format(result[name][1]) + ' s')
+
+    # summary of requested signals per case
+    f = open(args.o + os.sep + 'summary.dat', 'w')
+    f.write(' ' + 'case'.ljust(13) + 'status'.ljust(13) + 'wall(s)'.ljust(13) + ''.join([(s + '-' + x).ljust(13) for s in args.s for x in ['end', 'min', 'max']]) + '\n')
+    for name, values in cases:
+        if args.e is not None:
+            signal = history.get(name, {})
+        else:
+            # a failed case may have left output of an earlier sweep in its folder
+            signal = read_signals(args.o + os.sep + name) if result[name][0] == 'ok' else {}
+        line = ' ' + name.ljust(13) + result[name][0].ljust(13) + '{0:12.5e} '.format(result[name][1])
+        for s in args.s:
+            if s in signal:
+                line += '{0:12.5e} {1:12.5e} {2:12.5e} '.format(signal[s][-1], signal[s].min(), signal[s].max())
+            else:
+                line += ''.join(['nan'.ljust(13)]*3)
+        f.write(line + '\n')
+    f.close()
+    print('summary: ' + args.o + os.sep + 'summary.dat')
+
+if __name__ == '__main__':
+    main()
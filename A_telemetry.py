@@ -0,0 +1,62 @@
+#--------------------------------------------------------------------------------------------------
+# TELEMETRY CLIENT: subscribes to telemetry endpoints of running transients (card 'telemetry') and prints
+# their signals and integrator statistics at every output time. Transients whose signal leaves a range
+# can be stopped.
+#
+# usage: python3 A_telemetry.py address ... [-s signal ...] [-x signal min max] [--stop]
+#
+# An address is unix:PATH or tcp:PORT (localhost), e.g.
+# python3 A_telemetry.py tcp:5555 unix:/tmp/run2.sock -s TF -x TF 0 900
+# prints TF of both transients and stops the one whose TF goes outside [0, 900]; with --stop the transients
+# are asked to stop at once.
+#--------------------------------------------------------------------------------------------------
+from B6_telemetry import subscribe, stop
+
+import argparse
+import asyncio
+import math
+
+#--------------------------------------------------------------------------------------------------
+# print messages of the transient publishing to address, stopping it if signal limit[0] leaves [limit[1], limit[2]]
+async def watch(address, signals, limit):
+
+    ids = []
+    async for message in subscribe(address):
+        if message['type'] == 'hello':
+            ids = message['signal']
+            print(address + ': pid ' + str(message['pid']) + ' in ' + message['cwd'])
+        elif message['type'] == 'step':
+            value = dict(zip(ids, message['signal']))
+            line = address + ': t ' + '{0:12.5e}'.format(message['t']) + ' wall ' + '{0:.3f}'.format(message['wall'])
+            line += ''.join([' ' + id + ' ' + '{0:12.5e}'.format(value[id]) for id in (signals or ids) if id in value])
+            line += ''.join([' ' + key + ' ' + str(x) for key, x in message['solver'].items()])
+            print(line)
+            if limit is not None and limit[0] in value:
+                x = value[limit[0]]
+                if math.isnan(x) or x < float(limit[1]) or x > float(limit[2]):
+                    print(address + ': signal ' + limit[0] + ' = ' + str(x) + ' outside [' + limit[1] + ', ' + limit[2] + ']: stop')
+                    await stop(address)
+        elif message['type'] == 'end':
+            print(address + ': end at t ' + '{0:12.5e}'.format(message['t']))
+
+#--------------------------------------------------------------------------------------------------
+async def run(args):
+
+    if args.stop:
+        await asyncio.gather(*[stop(address) for address in args.address])
+    else:
+        await asyncio.gather(*[watch(address, args.s, args.x) for address in args.address])
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Watch running ROOSTER transients through their telemetry endpoints.')
+    parser.add_argument('address', nargs = '+', help = 'endpoints unix:PATH or tcp:PORT')
+    parser.add_argument('-s', nargs = '*', default = [], help = 'signals to print (all published signals by default)')
+    parser.add_argument('-x', nargs = 3, metavar = ('signal', 'min', 'max'), help = 'stop transients whose signal leaves the range')
+    parser.add_argument('--stop', action = 'store_true', help = 'stop the transients')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
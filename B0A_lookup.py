@@ -0,0 +1,83 @@
+import bisect
+import sys
+
+#--------------------------------------------------------------------------------------------------
+class Lookup:
+
+    # constructor: self is a 'lookup' object created in B0, table is the dictionary of a lookup card: 'x' (and 'y' for 2-D,
+    # 'y' and 'z' for 3-D tables) are lists of the input signal id followed by grid values, 'f(x)' is the list of the output
+    # signal id followed by the values of the function (for 2-D and 3-D tables in the order of grid points with the last input
+    # varying fastest). Inputs are clamped to the grid ranges, the function is interpolated linearly in every input
+    def __init__(self, table):
+
+        keys = [key for key in ['x', 'y', 'z'] if key in table]
+        self.input = [table[key][0] for key in keys]
+        self.output = table['f(x)'][0]
+        grid = [[float(v) for v in table[key][1:]] for key in keys]
+        values = [float(v) for v in table['f(x)'][1:]]
+        for g in grid:
+            if len(g) < 2:
+                print('****ERROR: lookup table ' + self.output + ' should have at least two grid values of every input signal.')
+                sys.exit()
+
+        if len(grid) == 1:
+            if len(grid[0]) != len(values):
+                print('****ERROR: lookup table ' + self.output + ' should have as many values of the input signal as of the output signal.')
+                sys.exit()
+            # pairs sorted by the input as by the scipy interp1d function
+            pairs = sorted(zip(grid[0], values), key = lambda pair: pair[0])
+            self.x = [pair[0] for pair in pairs]
+            self.y = [pair[1] for pair in pairs]
+            self.evaluate = self.evaluate_1d
+        else:
+            for k, g in enumerate(grid):
+                if any([g[i] >= g[i+1] for i in range(len(g)-1)]):
+                    print('****ERROR: grid values of input signal ' + self.input[k] + ' of lookup table ' + self.output + ' should be increasing.')
+                    sys.exit()
+            size = 1
+            for g in grid:
+                size *= len(g)
+            if size != len(values):
+                print('****ERROR: lookup table ' + self.output + ' should have ' + str(size) + ' values of the output signal (one per grid point).')
+                sys.exit()
+            self.grid = grid
+            self.values = values
+            # corners of a grid cell (0: lower, 1: upper grid value of every input)
+            self.corners = [[(c >> (len(grid) - 1 - k)) & 1 for k in range(len(grid))] for c in range(2**len(grid))]
+            self.evaluate = self.evaluate_nd
+
+    #----------------------------------------------------------------------------------------------
+    # interpolate the 1-D table for the value of the input in dictionary signal: self is a 'lookup' object created in B0
+    def evaluate_1d(self, signal):
+
+        x, y = self.x, self.y
+        xnew = max(min(signal[self.input[0]], x[-1]), x[0])
+        # interval found by binary search, the first one for the lowest input
+        i = min(max(bisect.bisect_left(x, xnew), 1), len(x) - 1)
+        if x[i] == x[i-1]:
+            return y[i]
+        return (y[i] - y[i-1])/(x[i] - x[i-1])*(xnew - x[i-1]) + y[i-1]
+
+    #----------------------------------------------------------------------------------------------
+    # interpolate the 2-D or 3-D table multilinearly for the values of inputs in dictionary signal: self is a 'lookup' object
+    # created in B0
+    def evaluate_nd(self, signal):
+
+        # index of the lower grid value and fraction of the grid interval for every input
+        index, fraction = [], []
+        for k, g in enumerate(self.grid):
+            xnew = max(min(signal[self.input[k]], g[-1]), g[0])
+            i = min(max(bisect.bisect_left(g, xnew), 1), len(g) - 1)
+            index.append(i - 1)
+            fraction.append((xnew - g[i-1])/(g[i] - g[i-1]))
+
+        # weighted sum over corners of the grid cell
+        result = 0.0
+        for corner in self.corners:
+            weight = 1.0
+            flat = 0
+            for k, g in enumerate(self.grid):
+                weight *= fraction[k] if corner[k] else 1.0 - fraction[k]
+                flat = flat*len(g) + index[k] + corner[k]
+            result += weight*self.values[flat]
+        return result
@@ -0,0 +1,152 @@
+import json
+import numpy
+import os
+import sys
+import zlib
+
+#--------------------------------------------------------------------------------------------------
+# BINARY OUTPUT STORE: the output of a group (signal, fluid, fuelrod, htstr or core) is one append-only
+# file <group>.bin of chunks of rows (time followed by the values of all output files of the group, float64)
+# described by a small JSON index <group>.json listing the files of the group, their headers and columns.
+# A chunk is the number of its rows and the number of its bytes (two int64) followed by the bytes of
+# the rows, compressed by zlib if requested. The text files of the group are exported on demand.
+#--------------------------------------------------------------------------------------------------
+class Store:
+
+    # bytes of the rows of a chunk before it is written
+    chunkbytes = 1 << 20
+
+    # constructor: self is a 'store' object created in B0, path is the path of the store without extension, files is the list
+    # of dictionaries of output files of the group ('file': file name, 'header': header line, 'columns': list of column names),
+    # compress switches zlib compression of chunks and offset is None for a new store or, on restart, the size of the binary file
+    # at the checkpoint
+    def __init__(self, path, files, compress, offset = None):
+
+        index = {'dtype':'<f8', 'compress':compress, 'files':[]}
+        ncol = 1
+        for x in files:
+            index['files'].append({'file':x['file'], 'header':x['header'], 'columns':x['columns'], 'start':ncol, 'stop':ncol + len(x['columns'])})
+            ncol += len(x['columns'])
+        index['ncol'] = ncol
+        f = open(path + '.json', 'w')
+        f.write(json.dumps(index, indent=2))
+        f.close()
+
+        self.name = path + '.bin'
+        if offset is None:
+            self.fid = open(self.name, 'wb')
+        else:
+            os.truncate(self.name, offset)
+            self.fid = open(self.name, 'r+b')
+            self.fid.seek(0, os.SEEK_END)
+        self.compress = compress
+        # preallocated buffer of rows of the chunk being collected
+        self.buffer = numpy.empty((max(1, self.chunkbytes // (8*ncol)), ncol))
+        self.nrows = 0
+
+    #----------------------------------------------------------------------------------------------
+    # append a row of time t and the list of arrays of values of the files of the group: self is a 'store' object created in B0
+    def append(self, t, values):
+
+        row = self.buffer[self.nrows]
+        row[0] = t
+        n = 1
+        for v in values:
+            row[n:n + len(v)] = v
+            n += len(v)
+        self.nrows += 1
+        if self.nrows == len(self.buffer):
+            self.write_chunk()
+
+    #----------------------------------------------------------------------------------------------
+    # write collected rows as a chunk: self is a 'store' object created in B0
+    def write_chunk(self):
+
+        if self.nrows == 0:
+            return
+        data = self.buffer[:self.nrows].astype('<f8').tobytes()
+        if self.compress:
+            data = zlib.compress(data, 1)
+        self.fid.write(numpy.array([self.nrows, len(data)], dtype = '<i8').tobytes())
+        self.fid.write(data)
+        self.nrows = 0
+
+    #----------------------------------------------------------------------------------------------
+    # write collected rows and flush the binary file: self is a 'store' object created in B0
+    def flush(self):
+
+        self.write_chunk()
+        self.fid.flush()
+
+    #----------------------------------------------------------------------------------------------
+    # return the size of the binary file (rows are flushed before): self is a 'store' object created in B0
+    def tell(self):
+
+        self.flush()
+        return self.fid.tell()
+
+    #----------------------------------------------------------------------------------------------
+    def close(self):
+
+        self.flush()
+        self.fid.close()
+
+#--------------------------------------------------------------------------------------------------
+# read the store of path (without extension): returns the index and the 2-D array of rows (time followed by columns of files)
+def read(path):
+
+    f = open(path + '.json', 'r')
+    index = json.loads(f.read())
+    f.close()
+    f = open(path + '.bin', 'rb')
+    s = f.read()
+    f.close()
+    chunks = []
+    n = 0
+    while n + 16 <= len(s):
+        nrows, nbytes = numpy.frombuffer(s, dtype = '<i8', count = 2, offset = n)
+        data = s[n + 16:n + 16 + nbytes]
+        if len(data) < nbytes:
+            # chunk cut by a crash while writing
+            break
+        if index['compress']:
+            data = zlib.decompress(data)
+        chunks.append(numpy.frombuffer(data, dtype = index['dtype']).reshape(nrows, index['ncol']))
+        n += 16 + int(nbytes)
+    if len(chunks) == 0:
+        return index, numpy.empty((0, index['ncol']))
+    return index, numpy.concatenate(chunks)
+
+#--------------------------------------------------------------------------------------------------
+# export the output files of the store of path (without extension) as text files to folder (the folder of the store by
+# default): names is the list of files to export (all files of the store by default). Returns the list of paths of written files
+def export(path, folder = None, names = None):
+
+    index, data = read(path)
+    if folder is None:
+        folder = os.path.dirname(path)
+    written = []
+    for x in index['files']:
+        if names is not None and x['file'] not in names:
+            continue
+        f = open(folder + os.sep + x['file'], 'w')
+        f.write(x['header'])
+        fmt = '{:12.5e} '*(1 + x['stop'] - x['start']) + '\n'
+        for row in data:
+            f.write(fmt.format(row[0], *row[x['start']:x['stop']]))
+        f.close()
+        written.append(folder + os.sep + x['file'])
+    return written
+
+#--------------------------------------------------------------------------------------------------
+# export all stores of output folder path: called by A_export
+def export_folder(path, names = None):
+
+    stores = sorted([x[:-5] for x in os.listdir(path) if x.endswith('.json') and os.path.isfile(path + os.sep + x[:-5] + '.bin')])
+    if len(stores) == 0:
+        print('****ERROR: output folder ' + path + ' has no binary output stores.')
+        sys.exit()
+    written = []
+    for store in stores:
+        written += export(path + os.sep + store, names = names)
+    return written
@@ -0,0 +1,69 @@
+import queue
+import sys
+import threading
+
+#--------------------------------------------------------------------------------------------------
+# OUTPUT WRITER: a background thread taking snapshots of output from a bounded queue and writing them,
+# so that formatting and disk writes overlap with the integration. The integration waits only when the
+# queue is full (backpressure). An error of the thread is reported by the next call of the main thread.
+#--------------------------------------------------------------------------------------------------
+class Writer:
+
+    # constructor: self is a 'writer' object created in B0, write is the function write(item) writing a snapshot and maxsize is
+    # the number of snapshots the queue holds
+    def __init__(self, write, maxsize):
+
+        self.write = write
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.thread = threading.Thread(target = self.run, name = 'output-writer', daemon = True)
+        self.thread.start()
+
+    #----------------------------------------------------------------------------------------------
+    # loop of the writer thread: write snapshots until None is taken from the queue (after an error snapshots are dropped):
+    # self is a 'writer' object created in B0
+    def run(self):
+
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    self.write(item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    #----------------------------------------------------------------------------------------------
+    # queue snapshot item for writing, waiting while the queue is full: self is a 'writer' object created in B0
+    def put(self, item):
+
+        self.check()
+        self.queue.put(item)
+
+    #----------------------------------------------------------------------------------------------
+    # wait until all queued snapshots are written: self is a 'writer' object created in B0
+    def drain(self):
+
+        self.queue.join()
+        self.check()
+
+    #----------------------------------------------------------------------------------------------
+    # write queued snapshots and stop the thread: self is a 'writer' object created in B0
+    def close(self):
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.check()
+
+    #----------------------------------------------------------------------------------------------
+    # stop the run if the writer thread failed: self is a 'writer' object created in B0
+    def check(self):
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            print('****ERROR: output writer failed: ' + str(error))
+            sys.exit()
@@ -1,282 +1,666 @@
-from scipy.interpolate import interp1d
-from sympy import *
+from B0A_lookup import Lookup
+from B0B_store import Store
+from B0C_writer import Writer
 
+import ast
+import copy
 import datetime
+import fnmatch
+import hashlib
 import json
+import math
+import numpy
 import os
-import shutil
+import pickle
+import re
 import sys
+import time
 
 #--------------------------------------------------------------------------------------------------
 class Control:
 
-    # constructor: self is a 'control' object created in B
-    def __init__(self, reactor):
-        self.input = self.construct_input()
+    # functions available in expressions of signal cards (sympy-style names are kept for decks written for sympy)
+    functions = {'abs':abs, 'Abs':abs, 'min':min, 'Min':min, 'max':max, 'Max':max, 'sqrt':math.sqrt, 'exp':math.exp,
+                 'log':math.log, 'sin':math.sin, 'cos':math.cos, 'tan':math.tan, 'asin':math.asin, 'acos':math.acos, 'atan':math.atan,
+                 'sinh':math.sinh, 'cosh':math.cosh, 'tanh':math.tanh, 'pi':math.pi, 'E':math.e}
 
-    #------------------------------------------------------------------------------------------
+    # constructor: self is a 'control' object created in B, deck is the text of the input deck, the dictionary of
+    # input data (as in input.json) or None to read the file 'input' of the current folder
+    def __init__(self, reactor, deck):
+
+        if deck is None:
+            f = open('input', 'r')
+            self.deck = f.read()
+            f.close()
+            # input data of the deck parsed in a previous run if the deck has not changed since
+            self.input = self.read_input_cache('input')
+            cached = self.input is not None
+            if not cached:
+                self.input = self.construct_input(self.deck)
+                self.write_input_cache('input')
+            if not cached or not os.path.isfile('input.json'):
+                # input data as understood by the code
+                fid = open('input.json', 'w')
+                fid.write(json.dumps(self.input, indent=2))
+                fid.close()
+        elif isinstance(deck, dict):
+            self.deck = None
+            self.input = self.construct_input('', deck)
+        else:
+            self.deck = deck
+            self.input = self.construct_input(self.deck)
+
+        # compile expressions of signal cards once and schedule the evaluation of signals
+        self.compile_signals(self.input)
+        self.construct_schedule(self.input)
+
+        # indexes of ids of the model
+        self.construct_registry()
+
+        # values of event signals: 0 before the event and 1 after it
+        self.eventvalue = {event['id']:0.0 for event in self.input['event']}
+        # values of signals and the time and event signals they were evaluated for (None: not yet evaluated)
+        self.signal = dict.fromkeys(self.input['signalid'], 0.0)
+        self.signalkey = None
+        # background writer of output files (None: output is written by the main thread)
+        self.writer = None
+        # array of unknowns (None: not yet constructed, see construct_state)
+        self.state = None
+
+    #----------------------------------------------------------------------------------------------
+    # evaluate signals, lookup tables, event signals and flowrates and temperatures imposed by signals in the order of the schedule
+    # prepared when the input is parsed: constant ones at the first call, time-dependent ones when time or event signals change
+    # and state-dependent ones at every call: self is a 'control' object created in B
     def evaluate_signals(self, reactor, t):
 
-        # evaluate signals
-        self.signal = {}
-        for s in self.input['signal']:
-            self.signal[s['id']] = 0.0
+        key = (t,) + tuple(self.eventvalue.values())
+        if self.signalkey is None:
+            levels = ['const', 'time', 'state']
+        elif key != self.signalkey:
+            levels = ['time', 'state']
+        else:
+            levels = ['state']
+        self.signalkey = key
+
+        for level in levels:
+            for kind, x in self.schedule[level]:
+                # signal card of a constant
+                if kind == 'constant':
+                    self.signal[x] = self.constant[x]
+                # signal card of time
+                elif kind == 'time':
+                    self.signal[x] = t
+                # signal card of a quantity of the model
+                elif kind == 'signal':
+                    self.evaluate_signal(reactor, x)
+                # signal card of an expression compiled when the input is parsed: names are looked up among signals, then functions
+                elif kind == 'expression':
+                    try:
+                        self.signal[x] = float(eval(self.expression[x][0], self.namespace, self.signal))
+                    except (ArithmeticError, TypeError, ValueError):
+                        print('****ERROR: \'signal\' card ' + x + ' cannot be evaluated at time ' + str(t) + ' s.')
+                        sys.exit()
+                # output signal of a lookup table
+                elif kind == 'lookup':
+                    self.signal[x.output] = x.evaluate(self.signal)
+                # event signal
+                elif kind == 'event':
+                    self.signal[x] = self.eventvalue[x]
+                # signal-dependent junction: impose flowrate (x is the index among independent junctions and the signal id)
+                elif kind == 'junction':
+                    if 'fluid' in reactor.solve:
+                        reactor.fluid.mdoti[x[0]] = self.signal[x[1]]
+                # signal-dependent pipe: impose temperature (x is the pipe index and the signal id)
+                elif kind == 'pipe':
+                    if 'fluid' in reactor.solve:
+                        reactor.fluid.temp[x[0]][:] = [self.signal[x[1]]] * reactor.fluid.pipennodes[x[0]]
+                        reactor.fluid.propvalid = False
+
+    #----------------------------------------------------------------------------------------------
+    # evaluate signal card s of a quantity of the model (density or temperature of a pipe, temperature of a heat structure,
+    # fuel or cladding temperature of a fuel rod), 0 if the object is not modelled: self is a 'control' object created in B
+    def evaluate_signal(self, reactor, s):
+
+        self.signal[s['id']] = 0.0
+
+        # pipe density
+        if s['value'][0] == 'dens':
+            id = s['value'][1]
+            if 'fluid' in reactor.solve and id in self.registry['pipe']:
+                indx = self.registry['pipe'][id]
+                # densities in pipe nodes evaluated once per right-hand-side call and shared with the fluid
+                n0 = reactor.fluid.inode0[indx]
+                rhol = reactor.fluid.calculate_properties(reactor)['rhol'][n0:n0 + reactor.fluid.pipennodes[indx]]
+                if len(s['value']) == 2:
+                    # average density
+                    self.signal[s['id']] = numpy.mean(rhol)
+                else:
+                    # node density
+                    if s['value'][2] > reactor.fluid.pipennodes[indx]:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to node (' + str(int(s['value'][2])) + ') that does not exist in pipe ' + id)
+                        sys.exit()
+                    self.signal[s['id']] = rhol[int(s['value'][2])-1]
+
+        # htstr or pipe temperature
+        elif s['value'][0] == 'temp':
+            id = s['value'][1]
+            if 'fluid' in reactor.solve and id in self.registry['pipe']:
+                indx = self.registry['pipe'][id]
+                if len(s['value']) == 2:
+                    # average temperature
+                    self.signal[s['id']] = numpy.mean(reactor.fluid.temp[indx])
+                else:
+                    # node temperature
+                    if s['value'][2] > reactor.fluid.pipennodes[indx]:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to node (' + str(int(s['value'][2])) + ') that does not exist in pipe ' + id)
+                        sys.exit()
+                    self.signal[s['id']] = reactor.fluid.temp[indx][int(s['value'][2])-1]
+            elif 'htstr' in reactor.solve and id in self.registry['htstr']:
+                indx = self.registry['htstr'][id]
+                if len(s['value']) == 2:
+                    # average temperature
+                    htstr = reactor.solid.htstr[indx]
+                    self.signal[s['id']] = numpy.dot(htstr.temp[:htstr.nr], htstr.vol) / numpy.sum(htstr.vol)
+                else:
+                    # node temperature
+                    if s['value'][2] > reactor.solid.htstr[indx].nr:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to radial node (' + str(int(s['value'][2])) + ') that does not exist in htstr ' + id)
+                        sys.exit()
+                    self.signal[s['id']] = reactor.solid.htstr[indx].temp[int(s['value'][2])-1]
+
+        #fuel temperature
+        elif s['value'][0] == 'tfuel':
+            id = s['value'][1]
+            if 'fuelrod' in reactor.solve and id in self.registry['fuelrod']:
+                indx = self.registry['fuelrod'][id]
+                if len(s['value']) == 2:
+                    # r-z-average fuel temperature
+                    layers = reactor.solid.fuelrod[indx].fuel
+                    tvol = sum(numpy.dot(x.temp[:x.nr], x.vol) for x in layers)
+                    self.signal[s['id']] = tvol / sum(numpy.sum(x.vol) for x in layers)
+                elif len(s['value']) == 3:
+                    if s['value'][2] > reactor.solid.fuelrod[indx].nz:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
+                        sys.exit()
+                    i = int(s['value'][2]-1)
+                    # r-average temperature
+                    x = reactor.solid.fuelrod[indx].fuel[i]
+                    self.signal[s['id']] = numpy.dot(x.temp[:x.nr], x.vol) / numpy.sum(x.vol)
+                else:
+                    if s['value'][2] > reactor.solid.fuelrod[indx].nz:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
+                        sys.exit()
+                    i = int(s['value'][2]-1)
+                    if s['value'][3] > reactor.solid.fuelrod[indx].fuel[i].nr:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to radial (' + str(int(s['value'][3])) + ') that does not exist in fuel of fuelrod ' + id)
+                        sys.exit()
+                    j = int(s['value'][3]-1)
+                    # node temperature
+                    self.signal[s['id']] = reactor.solid.fuelrod[indx].fuel[int(s['value'][2])-1].temp[j]
 
+        elif s['value'][0] == 'tclad':
+            id = s['value'][1]
+            if 'fuelrod' in reactor.solve and id in self.registry['fuelrod']:
+                indx = self.registry['fuelrod'][id]
+                if len(s['value']) == 2:
+                    # r-z-average clad temperature
+                    layers = reactor.solid.fuelrod[indx].clad
+                    tvol = sum(numpy.dot(x.temp[:x.nr], x.vol) for x in layers)
+                    self.signal[s['id']] = tvol / sum(numpy.sum(x.vol) for x in layers)
+                elif len(s['value']) == 3:
+                    if s['value'][2] > reactor.solid.fuelrod[indx].nz:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
+                        sys.exit()
+                    i = int(s['value'][2])
+                    # r-average temperature
+                    x = reactor.solid.fuelrod[indx].clad[i]
+                    self.signal[s['id']] = numpy.dot(x.temp[:x.nr], x.vol) / numpy.sum(x.vol)
+                else:
+                    if s['value'][2] > reactor.solid.fuelrod[indx].nz:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
+                        sys.exit()
+                    i = int(s['value'][2]-1)
+                    if s['value'][3] > reactor.solid.fuelrod[indx].clad[i].nr:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to radial (' + str(int(s['value'][3])) + ') that does not exist in fuel of fuelrod ' + id)
+                        sys.exit()
+                    j = int(s['value'][3]-1)
+                    # node temperature
+                    self.signal[s['id']] = reactor.solid.fuelrod[indx].clad[int(s['value'][2])-1].temp[j]
+
+    #----------------------------------------------------------------------------------------------
+    # compile the signal cards of input data inp which values contain arithmetic operators: expressions without signals are
+    # evaluated once to self.constant, other ones are compiled to self.expression (id: code object, list of signals used).
+    # Card values are merged as they were written, ^ is the power as in ** and only numbers, signals, functions of
+    # self.functions, unary and binary arithmetic operators are allowed
+    def compile_signals(self, inp):
+
+        self.constant = {}
+        self.expression = {}
+        # globals of expressions: functions only, no python builtins
+        self.namespace = dict(self.functions, __builtins__ = {})
+        for s in inp['signal']:
             # merge card values
             value = ''.join([str(x) for x in s['value']])
-            # only for simple signals not requiring symbolic evaluations
             if not any([char in value for char in ['+', '-', '*', '/']]):
-               # constant
-               if type(s['value'][0]) == int or type(s['value'][0]) == float:
-                   self.signal[s['id']] = s['value'][0]
-               
-               else:
-                   # time
-                   if s['value'][0] == 'time':
-                       self.signal[s['id']] = t
-                   
-                   # pipe density
-                   elif s['value'][0] == 'dens':
-                       id = s['value'][1]
-                       if 'fluid' in reactor.solve and id in reactor.fluid.pipeid:
-                           indx = [x.id for x in reactor.fluid.pipeid].index(id)
-                           if len(s['value']) == 2:
-                               # average density
-                               davg = 0.0
-                               for i in range(reactor.fluid.pipennodes[indx]):
-                                   # call material property function
-                                   pro = reactor.data.matpro( {'type':reactor.fluid.type[indx], 't':reactor.fluid.temp[indx][i]} )
-                                   davg += pro['rhol']
-                               davg /= reactor.fluid.pipennodes[indx]
-                               self.signal[s['id']] = davg
-                           else:
-                               # node density
-                               if s['value'][2] > reactor.fluid.pipennodes[indx]:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to node (' + str(int(s['value'][2])) + ') that does not exist in pipe ' + id)
-                                   sys.exit()
-                               # call material property function
-                               pro = reactor.data.matpro( {'type':reactor.fluid.type[indx], 't':reactor.fluid.temp[indx][int(s['value'][2])-1]} )
-                               self.signal[s['id']] = pro['rhol']
-                   
-                   # htstr or pipe temperature
-                   elif s['value'][0] == 'temp':
-                       id = s['value'][1]
-                       if 'fluid' in reactor.solve and id in reactor.fluid.pipeid:
-                           indx = [x.id for x in reactor.fluid.pipeid].index(id)
-                           if len(s['value']) == 2:
-                               # average temperature
-                               tavg = 0.0
-                               for i in range(reactor.fluid.pipennodes[indx]):
-                                   tavg += reactor.fluid.temp[indx][i]
-                               tavg /= reactor.fluid.pipennodes[indx]
-                               self.signal[s['id']] = tavg
-                           else:
-                               # node temperature
-                               if s['value'][2] > reactor.fluid.pipennodes[indx]:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to node (' + str(int(s['value'][2])) + ') that does not exist in pipe ' + id)
-                                   sys.exit()
-                               self.signal[s['id']] = reactor.fluid.temp[indx][int(s['value'][2])-1]
-                       elif 'htstr' in reactor.solve and id in [x.id for x in reactor.solid.htstr]:
-                           indx = [x.id for x in reactor.solid.htstr].index(id)
-                           if len(s['value']) == 2:
-                               # average temperature
-                               tavg = 0.0
-                               for i in range(reactor.solid.htstr[indx].nr):
-                                   tavg += reactor.solid.htstr[indx].temp[i] * reactor.solid.htstr[indx].vol[i]
-                               tavg /= sum(reactor.solid.htstr[indx].vol)
-                               self.signal[s['id']] = tavg
-                           else:
-                               # node temperature
-                               if s['value'][2] > reactor.solid.htstr[indx].nr:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to radial node (' + str(int(s['value'][2])) + ') that does not exist in htstr ' + id)
-                                   sys.exit()
-                               self.signal[s['id']] = reactor.solid.htstr[indx].temp[int(s['value'][2])-1]
-                   
-                   #fuel temperature
-                   elif s['value'][0] == 'tfuel':
-                       id = s['value'][1]
-                       if 'fuelrod' in reactor.solve and id in [x.id for x in reactor.solid.fuelrod]:
-                           indx = [x.id for x in reactor.solid.fuelrod].index(id)
-                           if len(s['value']) == 2:
-                               # r-z-average fuel temperature and volume
-                               tavg, vol = 0.0, 0.0
-                               for i in range(reactor.solid.fuelrod[indx].nz):
-                                   for j in range(reactor.solid.fuelrod[indx].fuel[i].nr):
-                                       tavg += reactor.solid.fuelrod[indx].fuel[i].temp[j] * reactor.solid.fuelrod[indx].fuel[i].vol[j]
-                                       vol += reactor.solid.fuelrod[indx].fuel[i].vol[j]
-                               tavg /= vol
-                               self.signal[s['id']] = tavg
-                           elif len(s['value']) == 3:
-                               if s['value'][2] > reactor.solid.fuelrod[indx].nz:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
-                                   sys.exit()
-                               i = int(s['value'][2]-1)
-                               # r-average temperature and volume
-                               tavg, vol = 0.0, 0.0
-                               for j in range(reactor.solid.fuelrod[indx].fuel[i].nr):
-                                   tavg += reactor.solid.fuelrod[indx].fuel[i].temp[j] * reactor.solid.fuelrod[indx].fuel[i].vol[j]
-                                   vol += reactor.solid.fuelrod[indx].fuel[i].vol[j]
-                               tavg /= vol
-                               self.signal[s['id']] = tavg
-                           else:
-                               if s['value'][2] > reactor.solid.fuelrod[indx].nz:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
-                                   sys.exit()
-                               i = int(s['value'][2]-1)
-                               if s['value'][3] > reactor.solid.fuelrod[indx].fuel[i].nr:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to radial (' + str(int(s['value'][3])) + ') that does not exist in fuel of fuelrod ' + id)
-                                   sys.exit()
-                               j = int(s['value'][3]-1)
-                               # node temperature
-                               self.signal[s['id']] = reactor.solid.fuelrod[indx].fuel[int(s['value'][2])-1].temp[j]
-                   
-                   elif s['value'][0] == 'tclad':
-                       id = s['value'][1]
-                       if 'fuelrod' in reactor.solve and id in [x.id for x in reactor.solid.fuelrod]:
-                           indx = [x.id for x in reactor.solid.fuelrod].index(id)
-                           if len(s['value']) == 2:
-                               # r-z-average clad temperature and volume
-                               tavg, vol = 0.0, 0.0
-                               for i in range(reactor.solid.fuelrod[indx].nz):
-                                   for j in range(reactor.solid.fuelrod[indx].clad[i].nr):
-                                       tavg += reactor.solid.fuelrod[indx].clad[i].temp[j] * reactor.solid.fuelrod[indx].clad[i].vol[j]
-                                       vol += reactor.solid.fuelrod[indx].clad[i].vol[j]
-                               tavg /= vol
-                               self.signal[s['id']] = tavg
-                           elif len(s['value']) == 3:
-                               if s['value'][2] > reactor.solid.fuelrod[indx].nz:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
-                                   sys.exit()
-                               i = int(s['value'][2])
-                               # r-average temperature and volume
-                               tavg, vol = 0.0, 0.0
-                               for j in range(reactor.solid.fuelrod[indx].clad[i].nr):
-                                   tavg += reactor.solid.fuelrod[indx].clad[i].temp[j] * reactor.solid.fuelrod[indx].clad[i].vol[j]
-                                   vol += reactor.solid.fuelrod[indx].clad[i].vol[j]
-                               tavg /= vol
-                               self.signal[s['id']] = tavg
-                           else:
-                               if s['value'][2] > reactor.solid.fuelrod[indx].nz:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to axial layer (' + str(int(s['value'][2])) + ') that does not exist in fuelrod ' + id)
-                                   sys.exit()
-                               i = int(s['value'][2]-1)
-                               if s['value'][3] > reactor.solid.fuelrod[indx].clad[i].nr:
-                                   print('****ERROR: \'signal\' card ' + s['id'] + ' refers to radial (' + str(int(s['value'][3])) + ') that does not exist in fuel of fuelrod ' + id)
-                                   sys.exit()
-                               j = int(s['value'][3]-1)
-                               # node temperature
-                               self.signal[s['id']] = reactor.solid.fuelrod[indx].clad[int(s['value'][2])-1].temp[j]
-
-        #evaluate output signals of lookup tables
-        lookup_table = self.input['lookup']
-        for table in lookup_table:
-            insignal_name = table['x'][0]
-            outsignal_name = table['f(x)'][0]
-            x = table['x'][1:]
-            y = table['f(x)'][1:]
-            # scipy function
-            f = interp1d(x, y)
-            xnew = max(min(self.signal[insignal_name],x[-1]),x[0])
-            ynew = f(xnew)
-            self.signal[outsignal_name] = ynew
-
-        # signal-dependent junction: impose flowrate
-        if 'fluid' in reactor.solve:
-            k = 0
-            for j in range(reactor.fluid.njun):
-                if reactor.fluid.juntype[j] == 'independent':
-                    if reactor.fluid.junflowrate[j] != '':
-                        # impose flowrate from the look-up table
-                        reactor.fluid.mdoti[k] = self.signal[reactor.fluid.junflowrate[j]]
-                    k += 1
-        
-        # signal-dependent pipe: impose temperature
-        if 'fluid' in reactor.solve:
-            for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'normal' and reactor.fluid.signaltemp[i] != '':
-                    # impose temperature from the look-up table
-                    reactor.fluid.temp[i] = [self.signal[reactor.fluid.signaltemp[i]]] * reactor.fluid.pipennodes[i]
+                if isinstance(s['value'][0], (int, float)):
+                    self.constant[s['id']] = s['value'][0]
+                continue
+            try:
+                tree = ast.parse(value.replace('^', '**'), mode = 'eval')
+            except SyntaxError:
+                print('****ERROR: \'signal\' card ' + s['id'] + ' contains a syntax error.')
+                sys.exit()
+            names = []
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Call):
+                    if not isinstance(node.func, ast.Name) or not callable(self.functions.get(node.func.id)) or node.keywords != []:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' calls a function that is not one of: ' + ', '.join([f for f in self.functions if callable(self.functions[f])]) + '.')
+                        sys.exit()
+                elif isinstance(node, ast.Name):
+                    if node.id in inp['signalid']:
+                        if node.id not in names: names.append(node.id)
+                    elif node.id not in self.functions:
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' refers to signal ' + node.id + ' that is not defined.')
+                        sys.exit()
+                elif isinstance(node, ast.Constant):
+                    if not isinstance(node.value, (int, float)):
+                        print('****ERROR: \'signal\' card ' + s['id'] + ' contains a syntax error.')
+                        sys.exit()
+                elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Load, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.UAdd, ast.USub)):
+                    print('****ERROR: \'signal\' card ' + s['id'] + ' contains a syntax error.')
+                    sys.exit()
+            code = compile(tree, s['id'], 'eval')
+            if names == []:
+                try:
+                    self.constant[s['id']] = float(eval(code, self.namespace, {}))
+                except (ArithmeticError, TypeError, ValueError):
+                    print('****ERROR: \'signal\' card ' + s['id'] + ' cannot be evaluated.')
+                    sys.exit()
+            else:
+                self.expression[s['id']] = (code, names)
 
-        # signals requiring symbolic evaluations
-        for s in self.input['signal']:
-            # merge card values
-            value = ''.join([str(x) for x in s['value']])
-            # only for signals requiring symbolic evaluations
-            if any([char in value for char in ['+', '-', '*', '/']]):
+    #----------------------------------------------------------------------------------------------
+    # construct the graph of signals of input data inp (signal cards, lookup tables, event signals) and of flowrates and
+    # temperatures imposed by signals in junctions and pipes, sort it topologically and split it to self.schedule: lists of
+    # (kind, data) to be evaluated in this order for levels 'const' (depending on nothing), 'time' (depending on time or event
+    # signals) and 'state' (depending on unknowns of the model)
+    def construct_schedule(self, inp):
+
+        # nodes: dictionary of node: (kind, data, own level, list of nodes it depends on)
+        graph = {}
+        def add(node, kind, data, level, deps):
+            if node in graph:
+                print('****ERROR: signal ' + str(node) + ' is defined more than once.')
+                sys.exit()
+            graph[node] = (kind, data, level, deps)
+
+        # pipes which temperature is imposed by signals
+        pipeindex = {x['id']:i for i, x in enumerate(inp['pipe'])}
+        signalpipes = [x['id'] for x in inp['pipe'] if x['type'] == 'normal' and x['signaltemp'] != '']
+        for s in inp['signal']:
+            if s['id'] in self.constant:
+                add(s['id'], 'constant', s['id'], 'const', [])
+            elif s['id'] in self.expression:
+                add(s['id'], 'expression', s['id'], 'const', self.expression[s['id']][1])
+            elif s['value'][0] == 'time':
+                add(s['id'], 'time', s['id'], 'time', [])
+            elif s['value'][0] in ['dens', 'temp'] and len(s['value']) > 1 and s['value'][1] in signalpipes:
+                # density or temperature of a pipe follows the imposed temperature
+                add(s['id'], 'signal', s, 'state', [('pipe', s['value'][1])])
+            else:
+                add(s['id'], 'signal', s, 'state', [])
+        for table in inp['lookup']:
+            # interpolator built once
+            lookup = Lookup(table)
+            add(lookup.output, 'lookup', lookup, 'const', lookup.input)
+        for event in inp['event']:
+            # switched between steps only
+            add(event['id'], 'event', event['id'], 'time', [])
+        # imposed values overwrite unknowns read from the integrator at every call
+        k = 0
+        for j in range(len(inp['junction']['type'])):
+            if inp['junction']['type'][j] == 'independent':
+                if inp['junction']['flowrate'][j] != '':
+                    add(('junction', j), 'junction', (k, inp['junction']['flowrate'][j]), 'state', [inp['junction']['flowrate'][j]])
+                k += 1
+        for id in signalpipes:
+            x = inp['pipe'][pipeindex[id]]
+            add(('pipe', id), 'pipe', (pipeindex[id], x['signaltemp']), 'state', [x['signaltemp']])
+
+        for node, (kind, data, level, deps) in graph.items():
+            for dep in deps:
+                if dep not in graph:
+                    print('****ERROR: signal ' + dep + ' used by ' + (node if isinstance(node, str) else node[0] + ' ' + str(node[1])) + ' is not defined.')
+                    sys.exit()
+
+        # topological sort by depth-first search: a node is appended after all nodes it depends on, a node met again while its
+        # dependencies are being visited closes a cycle
+        levels = ['const', 'time', 'state']
+        order, level, path = [], {}, []
+        for root in graph:
+            if root in level:
+                continue
+            stack = [(root, iter(graph[root][3]))]
+            path.append(root)
+            level[root] = None
+            while len(stack) > 0:
+                node, deps = stack[-1]
+                dep = next(deps, None)
+                if dep is None:
+                    # the level of a node is the highest of its own level and levels of nodes it depends on
+                    level[node] = max([levels.index(graph[node][2])] + [level[x] for x in graph[node][3]])
+                    order.append(node)
+                    stack.pop()
+                    path.pop()
+                elif dep not in level:
+                    stack.append((dep, iter(graph[dep][3])))
+                    path.append(dep)
+                    level[dep] = None
+                elif level[dep] is None:
+                    cycle = path[path.index(dep):] + [dep]
+                    print('****ERROR: signals form a cycle: ' + ' -> '.join([x if isinstance(x, str) else x[0] + ' ' + str(x[1]) for x in cycle]) + '.')
+                    sys.exit()
+
+        self.schedule = {x:[] for x in levels}
+        for node in order:
+            self.schedule[levels[level[node]]].append(graph[node][:2])
+
+    #----------------------------------------------------------------------------------------------
+    # construct the registry of the model: dictionaries of ids of input cards to their indexes in lists of input data and of
+    # objects (objects are created in the order of input data), so that ids are resolved without searching lists. The first
+    # card wins for repeated ids: self is a 'control' object created in B
+    def construct_registry(self):
+
+        inp = self.input
+        def index(ids):
+            d = {}
+            for i, id in enumerate(ids):
+                d.setdefault(id, i)
+            return d
+
+        self.registry = {}
+        self.registry['mat'] = index([x['id'] for x in inp['mat']])
+        # pipes and pipe nodes: (pipe id, node number from 1) to the index in the array of all pipe nodes (pipe after pipe)
+        self.registry['pipe'] = index([x['id'] for x in inp['pipe']])
+        self.registry['pipenode'] = index([(x['id'], j+1) for x in inp['pipe'] for j in range(x['nnodes'])])
+        # junctions: (from pipe id, to pipe id)
+        self.registry['junction'] = index(zip(inp['junction']['from'], inp['junction']['to']))
+        self.registry['fuel'] = index([x['id'] for x in inp['fuel']])
+        self.registry['clad'] = index([x['id'] for x in inp['clad']])
+        self.registry['fuelrod'] = index([x['id'] for x in inp['fuelrod']])
+        # axial layers of fuel rods: (pipe id, pipe node number) of the cooling pipe node to (fuel rod index, axial layer index)
+        self.registry['fuelrodlayer'] = {}
+        for i, x in enumerate(inp['fuelrod']):
+            for j in range(len(x['pipeid'])):
+                self.registry['fuelrodlayer'].setdefault((x['pipeid'][j], x['pipenode'][j]), (i, j))
+        self.registry['innergas'] = index([x['fuelrodid'] for x in inp['innergas']])
+        self.registry['htstr'] = index([x['id'] for x in inp['htstr']])
+        self.registry['thermbc'] = index([x['id'] for x in inp['thermbc']])
+        self.registry['mix'] = index([x['mixid'] for x in inp['mix']])
+        # isotopes in the order of their first appearance in mix cards
+        self.registry['iso'] = index(dict.fromkeys([id for x in inp['mix'] for id in x['isoid']]))
+        self.registry['stack'] = index([x['stackid'] for x in inp['stack']])
+
+    #----------------------------------------------------------------------------------------------
+    # split text s0 of the input deck in one pass into lines of words (strings). A &-ending line is merged with the next one (the
+    # rest of the line after & is ignored) and # starts a comment
+    def split_lines(self, s0):
+
+        for line in re.sub(r'&[^\n]*(\n|$)', '', s0).split('\n'):
+            word = line.split('#', 1)[0].split()
+            if len(word) > 0:
+                yield word
+
+    #----------------------------------------------------------------------------------------------
+    # return the cards of text s0 of the input deck one by one as lists of words (numbers converted to float), expanding
+    # directives of the deck on the fly (self.included collects hashes of included files): self is a 'control' object created in B
+    def tokenize(self, s0):
+
+        self.included = {}
+        self.templates = {}
+        self.wordexpression = {}
+        return self.expand(self.split_lines(s0), {}, '', [])
+
+    #----------------------------------------------------------------------------------------------
+    # generate cards of lines of words expanding directives: 'repeat VAR FIRST LAST [STEP]' ... 'end' repeats the lines in between
+    # for integer values of VAR from FIRST to LAST, 'template NAME [PARAM ...]' ... 'end' defines the lines in between as a template
+    # used by 'use NAME [VALUE ...]', 'include FILE' inserts the cards of file FILE (relative to the folder of the including
+    # file). {EXPRESSION} in a word is replaced by the value of the arithmetic expression of loop variables and template
+    # parameters in dictionary env; folder is the folder of the file of the lines and files is the list of files being
+    # included: self is a 'control' object created in B
+    def expand(self, lines, env, folder, files):
+
+        for word in lines:
+            key = word[0].lower()
+            if key == 'repeat':
+                body = self.collect_block(lines, word)
+                arg = [self.substitute(w, env) for w in word[1:]]
+                if len(arg) not in [3, 4]:
+                    print('****ERROR: \'repeat\' directive should be: repeat VAR FIRST LAST [STEP].')
+                    sys.exit()
                 try:
-                    self.signal[s['id']] = sympify(value)
-                except:
-                    print('****ERROR: \'signal\' card ' + s['id'] + ' contains a syntax error.')
+                    first, last, step = int(arg[1]), int(arg[2]), int(arg[3]) if len(arg) == 4 else 1
+                except ValueError:
+                    print('****ERROR: \'repeat\' directive ' + ' '.join(arg) + ' should have integer bounds and step.')
+                    sys.exit()
+                if step == 0:
+                    print('****ERROR: \'repeat\' directive ' + ' '.join(arg) + ' should have a non-zero step.')
+                    sys.exit()
+                for i in range(first, last + (1 if step > 0 else -1), step):
+                    yield from self.expand(iter(body), dict(env, **{arg[0]:i}), folder, files)
+
+            elif key == 'template':
+                if len(word) < 2:
+                    print('****ERROR: \'template\' directive should be: template NAME [PARAM ...].')
+                    sys.exit()
+                self.templates[word[1]] = (word[2:], self.collect_block(lines, word))
+
+            elif key == 'use':
+                if len(word) < 2 or word[1] not in self.templates:
+                    print('****ERROR: \'use\' directive ' + ' '.join(word) + ' refers to an undefined template.')
+                    sys.exit()
+                param, body = self.templates[word[1]]
+                value = [self.substitute(w, env) for w in word[2:]]
+                if len(value) != len(param):
+                    print('****ERROR: \'use\' directive ' + ' '.join(word) + ' should have ' + str(len(param)) + ' values of template parameters.')
+                    sys.exit()
+                yield from self.expand(iter(body), dict(env, **dict(zip(param, value))), folder, files)
+
+            elif key == 'include':
+                if len(word) != 2:
+                    print('****ERROR: \'include\' directive should be: include FILE.')
+                    sys.exit()
+                path = os.path.join(folder, self.substitute(word[1], env))
+                if os.path.abspath(path) in files:
+                    print('****ERROR: file ' + path + ' includes itself.')
                     sys.exit()
-                for id in list(self.signal.keys()):
-                    if id in value:
-                        self.signal[s['id']] = self.signal[s['id']].subs(sympify(id),self.signal[id])
                 try:
-                    self.signal[s['id']] = float(self.signal[s['id']])
-                except:
-                    print('****ERROR: \'signal\' card ' + s['id'] + ' most likely contains a not-defined signal.')
+                    f = open(path, 'r')
+                    s = f.read()
+                    f.close()
+                except OSError:
+                    print('****ERROR: included file ' + path + ' cannot be read.')
                     sys.exit()
+                self.included[os.path.abspath(path)] = hashlib.sha256(s.encode()).hexdigest()
+                yield from self.expand(self.split_lines(s), env, os.path.dirname(path), files + [os.path.abspath(path)])
+
+            elif key == 'end':
+                print('****ERROR: \'end\' directive without \'repeat\' or \'template\'.')
+                sys.exit()
+
+            else:
+                card = []
+                for w in word:
+                    w = self.substitute(w, env)
+                    try:
+                        card.append(float(w))
+                    except ValueError:
+                        card.append(w)
+                yield card
+
+    #----------------------------------------------------------------------------------------------
+    # return the list of lines of words of the iterator lines up to the 'end' directive closing directive head (nested directives
+    # are kept in the block): self is a 'control' object created in B
+    def collect_block(self, lines, head):
+
+        block = []
+        depth = 1
+        for word in lines:
+            key = word[0].lower()
+            if key in ['repeat', 'template']:
+                depth += 1
+            elif key == 'end':
+                depth -= 1
+                if depth == 0:
+                    return block
+            block.append(word)
+        print('****ERROR: \'' + head[0] + '\' directive ' + ' '.join(head[1:]) + ' is not closed by \'end\'.')
+        sys.exit()
 
     #----------------------------------------------------------------------------------------------
-    def construct_input(self):
+    # return word w with every {EXPRESSION} replaced by the value of the expression of names in dictionary env: a name alone is
+    # replaced by its value as it is, otherwise the expression may contain numbers, names of numeric values, + - * / // % ** and
+    # parentheses (expressions are compiled once per deck in self.wordexpression): self is a 'control' object created in B
+    def substitute(self, w, env):
+
+        if '{' not in w:
+            return w
+
+        def value(match):
+            s = match.group(1).strip()
+            if s in env:
+                return str(env[s])
+            if s not in self.wordexpression:
+                try:
+                    tree = ast.parse(s, mode = 'eval')
+                except SyntaxError:
+                    tree = None
+                allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load, ast.Add, ast.Sub, ast.Mult,
+                           ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd)
+                if tree is None or not all([isinstance(node, allowed) for node in ast.walk(tree)]):
+                    print('****ERROR: expression {' + s + '} in word ' + w + ' is not an arithmetic expression.')
+                    sys.exit()
+                names = sorted(set([node.id for node in ast.walk(tree) if isinstance(node, ast.Name)]))
+                self.wordexpression[s] = (compile(tree, '<deck>', 'eval'), names)
+            code, names = self.wordexpression[s]
+            local = {}
+            for name in names:
+                if name not in env:
+                    print('****ERROR: expression {' + s + '} in word ' + w + ' refers to undefined variable ' + name + '.')
+                    sys.exit()
+                local[name] = env[name]
+                if isinstance(local[name], str):
+                    try:
+                        local[name] = int(local[name])
+                    except ValueError:
+                        try:
+                            local[name] = float(local[name])
+                        except ValueError:
+                            print('****ERROR: variable ' + name + ' in expression {' + s + '} in word ' + w + ' is not a number.')
+                            sys.exit()
+            try:
+                return str(eval(code, {'__builtins__':{}}, local))
+            except (ArithmeticError, TypeError, ValueError):
+                print('****ERROR: expression {' + s + '} in word ' + w + ' cannot be evaluated.')
+                sys.exit()
+
+        return re.sub(r'\{([^{}]*)\}', value, w)
+
+    #----------------------------------------------------------------------------------------------
+    # return input data of the deck file path parsed in a previous run and saved in the cache file path.pkl if the deck, the files
+    # it includes and the parser have not changed since (the cache is keyed by their hashes), otherwise None: self is a
+    # 'control' object created in B
+    def read_input_cache(self, path):
+
+        if not os.path.isfile(path + '.pkl'):
+            return None
+        try:
+            f = open(path + '.pkl', 'rb')
+            cache = pickle.load(f)
+            f.close()
+        except Exception:
+            # damaged or written by another version of python: parse the deck again
+            return None
+        if not isinstance(cache, dict) or cache.get('key') != self.input_key():
+            return None
+        for file, key in cache['included'].items():
+            try:
+                f = open(file, 'r')
+                s = f.read()
+                f.close()
+            except OSError:
+                return None
+            if hashlib.sha256(s.encode()).hexdigest() != key:
+                return None
+        return cache['input']
+
+    #----------------------------------------------------------------------------------------------
+    # save input data of the deck file path to the cache file path.pkl: self is a 'control' object created in B
+    def write_input_cache(self, path):
+
+        try:
+            f = open(path + '.pkl', 'wb')
+            pickle.dump({'key':self.input_key(), 'included':self.included, 'input':self.input}, f, protocol = pickle.HIGHEST_PROTOCOL)
+            f.close()
+        except OSError:
+            # read-only folder: run without the cache
+            pass
+
+    #----------------------------------------------------------------------------------------------
+    # return the hash of the text of the input deck and of the source of the parser: self is a 'control' object created in B
+    def input_key(self):
+
+        h = hashlib.sha256(self.deck.encode())
+        f = open(__file__, 'rb')
+        h.update(f.read())
+        f.close()
+        return h.hexdigest()
+
+    #----------------------------------------------------------------------------------------------
+    # parse text s0 of the input deck and complete it by dictionary data of input data given directly
+    def construct_input(self, s0, data = {}):
         #create dictionary inp where all input data will be stored
         inp = {}
+        inp['checkpoint'] = 0
         inp['clad'] = []
         inp['coregeom'] = {'geometry':'', 'pitch':0, 'botBC':'', 'topBC':''}
         inp['coremap'] = []
+        inp['event'] = []
         inp['fuel'] = []
         inp['fuelrod'] = []
         inp['innergas'] = []
+        inp['jacobian'] = 'full'
         inp['junction'] = {'from':[], 'to':[], 'type':[], 'pumphead':[], 'flowrate':[]}
+        inp['kernel'] = 'python'
         inp['lookup'] = []
         inp['mat'] = []
         inp['mix'] = []
+        inp['multirate'] = {}
+        inp['output'] = {'select':[], 'stride':{}}
         inp['p2d'] = []
         inp['pipe'] = []
+        inp['profile'] = False
+        inp['restart'] = False
         inp['signal'] = []
         inp['signalid'] = []
         inp['solve'] = []
         inp['stack'] = []
+        inp['steady'] = {'ftol':1.e-6, 'maxiter':50}
+        inp['store'] = {'type':'text', 'compress':False}
+        inp['subsystem'] = []
         inp['htstr'] = []
         inp['t0'] = 0
         inp['t_dt'] = []
+        inp['telemetry'] = None
         inp['tol'] = (1.e-6,1e-6)
         inp['thermbc'] = []
+        inp['writer'] = {'type':'sync', 'queue':16}
     
-        #read input file as a whole
-        f = open('input', 'r')
-        s0 = f.read()
-        f.close()
-    
-        #merge &-ending "line" with the next one
-        s = ''
-        take = True
-        for c in s0:
-            if c == '&' : take = False
-            if take : s += c
-            if c == '\n' : take = True
-    
-        #split in lines
-        lines = s.strip().split('\n')
-    
-        #remove comment-lines (#)
-        lines = [x for x in lines if not x.startswith('#')]
-        #remove comments inside lines (#)
-        for i in range(len(lines)):
-            if '#' in lines[i]:
-                lines[i] = lines[i].split('#')[0]
-    
-        def convert_to_float(w): 
-            try:
-                w = float(w)
-            except:
-                pass
-            return w
+        # cards merged by id: fuel rod, mix and stack cards of the same id add axial layers, isotopes and stack layers
+        merged = {'fuelrod':{}, 'mix':{}, 'stack':{}}
+
+        for word in self.tokenize(s0):
 
-        for line in lines:
-                
-            word = line.split()
-            word = list(map(convert_to_float, word))
             if len(word) > 0:
                 
                 key = word[0].lower()
@@ -289,6 +673,13 @@ class Control:
                 elif key == 'betaeff':
                     inp['betaeff'] = word[1:]
                 #--------------------------------------------------------------------------------------
+                # time interval between checkpoints of the transient (0: no checkpoints)
+                elif key == 'checkpoint':
+                    if len(word)-1 < 1 or not isinstance(word[1], float) or word[1] < 0:
+                        print('****ERROR: \'checkpoint\' card should have one non-negative value after the keyword: time interval between checkpoints (s).')
+                        sys.exit()
+                    inp['checkpoint'] = word[1]
+                #--------------------------------------------------------------------------------------
                 # cladding
                 elif key == 'clad':
                      inp['clad'].append( {'id':word[1], 'matid':word[2], 'ri':word[3], 'ro':word[4], 'nr':int(word[5])} )
@@ -323,6 +714,14 @@ class Control:
                 elif key == 'dnplmb':
                     inp['dnplmb'] = word[1:]
                 #--------------------------------------------------------------------------------------
+                # event: signal crossing a threshold upwards or downwards stops the transient or continues it with the event
+                # signal (0 before the event, 1 after it) available to other signals
+                elif key == 'event':
+                    if len(word)-1 < 5 or word[3] not in ['up', 'down'] or not isinstance(word[4], float) or word[5] not in ['stop', 'continue']:
+                        print('****ERROR: \'event\' card should have five values after the keyword: event signal id, signal id, direction of crossing (up or down), threshold and action (stop or continue).')
+                        sys.exit()
+                    inp['event'].append( {'id':word[1], 'signal':word[2], 'direction':word[3], 'threshold':word[4], 'action':word[5]} )
+                #--------------------------------------------------------------------------------------
                 # fuel grain parameters
                 elif key == 'fgrain':
                     # grain diameter
@@ -339,20 +738,20 @@ class Control:
                 # fuel rod card
                 elif key == 'fuelrod':
                     id = word[1]
-                    if any([id in x['id'] for x in inp['fuelrod']]):
-                        for x in inp['fuelrod']:
-                            if x['id'] == id:
-                                x['fuelid'].append(word[2])
-                                x['hgap'].append(float(word[3]))
-                                x['cladid'].append(word[4])
-                                x['p2d'].append(word[5])
-                                x['mltpl'].append(word[6])
-                                x['pipeid'].append(word[7])
-                                x['pipenode'].append(int(word[8]))
-                                x['kr'].append(int(word[9]))
-                                x['kz'].append(int(word[10]))
+                    if id in merged['fuelrod']:
+                        x = merged['fuelrod'][id]
+                        x['fuelid'].append(word[2])
+                        x['hgap'].append(float(word[3]))
+                        x['cladid'].append(word[4])
+                        x['p2d'].append(word[5])
+                        x['mltpl'].append(word[6])
+                        x['pipeid'].append(word[7])
+                        x['pipenode'].append(int(word[8]))
+                        x['kr'].append(int(word[9]))
+                        x['kz'].append(int(word[10]))
                     else:
                         inp['fuelrod'].append({'id':id, 'fuelid':[word[2]], 'hgap':[float(word[3])], 'cladid':[word[4]], 'p2d':[word[5]], 'mltpl':[word[6]], 'pipeid':[word[7]], 'pipenode':[int(word[8])], 'kr':[int(word[9])], 'kz':[int(word[10])]})
+                        merged['fuelrod'][id] = inp['fuelrod'][-1]
                 #--------------------------------------------------------------------------------------
                 # heat structure card
                 elif key == 'htstr':
@@ -362,6 +761,13 @@ class Control:
                 elif key == 'innergas':
                      inp['innergas'].append( {'fuelrodid':word[1], 'matid':word[2], 'plenv':word[3]} )
                 #--------------------------------------------------------------------------------------
+                # jacobian evaluation method: full (lsoda) or sparse (bdf with column-grouped finite differences)
+                elif key == 'jacobian':
+                    if len(word)-1 < 1 or word[1] not in ['full', 'sparse']:
+                        print('****ERROR: \'jacobian\' card should have one value after the keyword: full or sparse.')
+                        sys.exit()
+                    inp['jacobian'] = word[1]
+                #--------------------------------------------------------------------------------------
                 # thermal-hydraulic junction (dependent)
                 elif key == 'jun':
                      inp['junction']['from'].append(word[1])
@@ -394,11 +800,42 @@ class Control:
                      inp['junction']['pumphead'].append(word[3])
                      inp['junction']['flowrate'].append('')
                 #--------------------------------------------------------------------------------------
+                # backend of kernels of the right-hand-side physics: python or numba (compiled, python if numba is not installed)
+                elif key == 'kernel':
+                    if len(word)-1 < 1 or word[1] not in ['python', 'numba']:
+                        print('****ERROR: \'kernel\' card should have one value after the keyword: python or numba.')
+                        sys.exit()
+                    inp['kernel'] = word[1]
+                #--------------------------------------------------------------------------------------
                 # lookup table
                 elif key == 'lookup':
+                     # number of signal ids: input signals followed by the output signal
+                     nid = len(word) - 1
+                     for i in range(1, len(word)):
+                         if not isinstance(word[i], str):
+                             nid = i - 1
+                             break
                      lookup = {}
-                     lookup['x'] = word[1::2]
-                     lookup['f(x)'] = word[2::2]
+                     if nid == 2:
+                         # 1-D table: input signal id, output signal id and pairs of input and output values
+                         lookup['x'] = word[1::2]
+                         lookup['f(x)'] = word[2::2]
+                     elif nid in [3, 4]:
+                         # 2-D and 3-D tables: input signal ids, output signal id, numbers of grid values of inputs, grid values
+                         # of every input and output values at grid points with the last input varying fastest
+                         ndim = nid - 1
+                         size = word[nid+1:nid+1+ndim]
+                         if len(size) < ndim or any([not isinstance(n, float) or n != int(n) or n < 2 for n in size]):
+                             print('****ERROR: \'lookup\' card ' + word[nid] + ' should have ' + str(ndim) + ' integer numbers (>= 2) of grid values of input signals after the signal ids.')
+                             sys.exit()
+                         i = nid + 1 + ndim
+                         for k, key in enumerate(['x', 'y', 'z'][:ndim]):
+                             lookup[key] = [word[1+k]] + word[i:i+int(size[k])]
+                             i += int(size[k])
+                         lookup['f(x)'] = [word[nid]] + word[i:]
+                     else:
+                         print('****ERROR: \'lookup\' card should have one, two or three input signal ids and an output signal id followed by values.')
+                         sys.exit()
                      inp['lookup'].append(lookup)
                 #--------------------------------------------------------------------------------------
                 # material
@@ -419,19 +856,52 @@ class Control:
                         sys.exit()
                     
                     mixid = word[1]
-                    if any([mixid in x['mixid'] for x in inp['mix']]):
-                        for x in inp['mix']:
-                            if x['mixid'] == mixid:
-                                x['isoid'].append(word[2])
-                                x['numdens'].append(float(word[3]))
-                                x['signaltemp'].append(word[4])
+                    if mixid in merged['mix']:
+                        x = merged['mix'][mixid]
+                        x['isoid'].append(word[2])
+                        x['numdens'].append(float(word[3]))
+                        x['signaltemp'].append(word[4])
                     else:
                         inp['mix'].append({'mixid':mixid, 'isoid':[word[2]], 'numdens':[float(word[3])], 'signaltemp':[word[4]]})
+                        merged['mix'][mixid] = inp['mix'][-1]
+                #--------------------------------------------------------------------------------------
+                # multirate scheme: subsystems advanced by their own integrators exchanging coupling fields at
+                # synchronization points with a time interval and a coupling order (0: coupling fields are kept
+                # constant over the interval, 1: coupling fields are linearly extrapolated from the last two points)
+                elif key == 'multirate':
+                    if len(word)-1 < 2 or not isinstance(word[1], float) or word[1] <= 0 or word[2] not in [0, 1]:
+                        print('****ERROR: \'multirate\' card should have two values after the keyword: time interval between synchronization points (s, positive) and coupling order (0 or 1).')
+                        sys.exit()
+                    inp['multirate'] = {'dtsync':word[1], 'order':int(word[2])}
                 #--------------------------------------------------------------------------------------
                 # nuclear data directory
                 elif key == 'nddir':
                     inp['nddir'] = word[1]
                 #--------------------------------------------------------------------------------------
+                # output of a group (signal, fluid, fuelrod, htstr or core): selection of a variable of objects (names matched by
+                # patterns with * and ?) in nodes from first to last, optionally reduced to their minimum, maximum or mean, or the
+                # output stride of the group
+                elif key == 'output':
+                    usage = '****ERROR: \'output\' card should be: output GROUP VARIABLE [OBJECT [FIRST [LAST]]] [min|max|mean] or output GROUP stride N, where GROUP is signal, fluid, fuelrod, htstr or core, e.g.:\noutput fuelrod tempc FR1 1 10 max'
+                    if len(word) < 3 or word[1] not in ['signal', 'fluid', 'fuelrod', 'htstr', 'core']:
+                        print(usage)
+                        sys.exit()
+                    if word[2] == 'stride':
+                        if len(word) != 4 or not isinstance(word[3], float) or word[3] < 1 or word[3] != int(word[3]):
+                            print(usage)
+                            sys.exit()
+                        inp['output']['stride'][word[1]] = int(word[3])
+                    else:
+                        x = word[2:]
+                        reduction = x.pop() if x[-1] in ['min', 'max', 'mean'] else None
+                        if len(x) == 0 or len(x) > 4 or not all([isinstance(w, str) for w in x[:2]]) or not all([isinstance(w, float) and w >= 1 and w == int(w) for w in x[2:]]):
+                            print(usage)
+                            sys.exit()
+                        x += ['*'] if len(x) == 1 else []
+                        first = int(x[2]) if len(x) > 2 else None
+                        last = int(x[3]) if len(x) > 3 else first
+                        inp['output']['select'].append({'group':word[1], 'variable':x[0], 'object':x[1], 'first':first, 'last':last, 'reduction':reduction})
+                #--------------------------------------------------------------------------------------
                 # thermal-hydraulic pipe without free level
                 elif key == 'pipe':
                     inp['pipe'].append( {'id':word[1], 'type':'normal', 'matid':word[2], 'dhyd':word[3], 'len':word[4], 'dir':word[5], 'areaz':word[6], 'nnodes':int(word[7]), 'signaltemp':''} )
@@ -448,6 +918,14 @@ class Control:
                 elif key == 'power0':
                     inp['power0'] = float(word[1])
                 #--------------------------------------------------------------------------------------
+                # profiling of the right-hand-side composition and integrator statistics for every output interval
+                elif key == 'profile':
+                    inp['profile'] = True
+                #--------------------------------------------------------------------------------------
+                # restart from the latest checkpoint appending to its output files
+                elif key == 'restart':
+                    inp['restart'] = True
+                #--------------------------------------------------------------------------------------
                 # signal variable
                 elif key == 'signal':
                     if len(word) == 2:
@@ -459,7 +937,7 @@ class Control:
                 elif key == 'solve':
                     inp['solve'].append(word[1])
                     # verify that solve card has correct value
-                    correct_values = {'fluid','fuelgrain','fuelrod','htstr','pointkinetics','spatialkinetics'}
+                    correct_values = {'fluid','fuelgrain','fuelrod','htstr','pointkinetics','spatialkinetics','steady'}
                     value = set([word[1]])
                     diff = value.difference(correct_values)
                     if diff != set():
@@ -487,6 +965,13 @@ class Control:
                             sys.exit()
                         # method indicator
                         inp['nmeth'] = word[3]
+                    if word[1] == 'steady':
+                        # optional tolerance of the residual norm and maximum number of Newton iterations
+                        if not all([isinstance(x, float) and x > 0 for x in word[2:4]]):
+                            print('****ERROR: solve steady card can have two positive values after the keyword: tolerance of the residual norm of the steady state (1/s) and maximum number of Newton iterations, e.g.:\nsolve steady 1e-6 50')
+                            sys.exit()
+                        if len(word) > 2: inp['steady']['ftol'] = word[2]
+                        if len(word) > 3: inp['steady']['maxiter'] = int(word[3])
                 #--------------------------------------------------------------------------------------
                 # stack of mixes of isotopes
                 elif key == 'stack':
@@ -495,14 +980,28 @@ class Control:
                         sys.exit()
                     
                     stackid = word[1]
-                    if any([stackid in x['stackid'] for x in inp['stack']]):
-                        for x in inp['stack']:
-                            if x['stackid'] == stackid:
-                                x['mixid'].append(word[2])
-                                x['pipeid'].append(word[3])
-                                x['pipenode'].append(int(word[4]))
+                    if stackid in merged['stack']:
+                        x = merged['stack'][stackid]
+                        x['mixid'].append(word[2])
+                        x['pipeid'].append(word[3])
+                        x['pipenode'].append(int(word[4]))
                     else:
                         inp['stack'].append({'stackid':stackid, 'mixid':[word[2]], 'pipeid':[word[3]], 'pipenode':[int(word[4])]})
+                        merged['stack'][stackid] = inp['stack'][-1]
+                #--------------------------------------------------------------------------------------
+                # output store: text files (default) or binary stores of output groups, optionally compressed by zlib
+                elif key == 'store':
+                    if len(word) < 2 or word[1] not in ['text', 'binary'] or word[2:] not in [[], ['zlib']] or (word[1] == 'text' and len(word) > 2):
+                        print('****ERROR: \'store\' card should be: store text, store binary or store binary zlib.')
+                        sys.exit()
+                    inp['store'] = {'type':word[1], 'compress':len(word) > 2}
+                #--------------------------------------------------------------------------------------
+                # integrator of the subsystem of the multirate scheme: jacobian evaluation method and tolerances
+                elif key == 'subsystem':
+                    if len(word)-1 < 4 or word[1] not in ['fluid', 'solid', 'fuelgrain', 'core'] or word[2] not in ['full', 'sparse']:
+                        print('****ERROR: \'subsystem\' card should have four values after the keyword: subsystem (fluid, solid, fuelgrain or core), jacobian evaluation method (full or sparse), relative and absolute tolerances.')
+                        sys.exit()
+                    inp['subsystem'].append( {'id':word[1], 'jacobian':word[2], 'tol':(word[3],word[4])} )
                 #--------------------------------------------------------------------------------------
                 # integration starting time
                 elif key == 't0':
@@ -512,6 +1011,14 @@ class Control:
                 elif key == 't_dt':
                     inp['t_dt'].append([word[1], word[2]])
                 #--------------------------------------------------------------------------------------
+                # telemetry: local endpoint (unix:PATH or tcp:PORT) publishing signals (all if none is given) and integrator
+                # statistics at every output time
+                elif key == 'telemetry':
+                    if len(word) < 2 or not isinstance(word[1], str) or not (word[1].startswith('unix:') and len(word[1]) > 5 or word[1].startswith('tcp:') and word[1][4:].isdigit()):
+                        print('****ERROR: \'telemetry\' card should have the endpoint unix:PATH or tcp:PORT (localhost) followed by ids of published signals (all signals if none is given), e.g.:\ntelemetry tcp:5555 TIME TF')
+                        sys.exit()
+                    inp['telemetry'] = {'address':word[1], 'signal':word[2:]}
+                #--------------------------------------------------------------------------------------
                 # thermal boundary conditions]
                 elif key == 'thermbc':
                     if len(word)-1 < 3:
@@ -553,11 +1060,17 @@ class Control:
                 # tolerances (relative and absolute)
                 elif key == 'tol':
                     inp['tol'] = (word[1],word[2])
-    
-        # verify that t_dt present
-        if inp['t_dt'] == []:
-            sys.exit('****ERROR: obligatory card t_dt specifying time_end and dtime_out is absent.')
-            sys.exit()
+                #--------------------------------------------------------------------------------------
+                # writer of output files: the main thread (sync, default) or a background thread taking snapshots from a
+                # queue of the given size (async)
+                elif key == 'writer':
+                    if len(word) < 2 or word[1] not in ['sync', 'async'] or len(word) > 3 or (len(word) == 3 and (word[1] == 'sync' or not isinstance(word[2], float) or word[2] < 1)):
+                        print('****ERROR: \'writer\' card should be: writer sync or writer async [queue size], e.g.:\nwriter async 16')
+                        sys.exit()
+                    inp['writer'] = {'type':word[1], 'queue':int(word[2]) if len(word) == 3 else 16}
+
+        # input data given directly (copied, so that models constructed from the same data do not share them)
+        inp.update(copy.deepcopy(data))
     
         # verify that there is at least one solve card
         if len(inp['solve']) == 0:
@@ -571,177 +1084,294 @@ class Control:
         inp['signalid'] = [x['id'] for x in inp['signal']]
         # verify that lookup tables use existing signals
         for table in inp['lookup']:
-            insignal = table['x'][0]
             outsignal = table['f(x)'][0]
-            if insignal not in inp['signalid']:
-                print('****ERROR: input signal ' + insignal + ' in lookup table ' + outsignal + ' is not defined.')
-                sys.exit()
+            for insignal in [table[key][0] for key in ['x', 'y', 'z'] if key in table]:
+                if insignal not in inp['signalid']:
+                    print('****ERROR: input signal ' + insignal + ' in lookup table ' + outsignal + ' is not defined.')
+                    sys.exit()
         # append output signals of lookup tables
         inp['signalid'] += [y['f(x)'][0] for y in inp['lookup']]
+        # verify that events use existing signals and append event signals
+        for event in inp['event']:
+            if event['signal'] not in inp['signalid']:
+                print('****ERROR: signal ' + event['signal'] + ' of event ' + event['id'] + ' is not defined.')
+                sys.exit()
+            if event['id'] in inp['signalid']:
+                print('****ERROR: event signal ' + event['id'] + ' is already defined.')
+                sys.exit()
+            inp['signalid'].append(event['id'])
     
         # verify that mix card uses existing signals
         for s in [x['signaltemp'][j] for x in inp['mix'] for j in range(len(x['signaltemp']))]:
             if s not in inp['signalid']:
                 print('****ERROR: signal for temperature ' + s + ' in mix card is not defined.')
                 sys.exit()
-    
-        fid = open('input.json', 'w')
-        fid.write(json.dumps(inp, indent=2))
-        fid.close()
+        # verify that telemetry publishes existing signals (all signals if none is given)
+        if inp['telemetry'] is not None:
+            for s in inp['telemetry']['signal']:
+                if s not in inp['signalid']:
+                    print('****ERROR: signal ' + str(s) + ' of telemetry card is not defined.')
+                    sys.exit()
+            if len(inp['telemetry']['signal']) == 0:
+                inp['telemetry']['signal'] = list(inp['signalid'])
         return inp
 
     #----------------------------------------------------------------------------------------------
     def open_output_files(self, reactor):
 
-        # prepare an output folder
-        path4results = 'output'
-        if os.path.isfile(path4results): os.remove(path4results)
-        if not os.path.isdir(path4results): os.mkdir(path4results)
-        path4results += os.sep + str(datetime.datetime.now())[0:21].replace(' ','-').replace(':','-').replace('.','-')
-        if os.path.isfile(path4results): os.remove(path4results)
-        if not os.path.isdir(path4results): os.mkdir(path4results)
-
-        # copy input files to output folder
-        shutil.copyfile('input', path4results + os.sep + 'input')
-        shutil.copyfile('input.json', path4results + os.sep + 'input.json')
-        # open files for output
-        fid = []
+        if self.input['restart']:
+            # continue in the output folder of the checkpoint
+            path4results = self.checkpoint['path']
+            # write input deck of the restart to output folder
+            if self.deck is not None:
+                f = open(path4results + os.sep + 'input-restart', 'w')
+                f.write(self.deck)
+                f.close()
+        else:
+            # prepare an output folder
+            path4results = 'output'
+            if os.path.isfile(path4results): os.remove(path4results)
+            if not os.path.isdir(path4results): os.mkdir(path4results)
+            path4results += os.sep + str(datetime.datetime.now())[0:21].replace(' ','-').replace(':','-').replace('.','-')
+            if os.path.isfile(path4results): os.remove(path4results)
+            if not os.path.isdir(path4results): os.mkdir(path4results)
+
+            # write input deck and input data to output folder
+            if self.deck is not None:
+                f = open(path4results + os.sep + 'input', 'w')
+                f.write(self.deck)
+                f.close()
+            f = open(path4results + os.sep + 'input.json', 'w')
+            f.write(json.dumps(self.input, indent=2))
+            f.close()
+        self.path4results = path4results
+
+        # open an output file: a new one or, on restart, the existing one cut at its checkpoint offset and opened
+        # at the beginning, so that the header written below overwrites the identical header of the file
+        def offset(name):
+            if name not in self.checkpoint['offset']:
+                print('****ERROR: output file ' + name + ' is not in the checkpoint: the input is not compatible with the restarted transient.')
+                sys.exit()
+            return self.checkpoint['offset'][name]
+        def open_file(name):
+            path = path4results + os.sep + name
+            if not self.input['restart']:
+                return open(path, 'w')
+            os.truncate(path, offset(name))
+            return open(path, 'r+')
+
+        # tabular output files: group, file name, header, column names, function returning the values of columns at the
+        # current time (a row of the file is time followed by the values) and the variable, the object id and the node number
+        # (from 1, None if the variable has no nodes) of every column selected by output cards
+        self.table = []
+        def add(group, file, columns, value, variable, object, node = None, header = None):
+            if header is None:
+                header = ' ' + 'time(s)'.ljust(13) + ''.join([c.ljust(13) for c in columns]) + '\n'
+            n = len(columns)
+            self.table.append({'group':group, 'file':file, 'header':header, 'columns':columns, 'value':value, 'variable':variable if isinstance(variable, list) else [variable]*n, 'object':object if isinstance(object, list) else [object]*n, 'node':node if isinstance(node, list) else [node]*n})
+
         if 'signal' in self.input:
-            fid.append(open(path4results + os.sep + 'signal.dat', 'w'))
-            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join( [(self.input['signal'][j]['id']).ljust(13) for j in range(len(self.input['signal']))] + [table['f(x)'][0].ljust(13) for table in self.input['lookup']] ) + '\n')
+            add('signal', 'signal.dat', self.input['signalid'], lambda: list(self.signal.values()), list(self.input['signalid']), '')
         if 'fluid' in reactor.solve:
-            fid.append(open(path4results + os.sep + 'fluid-mdot.dat', 'w'))
-            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([(self.input['junction']['from'][j] +'-' + self.input['junction']['to'][j]).ljust(13) for j in range(reactor.fluid.njuni + reactor.fluid.njund)]) + '\n')
-            for i in range(reactor.fluid.npipe):
-                fid.append(open(path4results + os.sep + 'fluid-p-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-temp-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-vel-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-re-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-pr-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-pe-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-            fid.append(open(path4results + os.sep + 'fluid-len.dat', 'w'))
-            s = ''
-            for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'freelevel':
-                    s += str(reactor.fluid.pipeid[i]).ljust(13)
-            fid[-1].write(' ' + 'time(s)'.ljust(13) + s + '\n')
+            fluid = reactor.fluid
+            junction = [self.input['junction']['from'][j] + '-' + self.input['junction']['to'][j] for j in range(fluid.njuni + fluid.njund)]
+            add('fluid', 'fluid-mdot.dat', junction, lambda: fluid.mdot[:fluid.njuni + fluid.njund], 'mdot', junction)
+            for i in range(fluid.npipe):
+                nodes = [str(j).zfill(4) for j in range(fluid.pipennodes[i])]
+                for name in ['p', 'temp', 'vel', 're', 'pr', 'pe']:
+                    add('fluid', 'fluid-' + name + '-' + fluid.pipeid[i] + '.dat', nodes, lambda name = name, i = i: getattr(fluid, name)[i][:fluid.pipennodes[i]], name, fluid.pipeid[i], list(range(1, fluid.pipennodes[i] + 1)))
+            ilen = [i for i in range(fluid.npipe) if fluid.pipetype[i] == 'freelevel']
+            add('fluid', 'fluid-len.dat', [str(fluid.pipeid[i]) for i in ilen], lambda: [fluid.len[i] for i in ilen], 'len', [fluid.pipeid[i] for i in ilen])
         if 'fuelrod' in reactor.solve:
             for i in range(reactor.solid.nfuelrods):
-                fid.append(open(path4results + os.sep + 'fuelrod-hgap-' + [x['id'] for x in self.input['fuelrod']][i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('hgap-' + str(j).zfill(3)).ljust(13) for j in range(reactor.solid.fuelrod[i].nz)]) + '\n')
-                for j in range(reactor.solid.fuelrod[i].nz):
-                    fid.append(open(path4results + os.sep + 'fuelrod-temp-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j+1).zfill(3) + '.dat', 'w'))
-                    fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('tempf-' + str(k).zfill(3) + '(K)').ljust(13) for k in range(reactor.solid.fuelrod[i].fuel[j].nr)]) + ''.join([('tempc-' + str(k).zfill(3) + '(K)').ljust(13) for k in range(reactor.solid.fuelrod[i].clad[j].nr)]) + '\n')
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        if 'fuelgrain' in reactor.solve and i + j + k == 0: 
-                            fid.append(open(path4results + os.sep + 'fuelrod-c1-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
-                            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('c1-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-ri-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
-                            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('ri-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-cv_irr-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
-                            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('cv_irr-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-ci_irr-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
-                            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('ci_irr-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-cv_p-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
-                            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('cv_p-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-bi-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
-                            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('bi-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
+                fuelrod = reactor.solid.fuelrod[i]
+                id = self.input['fuelrod'][i]['id']
+                add('fuelrod', 'fuelrod-hgap-' + id + '.dat', ['hgap-' + str(j).zfill(3) for j in range(fuelrod.nz)], lambda fuelrod = fuelrod: fuelrod.innergas.hgap[:fuelrod.nz], 'hgap', id, list(range(1, fuelrod.nz + 1)))
+                for j in range(fuelrod.nz):
+                    fuel, clad = fuelrod.fuel[j], fuelrod.clad[j]
+                    # nodes of fuel and cladding temperatures are axial layers
+                    add('fuelrod', 'fuelrod-temp-' + id + '-' + str(j+1).zfill(3) + '.dat', ['tempf-' + str(k).zfill(3) + '(K)' for k in range(fuel.nr)] + ['tempc-' + str(k).zfill(3) + '(K)' for k in range(clad.nr)], lambda fuel = fuel, clad = clad: numpy.concatenate((fuel.temp[:fuel.nr], clad.temp[:clad.nr])), ['tempf']*fuel.nr + ['tempc']*clad.nr, id, j+1)
+                    for k in range(fuel.nr):
+                        if 'fuelgrain' in reactor.solve and i + j + k == 0:
+                            fuelgrain = fuel.fuelgrain[k]
+                            suffix = '-' + id + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat'
+                            add('fuelrod', 'fuelrod-c1' + suffix, ['c1-' + str(l).zfill(3) for l in range(fuelgrain.nr)], lambda fuelgrain = fuelgrain: fuelgrain.c1[:fuelgrain.nr], 'c1', id, list(range(1, fuelgrain.nr + 1)))
+                            for name in ['ri', 'cv_irr', 'ci_irr', 'cv_p', 'bi']:
+                                add('fuelrod', 'fuelrod-' + name + suffix, [name + '-' + str(l).zfill(3) for l in range(fuelgrain.NB)], lambda fuelgrain = fuelgrain, name = name: getattr(fuelgrain, name)[:fuelgrain.NB], name, id, list(range(1, fuelgrain.NB + 1)))
         if 'htstr' in reactor.solve:
             for i in range(reactor.solid.nhtstr):
-                fid.append(open(path4results + os.sep + 'htstr-temp-' + [x['id'] for x in self.input['htstr']][i] + '.dat', 'w'))
-                fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('temp-' + str(j).zfill(3)).ljust(13) for j in range(reactor.solid.htstr[i].nr)]) + '\n')
+                htstr = reactor.solid.htstr[i]
+                add('htstr', 'htstr-temp-' + self.input['htstr'][i]['id'] + '.dat', ['temp-' + str(j).zfill(3) for j in range(htstr.nr)], lambda htstr = htstr: htstr.temp[:htstr.nr], 'temp', self.input['htstr'][i]['id'], list(range(1, htstr.nr + 1)))
         if 'pointkinetics' in reactor.solve:
-            fid.append(open(path4results + os.sep + 'core-power.dat', 'w'))
-            fid[-1].write(' ' + 'time(s)'.ljust(13) + 'power(-)\n')
-            fid.append(open(path4results + os.sep + 'core-cdnp.dat', 'w'))
-            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('cdnp-' + str(i)).ljust(13) for i in range(reactor.core.ndnp)]) + '\n')
+            core = reactor.core
+            add('core', 'core-power.dat', ['power(-)'], lambda: [core.power], 'power', '', header = ' ' + 'time(s)'.ljust(13) + 'power(-)\n')
+            add('core', 'core-cdnp.dat', ['cdnp-' + str(i) for i in range(core.ndnp)], lambda: core.cdnp[:core.ndnp], 'cdnp', '', list(range(1, core.ndnp + 1)))
+        # columns and files selected by output cards
+        self.table = self.select_output(self.table)
+        # numbers of output steps of groups (continued from the checkpoint on restart)
+        self.outputstep = {x['group']:0 for x in self.table}
+        if self.input['restart']:
+            self.outputstep.update(self.checkpoint.get('outputstep', {}))
+
+        # open files for output: a text file per tabular output file or a binary store per group
+        fid = []
+        if self.input['store']['type'] == 'text':
+            for x in self.table:
+                x['fid'] = open_file(x['file'])
+                x['fid'].write(x['header'])
+                x['format'] = '{:12.5e} '*(1 + len(x['columns'])) + '\n'
+                fid.append(x['fid'])
+        else:
+            self.store = {}
+            for x in self.table:
+                self.store.setdefault(x['group'], []).append(x)
+            for group, files in self.store.items():
+                path = path4results + os.sep + group
+                fid.append(Store(path, files, self.input['store']['compress'], offset(group + '.bin') if self.input['restart'] else None))
+                self.store[group] = (fid[-1], [self.table.index(x) for x in files])
+        # text output files of spatial kinetics
+        self.ifidcore = len(fid)
         if 'spatialkinetics' in reactor.solve:
             for i in range(reactor.core.niso):
-                fid.append(open(path4results + os.sep + 'core-iso-microxs-' + reactor.core.isoname[i] + '.dat', 'w'))
+                fid.append(open_file('core-iso-microxs-' + reactor.core.isoname[i] + '.dat'))
             for i in range(reactor.core.nmix):
-                fid.append(open(path4results + os.sep + 'core-mix-macroxs-' + reactor.core.mix[i].mixid + '.dat', 'w'))
-            fid.append(open(path4results + os.sep + 'core-k.dat', 'w'))
+                fid.append(open_file('core-mix-macroxs-' + reactor.core.mix[i].mixid + '.dat'))
+            fid.append(open_file('core-k.dat'))
             fid[-1].write(' ' + 'niter'.ljust(13) + 'k'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-flux.dat', 'w'))
+            fid.append(open_file('core-flux.dat'))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'igroup'.ljust(13) + 'iz'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'flux'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-pow.dat', 'w'))
+            fid.append(open_file('core-pow.dat'))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'iz'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'pow'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-powxy.dat', 'w'))
+            fid.append(open_file('core-powxy.dat'))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'pow'.ljust(13) + '\n')
+        if self.input['profile']:
+            # profile: wall time, calls and time of profiled methods, integrator statistics (of every subsystem in the multirate scheme)
+            self.profilestat = ['nfev', 'njev', 'nstep', 'h']
+            if self.input['multirate']:
+                self.profilestat = [name + '-' + x for name in self.subsystem for x in self.profilestat]
+            self.fidprofile = open_file('profile.dat')
+            fid.append(self.fidprofile)
+            names = ['wall(s)'] + [name + x for name in self.profile for x in ['-n', '-t(s)']] + self.profilestat
+            fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([name.ljust(max(13, len(name)+1)) for name in names]) + '\n')
+        if self.input['restart']:
+            # append to the existing output files (binary stores are opened at their ends)
+            for f in fid:
+                if not isinstance(f, Store):
+                    f.seek(0, os.SEEK_END)
+        if self.input['writer']['type'] == 'async':
+            self.writer = Writer(self.write_rows, self.input['writer']['queue'])
         return fid
 
+    #----------------------------------------------------------------------------------------------
+    # return the table of tabular output files selected by output cards: a column is kept if an output card without reduction
+    # selects it (files without kept columns are dropped), an output card with a reduction adds the column of the minimum,
+    # maximum or mean of the columns it selects to the file <group>-reduced.dat. Without output cards selecting columns the
+    # table is returned as it is: self is a 'control' object created in B
+    def select_output(self, table):
+
+        cards = self.input['output']['select']
+        if len(cards) == 0:
+            return table
+
+        function = {'min':numpy.min, 'max':numpy.max, 'mean':numpy.mean}
+        kept = [set() for x in table]
+        reduced = {}
+        for card in cards:
+            # columns selected by the card: (file index, array of column indexes)
+            selected = []
+            for k, x in enumerate(table):
+                if x['group'] == card['group']:
+                    c = [c for c in range(len(x['columns'])) if fnmatch.fnmatchcase(x['variable'][c], card['variable']) and fnmatch.fnmatchcase(x['object'][c], card['object'])
+                         and (x['node'][c] is None or card['first'] is None or card['first'] <= x['node'][c] <= card['last'])]
+                    if len(c) > 0:
+                        selected.append((k, numpy.array(c)))
+            if len(selected) == 0:
+                print('****ERROR: \'output\' card ' + ' '.join([card['group'], card['variable'], card['object']]) + ' does not select any output variable.')
+                sys.exit()
+            if card['reduction'] is None:
+                for k, c in selected:
+                    kept[k].update(c)
+            else:
+                name = '-'.join([card['reduction'], card['variable'], card['object']] + ([str(card['first']), str(card['last'])] if card['first'] is not None else []))
+                reduced.setdefault(card['group'], []).append((name, function[card['reduction']], [(table[k]['value'], c) for k, c in selected]))
+
+        selection = []
+        for k, x in enumerate(table):
+            c = sorted(kept[k])
+            if len(c) == 0:
+                continue
+            if len(c) < len(x['columns']):
+                x = dict(x)
+                x['value'] = lambda value = x['value'], c = numpy.array(c): numpy.asarray(value(), dtype = float)[c]
+                for key in ['columns', 'variable', 'object', 'node']:
+                    x[key] = [x[key][i] for i in c]
+                x['header'] = ' ' + 'time(s)'.ljust(13) + ''.join([name.ljust(13) for name in x['columns']]) + '\n'
+            selection.append(x)
+        for group, columns in reduced.items():
+            names = [name for name, f, sources in columns]
+            def value(columns = columns):
+                return [f(numpy.concatenate([numpy.asarray(v(), dtype = float)[c] for v, c in sources])) for name, f, sources in columns]
+            selection.append({'group':group, 'file':group + '-reduced.dat', 'header':' ' + 'time(s)'.ljust(13) + ''.join([name.ljust(max(13, len(name)+1)) for name in names]) + '\n',
+                              'columns':names, 'value':value, 'variable':names, 'object':['']*len(names), 'node':[None]*len(names)})
+        return selection
+
+    #----------------------------------------------------------------------------------------------
+    def construct_profiler(self, reactor):
+
+        # PROFILING: profiled methods of objects are replaced by wrappers counting calls and accumulating time (including
+        # nested profiled calls) in self.profile[name] = [calls, time] over the output interval
+        self.profile = {}
+        self.ticprofile = time.time()
+
+        def wrap(name, owner, method):
+            function = getattr(owner, method)
+            self.profile[name] = [0, 0.]
+            def wrapper(*args):
+                tic = time.perf_counter()
+                result = function(*args)
+                record = self.profile[name]
+                record[0] += 1
+                record[1] += time.perf_counter() - tic
+                return result
+            setattr(owner, method, wrapper)
+
+        wrap('Control.read_from_y', self, 'read_from_y')
+        wrap('Control.evaluate_signals', self, 'evaluate_signals')
+        wrap('Fluid.calculate_rhs', reactor.fluid, 'calculate_rhs')
+        wrap('Solid.compose_rhs', reactor.solid, 'compose_rhs')
+        wrap('Core.calculate_rhs', reactor.core, 'calculate_rhs')
+        wrap('Data.matpro', reactor.data, 'matpro')
+
+    #----------------------------------------------------------------------------------------------
+    def print_profile(self, solver, t):
+
+        # print profile of the output interval ending at t and reset counters
+        tac = time.time()
+        line = '{0:12.5e} '.format(t) + '{0:12.5e} '.format(tac - self.ticprofile)
+        for name in self.profile:
+            line += '{0:12d} '.format(self.profile[name][0]).ljust(max(13, len(name)+3))
+            line += '{0:12.5e} '.format(self.profile[name][1]).ljust(max(13, len(name)+6))
+            self.profile[name] = [0, 0.]
+        stat = solver.statistics()
+        for name in self.profilestat:
+            line += ('{0:12d} ' if isinstance(stat[name], (int, numpy.integer)) else '{0:12.5e} ').format(stat[name]).ljust(max(13, len(name)+1))
+        self.fidprofile.write(line + '\n')
+        self.ticprofile = tac
+
     #----------------------------------------------------------------------------------------------
     def print_output_files(self, reactor, fid, time, flag):
 
-        # print output files
-        indx = 0
-        if 'signal' in self.input:
-            # signals
-            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.control.signal[j]) for j in reactor.control.signal]) + '\n')
-            indx += 1
-        if 'fluid' in reactor.solve:
-            # flowrate in dependent and independent junctions (no internal junctions)
-            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.mdot[i]) for i in range(reactor.fluid.njuni + reactor.fluid.njund)]) + '\n')
-            indx += 1
-            for i in range(reactor.fluid.npipe):
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.p[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.temp[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.vel[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.re[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.pr[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.pe[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                indx += 1
-            s = ''
-            for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'freelevel':
-                    s += '{0:12.5e} '.format(reactor.fluid.len[i])
-            fid[indx].write('{0:12.5e} '.format(time) + s + '\n')
-            indx += 1
-        if 'fuelrod' in reactor.solve:
-            for i in range(reactor.solid.nfuelrods):
-                # gas gap conductance
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].innergas.hgap[j]) for j in range(reactor.solid.fuelrod[i].nz)]) + '\n')
-                indx += 1
-                # fuel and clad temperatures
-                for j in range(reactor.solid.fuelrod[i].nz):
-                    fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].temp[k]) for k in range(reactor.solid.fuelrod[i].fuel[j].nr)]) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].clad[j].temp[k]) for k in range(reactor.solid.fuelrod[i].clad[j].nr)]) + '\n')
-                    indx += 1
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        if 'fuelgrain' in reactor.solve and i + j + k == 0: 
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr)]) + '\n')
-                            indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ri[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            indx += 1
-        if 'htstr' in reactor.solve:
-            for i in range(reactor.solid.nhtstr):
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.htstr[i].temp[k]) for k in range(reactor.solid.htstr[i].nr)]) + '\n')
-                indx += 1
-        if 'pointkinetics' in reactor.solve:
-            # point kinetics power
-            fid[indx].write('{0:12.5e} '.format(time) + '{0:12.5e} '.format(reactor.core.power) + '\n')
-            indx += 1
-            # point kinetics cdnp
-            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.core.cdnp[i]) for i in range(reactor.core.ndnp)]) + '\n')
-            indx += 1
+        # rows of tabular output files of groups at their output steps (None for other files) written by the main thread or
+        # snapshots of them queued for the writer thread
+        due = {group:step % self.input['output']['stride'].get(group, 1) == 0 for group, step in self.outputstep.items()}
+        for group in self.outputstep:
+            self.outputstep[group] += 1
+        rows = [x['value']() if due[x['group']] else None for x in self.table]
+        if self.writer is None:
+            self.write_rows((time, rows))
+        else:
+            self.writer.put((time, [None if row is None else numpy.array(row, dtype = float) for row in rows]))
+        indx = self.ifidcore
         if 'spatialkinetics' in reactor.solve:
             for i in range(reactor.core.niso):
                 if reactor.core.iso[i].print_xs:
@@ -866,135 +1496,401 @@ class Control:
             indx += 1
 
     #----------------------------------------------------------------------------------------------
-    def write_to_y(self, reactor):
+    # write rows of tabular output files at time t given in item (t, rows) as formatted lines of text files or rows of binary
+    # stores of groups: self is a 'control' object created in B
+    def write_rows(self, item):
+
+        t, rows = item
+        if self.input['store']['type'] == 'text':
+            for x, row in zip(self.table, rows):
+                if row is not None:
+                    x['fid'].write(x['format'].format(t, *row))
+        else:
+            for store, indx in self.store.values():
+                if rows[indx[0]] is not None:
+                    store.append(t, [rows[i] for i in indx])
+
+    #----------------------------------------------------------------------------------------------
+    def write_checkpoint(self, reactor, solver, fid):
+
+        # write queued output and flush output files so that their offsets correspond to the time of the checkpoint
+        if self.writer is not None:
+            self.writer.drain()
+        for f in fid:
+            f.flush()
+        checkpoint = {}
+        # solver time and unknowns
+        checkpoint['t'] = solver.t
+        checkpoint['y'] = self.write_to_y(reactor)
+        # integrator internal history
+        checkpoint['integrator'] = solver.get_history()
+        # signal values and values of event signals
+        checkpoint['signal'] = dict(self.signal)
+        checkpoint['event'] = dict(self.eventvalue)
+        # output folder and offsets of output files
+        checkpoint['path'] = self.path4results
+        checkpoint['offset'] = {os.path.basename(f.name):f.tell() for f in fid}
+        checkpoint['outputstep'] = dict(self.outputstep)
+
+        # write to a temporary file and replace the previous checkpoint, so that a crash while writing does not spoil it
+        path = self.path4results + os.sep + 'checkpoint.pkl'
+        f = open(path + '.tmp', 'wb')
+        pickle.dump(checkpoint, f)
+        f.close()
+        os.replace(path + '.tmp', path)
+
+    #----------------------------------------------------------------------------------------------
+    def read_checkpoint(self, reactor):
+
+        # find the latest checkpoint in output folders
+        path = ''
+        if os.path.isdir('output'):
+            for folder in os.listdir('output'):
+                file = 'output' + os.sep + folder + os.sep + 'checkpoint.pkl'
+                if os.path.isfile(file) and (path == '' or os.path.getmtime(file) > os.path.getmtime(path)):
+                    path = file
+        if path == '':
+            print('****ERROR: \'restart\' card is specified but there is no checkpoint in the output folder.')
+            sys.exit()
+        f = open(path, 'rb')
+        self.checkpoint = pickle.load(f)
+        f.close()
+        # the checkpoint output folder may have been moved or renamed
+        self.checkpoint['path'] = os.path.dirname(path)
+
+        if len(self.checkpoint['y']) != len(self.state):
+            print('****ERROR: number of unknowns in the checkpoint (' + str(len(self.checkpoint['y'])) + ') differs from that of the input (' + str(len(self.state)) + ').')
+            sys.exit()
+        print('restart from checkpoint ' + path + ' at time ' + str(self.checkpoint['t']))
+
+        # read unknowns and signals from the checkpoint
+        self.eventvalue.update(self.checkpoint['event'])
+        self.read_from_y(reactor, self.checkpoint['y'])
+        self.evaluate_signals(reactor, self.checkpoint['t'])
+        self.signal.update(self.checkpoint['signal'])
+        return self.checkpoint
+
+    #----------------------------------------------------------------------------------------------
+    def construct_state(self, reactor):
+
+        # STATE LAYOUT: every object gets a contiguous slot (slice) of one preallocated array of unknowns
+        # in the following order: fluid (flowrates in independent junctions, free-level-volume lengths,
+        # temperatures in pipe nodes), fuel rods (fuel grain unknowns, fuel and clad temperatures for every
+        # axial layer), heat structures (temperatures) and point kinetics (power and precursor concentrations)
+        self.slot = {}
+        # list of (key, owner, name): lists of unknowns owner.name (or owner[name]) to be replaced by views
+        views = []
+        n = 0
+
+        def add(key, owner, name, size):
+            nonlocal n
+            self.slot[key] = slice(n, n + size)
+            n += size
+            if owner is not None:
+                views.append((key, owner, name))
 
-        # write list of unknowns to y
-        y = []
         if 'fluid' in reactor.solve:
-            k = 0
-            for j in range(reactor.fluid.njun):
-                if reactor.fluid.juntype[j] == 'independent':
-                    # flowrate in independent junctions
-                    y.append(reactor.fluid.mdoti[k])
-                    k += 1
+            n0 = n
+            # flowrate in independent junctions
+            add(('mdoti',), reactor.fluid, 'mdoti', reactor.fluid.njuni)
+            # free-level-volume length: free-level pipes are scattered over the list of all pipes so that
+            # their lengths are copied by index rather than viewed
+            self.ilen = [i for i in range(reactor.fluid.npipe) if reactor.fluid.pipetype[i] == 'freelevel']
+            add(('len',), None, None, len(self.ilen))
+            # temperature in pipe nodes
+            n1 = n
             for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'freelevel':
-                    # free-level-volume length
-                    y.append(reactor.fluid.len[i])
-            for i in range(reactor.fluid.npipe):
-                for j in range(reactor.fluid.pipennodes[i]):
-                    # temperature in pipe nodes
-                    y.append(reactor.fluid.temp[i][j])
+                add(('temp',i), reactor.fluid.temp, i, reactor.fluid.pipennodes[i])
+            self.slot[('temp',)] = slice(n1, n)
+            self.slot['fluid'] = slice(n0, n)
+
         if 'fuelrod' in reactor.solve:
+            n0 = n
             for i in range(reactor.solid.nfuelrods):
                 for j in range(reactor.solid.fuelrod[i].nz):
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
+                    fuel = reactor.solid.fuelrod[i].fuel[j]
+                    for k in range(fuel.nr):
                         if 'fuelgrain' in reactor.solve and i + j + k == 0: #i+j+k==0 is a temporal condition to solve fuel grain only for one node
+                            n1 = n
                             # fuel grain monoatoms
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[l])
-                            # fuel grain bubble radii
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ri[l])
-                            # fuel grain fractional concentration of irradiation-induced uranium vacancies
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[l])
-                            # fuel grain fractional concentration of irradiation-induced uranium interstitials
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[l])
-                            # fuel grain fractional concentration of uranium vacancies ejected from intragranular as-fabricated pores
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[l])
-                            # fuel grain intragranular bubble concentation
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[l])
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        # fuel temperature
-                        y.append(reactor.solid.fuelrod[i].fuel[j].temp[k])
-                    for k in range(reactor.solid.fuelrod[i].clad[j].nr):
-                        # clad temperature
-                        y.append(reactor.solid.fuelrod[i].clad[j].temp[k])
+                            add(('c1',i,j,k), fuel.fuelgrain[k], 'c1', fuel.fuelgrain[k].nr)
+                            # fuel grain bubble radii, fractional concentrations of irradiation-induced uranium vacancies and
+                            # interstitials, of uranium vacancies ejected from as-fabricated pores and bubble concentrations
+                            for name in ['ri', 'cv_irr', 'ci_irr', 'cv_p', 'bi']:
+                                add((name,i,j,k), fuel.fuelgrain[k], name, fuel.fuelgrain[k].NB)
+                            self.slot[('fuelgrain',i,j,k)] = slice(n1, n)
+                    # fuel temperature
+                    add(('fuel',i,j), fuel, 'temp', fuel.nr)
+                    # clad temperature
+                    add(('clad',i,j), reactor.solid.fuelrod[i].clad[j], 'temp', reactor.solid.fuelrod[i].clad[j].nr)
+            self.slot['fuelrod'] = slice(n0, n)
+
         if 'htstr' in reactor.solve:
+            n0 = n
             for i in range(reactor.solid.nhtstr):
-                for k in range(reactor.solid.htstr[i].nr):
-                    # htstr temperature
-                    y.append(reactor.solid.htstr[i].temp[k])
+                # htstr temperature
+                add(('htstr',i), reactor.solid.htstr[i], 'temp', reactor.solid.htstr[i].nr)
+            self.slot['htstr'] = slice(n0, n)
+
         if 'pointkinetics' in reactor.solve:
-            y.append(reactor.core.power)
-            for i in range(reactor.core.ndnp):
-                y.append(reactor.core.cdnp[i])
-        return y
+            n0 = n
+            add(('power',), reactor.core, 'power', 1)
+            add(('cdnp',), reactor.core, 'cdnp', reactor.core.ndnp)
+            self.slot['pointkinetics'] = slice(n0, n)
+
+        # SUBSYSTEMS of the multirate scheme (each advanced by its own integrator): indexes of unknowns of the fluid,
+        # solid (fuel and clad temperatures, heat structures), fuel grains and core (point kinetics)
+        mask = {name:numpy.zeros(n, dtype=bool) for name in ['fluid', 'solid', 'fuelgrain', 'core']}
+        for key in self.slot:
+            if key == 'fluid':
+                mask['fluid'][self.slot[key]] = True
+            elif key in ['fuelrod', 'htstr']:
+                mask['solid'][self.slot[key]] = True
+            elif key == 'pointkinetics':
+                mask['core'][self.slot[key]] = True
+            elif key[0] == 'fuelgrain':
+                mask['fuelgrain'][self.slot[key]] = True
+        mask['solid'] &= ~mask['fuelgrain']
+        self.subsystem = {name:numpy.flatnonzero(mask[name]) for name in mask if mask[name].any()}
+
+        # preallocated arrays of unknowns and of right-hand sides
+        self.views = views
+        self.view_state(reactor, numpy.zeros(n), numpy.zeros(n))
+
+    #----------------------------------------------------------------------------------------------
+    # make the objects of reactor view the arrays of unknowns state and of right-hand sides rhs (rows of 2-D arrays of an ensemble
+    # or arrays of their own): self is a 'control' object created in B
+    def view_state(self, reactor, state, rhs):
+
+        # copy current values to the array and replace lists of unknowns by views into it
+        for key, owner, name in self.views:
+            view = state[self.slot[key]]
+            view[:] = owner[name] if isinstance(name, int) else getattr(owner, name)
+            if key == ('power',):
+                # scalar unknown: zero-dimensional view
+                view = view.reshape(())
+            if isinstance(name, int):
+                owner[name] = view
+            else:
+                setattr(owner, name, view)
+        self.state = state
+        self.rhs = rhs
+        # the reactor computes right-hand sides of its own: 2-D arrays (reactor, unknown) of one row and the list of reactors
+        # they belong to (see construct_batch)
+        self.states = state.reshape(1, -1)
+        self.rhss = rhs.reshape(1, -1)
+        self.members = [reactor]
+
+    #----------------------------------------------------------------------------------------------
+    # make the reactors of the list members (of the same model structure) view rows of common 2-D arrays (member, unknown) of
+    # unknowns and of right-hand sides, so that the objects of reactor (the first member) compute right-hand sides of all members at
+    # once: self is a 'control' object created in B
+    def construct_batch(self, reactor, members):
+
+        states = numpy.zeros((len(members), len(self.state)))
+        rhss = numpy.zeros((len(members), len(self.state)))
+        for k, member in enumerate(members):
+            member.control.view_state(member, states[k], rhss[k])
+        self.states = states
+        self.rhss = rhss
+        self.members = members
+
+    #----------------------------------------------------------------------------------------------
+    def write_to_y(self, reactor):
+
+        # gather unknowns which are not views of the array of unknowns
+        if 'fluid' in reactor.solve:
+            self.state[self.slot[('len',)]] = reactor.fluid.len[self.ilen]
+        # write array of unknowns to y
+        return self.state.copy()
 
     #----------------------------------------------------------------------------------------------
     def read_from_y(self, reactor, y):
 
-        # read list of unknowns from y
-        indx = 0
+        # read array of unknowns from y: all objects view it
+        numpy.copyto(self.state, y)
+        # scatter unknowns which are not views of the array of unknowns
         if 'fluid' in reactor.solve:
+            reactor.fluid.len[self.ilen] = self.state[self.slot[('len',)]]
+            # fluid properties of the previous temperatures
+            reactor.fluid.propvalid = False
+
+    #----------------------------------------------------------------------------------------------
+    def construct_sparsity(self, reactor):
+
+        # INDEXES OF UNKNOWNS IN Y (slots of the array of unknowns constructed in construct_state)
+        def rng(key):
+            return list(range(self.slot[key].start, self.slot[key].stop))
+        if 'fluid' in reactor.solve:
+            fluid = reactor.fluid
+            # flowrate in independent junctions
+            imdoti = rng(('mdoti',))
+            # free-level-volume length
+            ilen = dict(zip(self.ilen, rng(('len',))))
+            # temperature in pipe nodes
+            itemp = [rng(('temp',i)) for i in range(fluid.npipe)]
+        if 'fuelrod' in reactor.solve:
+            igrain, ifuel, iclad = {}, {}, {}
+            for key in self.slot:
+                if key[0] == 'fuelgrain':
+                    igrain[key[1:]] = rng(key)
+                elif key[0] == 'fuel':
+                    ifuel[key[1:]] = rng(key)
+                elif key[0] == 'clad':
+                    iclad[key[1:]] = rng(key)
+        if 'htstr' in reactor.solve:
+            ihtstr = [rng(('htstr',i)) for i in range(reactor.solid.nhtstr)]
+        if 'pointkinetics' in reactor.solve:
+            ipower = self.slot[('power',)].start
+            icdnp = rng(('cdnp',))
+        n = len(self.state)
+
+        # COLUMNS (UNKNOWNS) WHICH A QUANTITY DEPENDS ON:
+        # signal: follows card values, lookup tables and symbolic expressions
+        def cols_signal(id, visited):
+            cols = set()
+            if id in visited:
+                return cols
+            visited.add(id)
+            for table in self.input['lookup']:
+                if table['f(x)'][0] == id:
+                    for key in ['x', 'y', 'z']:
+                        if key in table:
+                            cols |= cols_signal(table[key][0], visited)
+            for s in self.input['signal']:
+                if s['id'] != id:
+                    continue
+                if s['id'] in self.expression:
+                    # expression: depends on all signals used in it
+                    for sid in self.expression[s['id']][1]:
+                        cols |= cols_signal(sid, visited)
+                elif s['value'][0] in ['dens', 'temp'] and 'fluid' in reactor.solve and s['value'][1] in self.registry['pipe']:
+                    ipipe = self.registry['pipe'][s['value'][1]]
+                    for j in range(fluid.pipennodes[ipipe]):
+                        cols |= cols_temp(ipipe, j, visited)
+                elif s['value'][0] == 'temp' and 'htstr' in reactor.solve and s['value'][1] in self.registry['htstr']:
+                    cols |= set(ihtstr[self.registry['htstr'][s['value'][1]]])
+                elif s['value'][0] in ['tfuel', 'tclad'] and 'fuelrod' in reactor.solve and s['value'][1] in self.registry['fuelrod']:
+                    # conservatively the whole fuel rod, whatever axial layer or radial node is requested
+                    i = self.registry['fuelrod'][s['value'][1]]
+                    for j in range(reactor.solid.fuelrod[i].nz):
+                        cols |= set(ifuel[(i,j)] if s['value'][0] == 'tfuel' else iclad[(i,j)])
+            return cols
+
+        # pipe node temperature: the unknown itself or the signal imposing it
+        def cols_temp(i, j, visited):
+            if fluid.pipetype[i] == 'normal' and fluid.signaltemp[i] != '':
+                return cols_signal(fluid.signaltemp[i], visited)
+            return {itemp[i][j]}
+
+        # row-wise sets of columns (diagonal always included)
+        rows = [set([irow]) for irow in range(n)]
+
+        # FLUID
+        if 'fluid' in reactor.solve:
+            # flowrates in all junctions are linear combinations of flowrates in independent junctions
+            cols_mdot = set()
             k = 0
-            for j in range(reactor.fluid.njun):
-                if reactor.fluid.juntype[j] == 'independent':
-                    if reactor.fluid.junflowrate[j] == '':
-                        # flowrate in independent junctions
-                        reactor.fluid.mdoti[k] = y[indx]
+            for j in range(fluid.njuni + fluid.njund):
+                if fluid.juntype[j] == 'independent':
+                    if fluid.junflowrate[j] != '':
+                        cols_mdot |= cols_signal(fluid.junflowrate[j], set())
+                    else:
+                        cols_mdot.add(imdoti[k])
                     k += 1
-                    indx += 1
-            for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'freelevel':
-                    # free-level-volume length
-                    reactor.fluid.len[i] = y[indx]
-                    indx += 1
-            for i in range(reactor.fluid.npipe):
-                for j in range(reactor.fluid.pipennodes[i]):
-                    # temperature in pipe nodes
-                    reactor.fluid.temp[i][j] = y[indx]
-                    indx += 1
+            # all temperatures and free-level-volume lengths enter gravitational heads of the loop
+            cols_head = set(ilen.values())
+            for i in range(fluid.npipe):
+                for j in range(fluid.pipennodes[i]):
+                    cols_head |= cols_temp(i, j, set())
+            for j in range(fluid.njuni + fluid.njund):
+                if fluid.juntype[j] == 'independent' and fluid.junpumphead[j] != '':
+                    cols_head |= cols_signal(fluid.junpumphead[j], set())
+            # time derivatives of flowrates in independent junctions
+            k = 0
+            for j in range(fluid.njuni + fluid.njund):
+                if fluid.juntype[j] == 'independent':
+                    if fluid.junflowrate[j] == '':
+                        rows[imdoti[k]] |= cols_head
+                    k += 1
+            # time derivatives of free-level-volume lengths
+            for i in ilen:
+                rows[ilen[i]] |= cols_mdot | cols_temp(i, 0, set())
+            # time derivatives of pipe node temperatures
+            for i in range(fluid.npipe):
+                if fluid.signaltemp[i] != '':
+                    continue
+                for j in range(fluid.pipennodes[i]):
+                    irow = itemp[i][j]
+                    rows[irow] |= cols_mdot | cols_temp(i, j, set())
+                    if i in ilen:
+                        rows[irow].add(ilen[i])
+            # neighbouring nodes through junctions
+            for j in range(fluid.njun):
+                f = fluid.f[j]
+                t = fluid.t[j]
+                if fluid.signaltemp[f[0]] == '':
+                    rows[itemp[f[0]][f[1]]] |= cols_temp(t[0], t[1], set())
+                if fluid.signaltemp[t[0]] == '':
+                    rows[itemp[t[0]][t[1]]] |= cols_temp(f[0], f[1], set())
+            # heat exchange with fuel rods (node index as compared in Fluid.map_heat_exchange), conservatively with all layers
+            # cooled by the node
+            if 'fuelrod' in reactor.solve:
+                for i, dictfuelrod in enumerate(self.input['fuelrod']):
+                    for k in range(len(dictfuelrod['pipeid'])):
+                        ipipe = self.registry['pipe'][dictfuelrod['pipeid'][k]]
+                        j = dictfuelrod['pipenode'][k]
+                        if j < fluid.pipennodes[ipipe] and fluid.signaltemp[ipipe] == '':
+                            rows[itemp[ipipe][j]].add(iclad[(i,k)][-1])
+            # heat exchange with heat structures
+            if 'htstr' in reactor.solve:
+                for k in range(reactor.solid.nhtstr):
+                    for bc, inode in [(reactor.solid.htstr[k].bcleft, 0), (reactor.solid.htstr[k].bcright, -1)]:
+                        if bc['type'] == 2:
+                            ipipe = self.registry['pipe'][bc['pipeid']]
+                            if fluid.signaltemp[ipipe] == '':
+                                rows[itemp[ipipe][bc['pipenode']-1]].add(ihtstr[k][inode])
+
+        # FUEL RODS: three-point radial stencils coupled through the gas gap and to the coolant
         if 'fuelrod' in reactor.solve:
-            for i in range(reactor.solid.nfuelrods):
-                for j in range(reactor.solid.fuelrod[i].nz):
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        if 'fuelgrain' in reactor.solve and i + j + k == 0:
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr):
-                                # fuel grain monoatoms
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain bubble radii
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].rb[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain fractional concentration of irradiation-induced uranium vacancies
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain fractional concentration of irradiation-induced uranium interstitials
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain fractional concentration of uranium vacancies ejected from intragranular as-fabricated pores
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain intragranular bubble concentrations
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[l] = y[indx]
-                                indx += 1
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        # fuel temperature
-                        reactor.solid.fuelrod[i].fuel[j].temp[k] = y[indx]
-                        indx += 1
-                    for k in range(reactor.solid.fuelrod[i].clad[j].nr):
-                        # clad temperature
-                        reactor.solid.fuelrod[i].clad[j].temp[k] = y[indx]
-                        indx += 1
+            for (i,j,k) in igrain:
+                for irow in igrain[(i,j,k)]:
+                    rows[irow] |= set(igrain[(i,j,k)])
+            for (i,j) in ifuel:
+                ifu, icl = ifuel[(i,j)], iclad[(i,j)]
+                for k in range(len(ifu)):
+                    rows[ifu[k]] |= set(ifu[max(k-1,0):k+2])
+                rows[ifu[-1]].add(icl[0])
+                for k in range(len(icl)):
+                    rows[icl[k]] |= set(icl[max(k-1,0):k+2])
+                rows[icl[0]].add(ifu[-1])
+                if 'fluid' in reactor.solve:
+                    dictfuelrod = self.input['fuelrod'][i]
+                    ipipe = self.registry['pipe'][dictfuelrod['pipeid'][j]]
+                    rows[icl[-1]] |= cols_mdot | cols_temp(ipipe, dictfuelrod['pipenode'][j]-1, set())
+
+        # HEAT STRUCTURES: three-point radial stencils coupled to the coolant
         if 'htstr' in reactor.solve:
-            for i in range(reactor.solid.nhtstr):
-                for k in range(reactor.solid.htstr[i].nr):
-                    # htstr temperature
-                    reactor.solid.htstr[i].temp[k] = y[indx]
-                    indx += 1
+            for k in range(reactor.solid.nhtstr):
+                iht = ihtstr[k]
+                for kk in range(len(iht)):
+                    rows[iht[kk]] |= set(iht[max(kk-1,0):kk+2])
+                cols_bc = set()
+                for bc in [reactor.solid.htstr[k].bcleft, reactor.solid.htstr[k].bcright]:
+                    if bc['type'] == 2 and 'fluid' in reactor.solve:
+                        cols_bc |= cols_mdot | cols_temp(self.registry['pipe'][bc['pipeid']], bc['pipenode']-1, set())
+                # conservatively both boundary nodes see the coolant of any pipe-type boundary condition
+                rows[iht[0]] |= cols_bc
+                rows[iht[-1]] |= cols_bc
+
+        # POINT KINETICS
         if 'pointkinetics' in reactor.solve:
-            reactor.core.power = y[indx]
-            indx += 1
-            for i in range(reactor.core.ndnp):
-                reactor.core.cdnp[i] = y[indx]
-                indx += 1
+            rows[ipower] |= set([ipower] + icdnp) | cols_signal('RHO_INS', set())
+            for i in range(len(icdnp)):
+                rows[icdnp[i]] |= set([ipower, icdnp[i]])
+
+        # assemble sparse matrix of nonzeros
+        irow = [i for i in range(n) for j in rows[i]]
+        icol = [j for i in range(n) for j in rows[i]]
+        from scipy.sparse import coo_matrix
+        return coo_matrix(([1]*len(irow), (irow, icol)), shape=(n, n)).tocsc()
@@ -1,3 +1,5 @@
+import numpy
+
 #--------------------------------------------------------------------------------------------------
 class HeatStructure:
 
@@ -23,7 +25,7 @@ class HeatStructure:
 
         # find the heat structure material id in the list of materials
         try:
-            ihtstr = [x['id'] for x in reactor.control.input['mat']].index(self.matid)
+            ihtstr = reactor.control.registry['mat'][self.matid]
         except:
             print('****ERROR: heat structure material id ' + self.matid + ' is not specified in the \'mat\' card of input.')
             sys.exit()
@@ -34,7 +36,7 @@ class HeatStructure:
 
         # find the heat structure left thermal boundary condition id in the list of thermal boundary conditions
         try:
-            ihtstr = [x['id'] for x in reactor.control.input['thermbc']].index(self.bcleft)
+            ihtstr = reactor.control.registry['thermbc'][self.bcleft]
         except:
             print('****ERROR: heat structure left thermal boundary condition id ' + self.bcleft + ' is not specified in the \'thermbc\' card of input.')
             sys.exit()
@@ -43,7 +45,7 @@ class HeatStructure:
 
         # find the heat structure right thermal boundary condition id in the list of thermal boundary conditions
         try:
-            ihtstr = [x['id'] for x in reactor.control.input['thermbc']].index(self.bcright)
+            ihtstr = reactor.control.registry['thermbc'][self.bcright]
         except:
             print('****ERROR: heat structure right thermal boundary condition id ' + self.bcright + ' is not specified in the \'thermbc\' card of input.')
             sys.exit()
@@ -56,74 +58,70 @@ class HeatStructure:
         # mesh grid step
         self.dr = (self.ro - self.ri)/(self.nr-1)
         # list of node radii (size = nr)
-        self.r = [self.ri + i*self.dr for i in range(self.nr)]
+        self.r = numpy.array([self.ri + i*self.dr for i in range(self.nr)])
         # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
+        self.rb = numpy.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
         # list of node volume per unit height (size = nr)
-        self.vol = [self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2]
+        self.vol = numpy.array([self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2])
 
     #----------------------------------------------------------------------------------------------
-    # calculate right-hand side list: self is a 'htstr' object created in B1
-    def calculate_rhs(self, reactor, t):
+    # calculate right-hand sides of all twins and write them to the 2-D array of right-hand sides rhs: self is a 'htstr' object created
+    # in B1, indx is the heat structure index
+    def calculate_rhs(self, indx, reactor, t, rhs):
 
-        # HEAT STRUCTURE PROPERTIES:
-        self.prop = {'rho':[], 'cp':[], 'k':[]}
-        for j in range(self.nr):
-            # call material property function
-            pro = reactor.data.matpro( {'type':self.type, 't':self.temp[j]} )
-            # density (kg/m3)
-            self.prop['rho'].append(pro['rho'])
-            # specific heat (J/kg-K)
-            self.prop['cp'].append(pro['cp'])
-            # thermal conductivity (W/m-K)
-            self.prop['k'].append(pro['k'])
+        # temperatures in radial nodes of all twins: view of the 2-D array of unknowns
+        slot = reactor.control.slot
+        temp = reactor.control.states[:, slot[('htstr',indx)]]
 
-        # heat structure thermal conductivity between nodes
-        kb = [0.5*(self.prop['k'][i] + self.prop['k'][i+1]) for i in range(self.nr-1)]
+        # HEAT STRUCTURE PROPERTIES:
+        # call material property function for all radial nodes
+        pro = reactor.data.matpro( {'type':self.type, 't':temp} )
+        # density (kg/m3), specific heat (J/kg-K) and thermal conductivity (W/m-K)
+        self.prop = {'rho':pro['rho'], 'cp':pro['cp'], 'k':pro['k']}
 
         # left boundary condition
         if self.bcleft['type'] == 0:
             Qleft = 2*self.r[0]*self.bcleft['qf']
         elif self.bcleft['type'] == 1:
-            Qleft = 2*self.r[0]*self.bcleft['alfa']*(self.bcleft['temp'] - self.temp[0])
+            Qleft = 2*self.r[0]*self.bcleft['alfa']*(self.bcleft['temp'] - temp[:, 0])
         else: #self.bcleft['type'] == 2
             # pipe node indexes
-            jpipe = (reactor.fluid.pipeid.index(self.bcright['pipeid']), self.bcright['pipenode']-1)
+            jpipe = (reactor.control.registry['pipe'][self.bcright['pipeid']], self.bcright['pipenode']-1)
             fluid = {}
-            fluid['t'] = reactor.fluid.temp[jpipe[0]][jpipe[1]]
-            fluid['type'] = reactor.fluid.type[jpipe[0]]
-            # call material property function
-            pro = reactor.data.matpro( {'type':fluid['type'], 't':fluid['t']} )
-            fluid['pe'] = abs(reactor.fluid.vel[jpipe[0]][jpipe[1]]) * reactor.fluid.dhyd[jpipe[0]] * pro['rhol'] * pro['cpl'] / pro['kl']
+            fluid['t'] = reactor.control.states[:, slot[('temp',jpipe[0])]][:, jpipe[1]]
+            # coolant properties calculated by the fluid for the current temperatures in all pipe nodes
+            reactor.fluid.calculate_properties(reactor)
+            node = reactor.fluid.inode0[jpipe[0]] + jpipe[1]
+            pro = {key:reactor.fluid.batch[key][:, node] for key in ['rhol', 'kl', 'cpl']}
+            fluid['pe'] = abs(reactor.fluid.batch['vel'][:, node]) * reactor.fluid.dhyd[jpipe[0]] * pro['rhol'] * pro['cpl'] / pro['kl']
             fluid['nu'] = reactor.data.nu( {'pe':fluid['pe']} )
             # heat exchange coefficient
             fluid['hex'] = fluid['nu'] * pro['kl'] / reactor.fluid.dhyd[jpipe[0]]
             # heat flux (W/m**2) times heat transfer area per unit height divided by pi from clad to coolant
-            Qleft = 2*self.r[self.nr-1]*fluid['hex']*(self.temp[0] - fluid['t'])
+            Qleft = 2*self.r[self.nr-1]*fluid['hex']*(temp[:, 0] - fluid['t'])
 
         # right boundary condition
         if self.bcright['type'] == 0:
             Qright = 2*self.r[self.nr-1]*self.bcright['qf']
         elif self.bcright['type'] == 1:
-            Qright = 2*self.r[self.nr-1]*self.bcright['alfa']*(self.bcright['temp'] - self.temp[self.nr-1])
+            Qright = 2*self.r[self.nr-1]*self.bcright['alfa']*(self.bcright['temp'] - temp[:, self.nr-1])
         else: #self.bcright['type'] == 2
             # pipe node indexes
-            jpipe = (reactor.fluid.pipeid.index(self.bcright['pipeid']), self.bcright['pipenode']-1)
+            jpipe = (reactor.control.registry['pipe'][self.bcright['pipeid']], self.bcright['pipenode']-1)
             fluid = {}
-            fluid['t'] = reactor.fluid.temp[jpipe[0]][jpipe[1]]
-            fluid['type'] = reactor.fluid.type[jpipe[0]]
-            # call material property function
-            pro = reactor.data.matpro( {'type':fluid['type'], 't':fluid['t']} )
-            fluid['pe'] = abs(reactor.fluid.vel[jpipe[0]][jpipe[1]]) * reactor.fluid.dhyd[jpipe[0]] * pro['rhol'] * pro['cpl'] / pro['kl']
+            fluid['t'] = reactor.control.states[:, slot[('temp',jpipe[0])]][:, jpipe[1]]
+            # coolant properties calculated by the fluid for the current temperatures in all pipe nodes
+            reactor.fluid.calculate_properties(reactor)
+            node = reactor.fluid.inode0[jpipe[0]] + jpipe[1]
+            pro = {key:reactor.fluid.batch[key][:, node] for key in ['rhol', 'kl', 'cpl']}
+            fluid['pe'] = abs(reactor.fluid.batch['vel'][:, node]) * reactor.fluid.dhyd[jpipe[0]] * pro['rhol'] * pro['cpl'] / pro['kl']
             fluid['nu'] = reactor.data.nu( {'pe':fluid['pe']} )
             # heat exchange coefficient
             fluid['hex'] = fluid['nu'] * pro['kl'] / reactor.fluid.dhyd[jpipe[0]]
             # heat flux (W/m**2) times heat transfer area per unit height divided by pi from clad to coolant
-            Qright = 2*self.r[self.nr-1]*fluid['hex']*(self.temp[self.nr-1] - fluid['t'])
+            Qright = 2*self.r[self.nr-1]*fluid['hex']*(temp[:, self.nr-1] - fluid['t'])
 
-        # list of heat flux (W/m**2) times heat transfer area per unit height at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
-        Q = [Qleft] + [2*self.rb[i]*kb[i]*(self.temp[i] - self.temp[i+1])/self.dr for i in range(self.nr-1)] + [Qright]
-        rhocpv = [self.prop['rho'][i]*self.prop['cp'][i]*self.vol[i] for i in range(self.nr)]
-        dTdt = [(Q[i] - Q[i+1])/rhocpv[i] for i in range(self.nr)]
-        rhs = dTdt
-        return rhs
+        # net heat income of radial nodes by conduction
+        dQ = reactor.data.kernel.conduction(temp, self.prop['k'], self.rb, self.dr, Qleft, Qright)
+        rhocpv = self.prop['rho']*self.prop['cp']*self.vol
+        rhs[:, slot[('htstr',indx)]] = dQ/rhocpv
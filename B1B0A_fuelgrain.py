@@ -28,11 +28,11 @@ class FuelGrain:
         # mesh grid step
         self.dr = 0.5*self.dgrain/(self.nr-1)
         # list of node radii (size = nr)
-        self.r = [i*self.dr for i in range(self.nr)]
+        self.r = np.array([i*self.dr for i in range(self.nr)])
         # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
+        self.rb = np.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
         # list of node volume (size = nr)
-        self.vol = [4/3 * self.rb[0]**3] + [4/3 * (self.rb[i]**3 - self.rb[i-1]**3) for i in range(1, self.nr-1)] + [4/3 * (self.r[self.nr-1]**3 - self.rb[self.nr-2]**3)]
+        self.vol = np.array([4/3 * self.rb[0]**3] + [4/3 * (self.rb[i]**3 - self.rb[i-1]**3) for i in range(1, self.nr-1)] + [4/3 * (self.r[self.nr-1]**3 - self.rb[self.nr-2]**3)])
 
         # GLOBAL VARIABLES
         # irradiation-induced point defects
@@ -57,12 +57,17 @@ class FuelGrain:
         self.ri_p = [1] * self.NB  #initialize of Interaction rate of fission fragments with intragranular as-fabricated pores
         self.dvalue = 0.46e-4  # todo Current grain size (a variable affected by equi-axed grain growth) but low limit ds0 was taken here
         self.s = 3  #Number of ungrouped bubble classes, treated as ‘solid’ spheres
-        self.n = [0] * self.NB # initialize of Bubble-size distribution sampling
+        self.n = np.zeros(self.NB) # Bubble-size distribution sampling
+        for i in range(self.NB):
+            if i < self.s-1:
+                self.n[i] = i + 2
+            else:
+                self.n[i] = 5 * self.n[i - 1]
         self.fr = [0] * self.NB # initialize of Average fraction of gas atoms in a bubble that may undergo resolution
-        self.bpi = [1] * self.NB # todo As-fabricated intragranular pore concentration
+        self.bpi = np.ones(self.NB) # todo As-fabricated intragranular pore concentration
         self.kij_bbias = np.zeros((self.NB, self.NB)) # initialize of bubbles coalescence model- random bubble-migration
         self.kij_pbias = np.zeros((self.np, self.np)) # initialize of bubbles coalescence model- biased bubble-motion
-        self.v = [1] * self.NB #todo Intragranular bubble drift velocity due to temperature gradient
+        self.v = np.ones(self.NB) #todo Intragranular bubble drift velocity due to temperature gradient
         self.lamdasgr_b = [4 * np.pi * self.dsgr / 2 * self.bsgr] * self.NB # todo Sub-grain boundaries sink-strength for bubbles  cm-2
         self.ssgr_b = [1] * self.NB  # todo Sub-grain cross-sectional area cm2
 
@@ -82,8 +87,9 @@ class FuelGrain:
         self.bi = [1] * self.NB
 
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'fuelgrain' object created in B1B0
-    def calculate_rhs(self, reactor, t):
+    # calculate right-hand sides and write them to the array of right-hand sides rhs: self is a 'fuelgrain' object created in B1B0,
+    # indx is the radial index of this object in the fuel with axial index indxfuel in the fuel rod with index indxfuelrod
+    def calculate_rhs(self, indx, indxfuel, indxfuelrod, reactor, t, rhs):
 
         # INTRAGRANULAR PROCESSES: IRRADIATION-INDUCED POINT DEFECTS
 
@@ -100,29 +106,31 @@ class FuelGrain:
         sumlamdabi = np.sum(lamdabi[1:self.NB])
         sumlamdapi = np.sum(lamdapi[0:self.np])
 
-        dcv_irrdt = [yiv * (self.frate * 1e-6) * self.ROU - (zvirr * lamdad + lamdasgr_v + sumlamdabi+sumlamdapi) * self.dv * self.cv_irr[i]
-                     - etaiv * self.di * self.cv_irr[i] * self.ci_irr[i] for i in range(self.NB)]
+        dcv_irrdt = (yiv * (self.frate * 1e-6) * self.ROU - (zvirr * lamdad + lamdasgr_v + sumlamdabi+sumlamdapi) * self.dv * self.cv_irr
+                     - etaiv * self.di * self.cv_irr * self.ci_irr)
 
         # fractional concentration of irradiation-induced uranium interstitials todo cm-3/cm3
         ziirr = 1 # Irradiation-induced interstitial dislocation bias factor
         lamdasgr_i = 4 * np.pi * self.dsgr/2 * self.bsgr  # Sub-grain boundaries sink-strength for vacancies cm-2
-        dci_irrdt = [yiv * (self.frate * 1e-6) * self.ROU - (ziirr * lamdad + lamdasgr_i + sumlamdabi + sumlamdapi) * self.di * self.ci_irr[i]
-                     - etaiv * self.di * self.cv_irr[i] * self.ci_irr[i] for i in range(self.NB)]
+        dci_irrdt = (yiv * (self.frate * 1e-6) * self.ROU - (ziirr * lamdad + lamdasgr_i + sumlamdabi + sumlamdapi) * self.di * self.ci_irr
+                     - etaiv * self.di * self.cv_irr * self.ci_irr)
 
         # fractional concentration of uranium vacancies ejected from intragranular as-fabricated pores todo cm-3/cm3
         zvp = 0 # Dislocation bias factor relating to vacancies emitted by as-fabricated pores
         nv = 1 # todo Average number of vacancies that may undergo resolution
         ri_p = [0] * self.NB #todo Interaction rate of fission fragments with intragranular as-fabricated pores 1/cm3/s
         sumri_p = np.sum(ri_p[0:self.NB])
-        dcv_pdt = [self.ROU * nv * sumri_p - (zvp * lamdad + sumlamdapi + lamdasgr_v) * self.dv * self.cv_p[i] for i in range(self.NB)]
+        dcv_pdt = self.ROU * nv * sumri_p - (zvp * lamdad + sumlamdapi + lamdasgr_v) * self.dv * self.cv_p
 
         # INTRAGRANULAR PROCESSES: MONOATOMS
 
         # vector of rb**2 * dg * dc1/dr (size = nr-1)
-        q1 = [self.rb[i]**2 * self.dg * (self.c1[i] - self.c1[i+1])/self.dr for i in range(self.nr-1)]
+        q1 = self.rb**2 * self.dg * (self.c1[:-1] - self.c1[1:])/self.dr
         # vector of time derivative of monoatom concentrations
-        dc1dt = [-q1[0]/self.vol[0]] + [(q1[i-1] - q1[i])/self.vol[i] for i in range(1, self.nr-1)] + [q1[self.nr-2]/self.vol[self.nr-1]]
-        dc1dt = [dc1dt[i] + 0.31 * self.frate for i in range(self.nr)]
+        dc1dt = np.zeros(self.nr)
+        dc1dt[:-1] -= q1
+        dc1dt[1:] += q1
+        dc1dt = dc1dt/self.vol + 0.31 * self.frate
 
         # INTRAGRANULAR PROCESSES: RESOLUTION
 
@@ -132,40 +140,34 @@ class FuelGrain:
         gama = 0.63
         rho = 41e-24  # cm-3
         self.pi = [10] * self.NB  # todo to be replaced
-        deltapi = [self.pi[i] - 2 * gama / (self.ri[i] - self.pext) for i in range(self.NB)]
-        deltaci = [self.ci_irr[i] + self.ciu[i] * (1 - np.exp(deltapi[i] * rho / (self.KJ * self.temp))) for i in range(self.NB)]
-        deltacv = [self.cv_irr[i] + self.cvu[i] * (1 - np.exp(deltapi[i] * rho / (self.KJ * self.temp))) for i in range(self.NB)]
-        dridt = [(self.dv * deltacv[i] - self.di * deltaci[i]) / self.ri[i] for i in range(self.NB)]
+        deltapi = np.array(self.pi) - 2 * gama / (self.ri - self.pext)
+        deltaci = self.ci_irr + np.array(self.ciu) * (1 - np.exp(deltapi * rho / (self.KJ * self.temp)))
+        deltacv = self.cv_irr + np.array(self.cvu) * (1 - np.exp(deltapi * rho / (self.KJ * self.temp)))
+        dridt = (self.dv * deltacv - self.di * deltaci) / self.ri
 
         # Resolution models
-        for i in range(self.NB):
-            if i < self.s-1:
-                self.n[i] = i + 2
-            else:
-                self.n[i] = 5 * self.n[i - 1]
-        for i in range(self.NB):
-            if self.ri[i] <= self.dvalue:
-                self.fr[i] = 1
-            else:
-                self.fr[i] = (self.ri[i]**3 -(self.ri[i]-self.dvalue)**3) * self.ri[i] ** -3
-        self.ri_b = [3.6e-17*self.frate * self.fr[i] *self.n[i] * self.bi[i] for i in range(self.NB)]
-        self.ri_p = [2 * np.pi *(self.ri[i]+(1e-7))**2 * (6e-4) * self.frate * self.bpi[i] for i in range(self.NB)]
+        self.fr = np.where(self.ri <= self.dvalue, 1.0, (self.ri**3 - (self.ri - self.dvalue)**3) * self.ri ** -3)
+        self.ri_b = 3.6e-17*self.frate * self.fr * self.n * self.bi
+        self.ri_p = 2 * np.pi * (self.ri + (1e-7))**2 * (6e-4) * self.frate * self.bpi
 
         # Intragranular gaseous-bubble concentration
         self.k11 = 2e-6 * self.dg * self.bi[0] * self.bi[0]
-        for i in range(self.NB):
-            for j in range(self.NB):
-                self.kij_bbias[i,j] = np.pi * (self.ri[i]+self.ri[j])**2 * abs(self.v[i]-self.v[j]) * self.bi[i] * self.bi[j]
-        for i in range(self.np):
-            for j in range(self.np):
-                self.kij_pbias[i,j] = np.pi * (self.ri[i]+self.ri[j])**2 * abs(self.v[i]-self.v[j]) * self.bi[i] * self.bi[j]
+        self.kij_bbias = np.pi * np.add.outer(self.ri, self.ri)**2 * np.abs(np.subtract.outer(self.v, self.v)) * np.outer(self.bi, self.bi)
+        self.kij_pbias = self.kij_bbias[:self.np,:self.np]
         sumkb = np.sum(self.kij_bbias[1,1:self.NB]) # todo to be completed
         sumkp = np.sum(self.kij_pbias[1,0:self.np]) # todo to be completed
         self.d = [1] * self.NB # todo to be replaced
         db2dt = self.k11 + self.ri_b[2] - self.ri_b[1] - sumkb - sumkp - self.lamdasgr_b[1] * self.d[1] * self.bi[1] - self.ssgr_b[1] * self.v[1] * self.ssgr_b[1]
-        dbidt = [1] + [db2dt] + [1]*9
-
-        dc1dt = [dc1dt[i] + 2 * self.ri_b[1] for i in range(self.nr)]
-
-        rhs = dc1dt + dridt + dcv_irrdt + dci_irrdt + dcv_pdt + dbidt
-        return rhs
+        dbidt = np.ones(self.NB)
+        dbidt[1] = db2dt
+
+        dc1dt += 2 * self.ri_b[1]
+
+        slot = reactor.control.slot
+        key = (indxfuelrod, indxfuel, indx)
+        rhs[slot[('c1',) + key]] = dc1dt
+        rhs[slot[('ri',) + key]] = dridt
+        rhs[slot[('cv_irr',) + key]] = dcv_irrdt
+        rhs[slot[('ci_irr',) + key]] = dci_irrdt
+        rhs[slot[('cv_p',) + key]] = dcv_pdt
+        rhs[slot[('bi',) + key]] = dbidt
@@ -1,6 +1,7 @@
 from B1B0A_fuelgrain import FuelGrain
 
 import math
+import numpy
 import sys
 
 #--------------------------------------------------------------------------------------------------
@@ -20,7 +21,7 @@ class Fuel:
         # list of fuel dictionaries specified in input
         list = reactor.control.input['fuel']
         # index of the current fuel in the list of fuel dictionaries
-        i = [x['id'] for x in list].index(fuelid)
+        i = reactor.control.registry['fuel'][fuelid]
 
         # fuel inner radius
         self.ri = list[i]['ri']
@@ -33,7 +34,7 @@ class Fuel:
         matid = list[i]['matid']
         # find the fuel material id in the list of materials
         try:
-            ifuel = [x['id'] for x in reactor.control.input['mat']].index(matid)
+            ifuel = reactor.control.registry['mat'][matid]
         except:
             print('****ERROR: fuel material id ' + matid + ' is not specified in the \'mat\' card of input.')
             sys.exit()
@@ -42,25 +43,25 @@ class Fuel:
         # material type of fuel
         self.type = mat['type']
         # list of Pu content in fuel radial nodes
-        self.pu = [mat['pu']]*self.nr
+        self.pu = numpy.array([mat['pu']]*self.nr, dtype=float)
         # list of fuel burnup in fuel radial nodes
-        self.b = [mat['b']]*self.nr
+        self.b = numpy.array([mat['b']]*self.nr, dtype=float)
         # list of deviation from stoechiometry in fuel radial nodes
-        self.x = [mat['x']]*self.nr
+        self.x = numpy.array([mat['x']]*self.nr, dtype=float)
         # list of porosity in fuel radial nodes
-        self.por = [mat['por']]*self.nr
+        self.por = numpy.array([mat['por']]*self.nr, dtype=float)
         # list of initial temperatures in fuel radial nodes
         self.temp = [mat['temp0']]*self.nr
 
         # mesh grid step
         self.dr = (self.ro - self.ri)/(self.nr-1)
         # list of node radii (size = nr)
-        self.r = [self.ri + i*self.dr for i in range(self.nr)]
+        self.r = numpy.array([self.ri + i*self.dr for i in range(self.nr)])
         # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
+        self.rb = numpy.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
         # list of node volume (size = nr)
         self.vol = [self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2]       
-        self.vol = [math.pi*vol*dz for vol in self.vol]
+        self.vol = numpy.array([math.pi*vol*dz for vol in self.vol])
 
         if 'fuelgrain' in reactor.solve:
             # create an object fuel grain for every radial node of fuel
@@ -68,45 +69,46 @@ class Fuel:
             for i in range(self.nr):
                 self.fuelgrain.append(FuelGrain(i, indx, indxfuelrod, reactor))
 
+        # stacked material parameters
+        self.construct_batch([self])
+
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'fuel' object created in B1B
-    # indx is the axial index of this object in the fuel rod with index indxfuelrod
-    def calculate_rhs(self, indx, indxfuelrod, reactor, t):
+    # stack material parameters of the list twins of fuels of the same geometry (see Solid.construct_batch) in 2-D arrays (twin,
+    # radial node): self is a 'fuel' object created in B1B
+    def construct_batch(self, twins):
 
-        # construct right-hand side list
-        rhs = []
-        if 'fuelgrain' in reactor.solve and indx == 0 and indxfuelrod == 0:
-            for i in range(self.nr):
-                if i == 0:
-                    rhs += self.fuelgrain[indx].calculate_rhs(reactor, t)
+        self.twins = twins
+        self.batch = {key:numpy.array([getattr(x, key) for x in twins]) for key in ['pu', 'b', 'x', 'por']}
+
+    #----------------------------------------------------------------------------------------------
+    # calculate right-hand sides of all twins and write them to the 2-D array of right-hand sides rhs: self is a 'fuel' object created
+    # in B1B, indx is the axial index of this object in the fuel rod with index indxfuelrod, subsystem is the subsystem of the
+    # multirate scheme (solid or fuelgrain) or None for all unknowns
+    def calculate_rhs(self, indx, indxfuelrod, reactor, t, rhs, subsystem = None):
+
+        if 'fuelgrain' in reactor.solve and subsystem != 'solid' and indx == 0 and indxfuelrod == 0:
+            # fuel grains of every twin with the objects and the array of right-hand sides of its reactor
+            for x, member in zip(self.twins, reactor.control.members):
+                for i in range(self.nr):
+                    if i == 0:
+                        x.fuelgrain[i].calculate_rhs(i, indx, indxfuelrod, member, t, member.control.rhs)
+        if subsystem == 'fuelgrain':
+            return
+
+        # temperatures in fuel and clad radial nodes of all twins: views of the 2-D array of unknowns
+        slot = reactor.control.slot
+        temp = reactor.control.states[:, slot[('fuel',indxfuelrod,indx)]]
 
         # FUEL PROPERTIES:
-        self.prop = {'rho':[], 'cp':[], 'k':[]}
-        for j in range(self.nr):
-            # call material property function
-            pro = reactor.data.matpro( {'type':self.type, 't':self.temp[j], 'b':self.b[j], 'por':self.por[j], 'pu':self.pu[j], 'x':self.x[j]} )
-            # density (kg/m3)
-            self.prop['rho'].append(pro['rho'])
-            # specific heat (J/kg-K)
-            self.prop['cp'].append(pro['cp'])
-            # thermal conductivity (W/m-K)
-            self.prop['k'].append(pro['k'])
+        # call material property function for all radial nodes
+        pro = reactor.data.matpro( {'type':self.type, 't':temp, 'b':self.batch['b'], 'por':self.batch['por'], 'pu':self.batch['pu'], 'x':self.batch['x']} )
+        # density (kg/m3), specific heat (J/kg-K) and thermal conductivity (W/m-K)
+        self.prop = {'rho':pro['rho'], 'cp':pro['cp'], 'k':pro['k']}
 
         # TIME DERIVATIVE OF FUEL TEMPERATURE:
-        # inner gas object
-        innergas = reactor.solid.fuelrod[indxfuelrod].innergas
-        # gap conductance list
-        hgap = innergas.calculate_hgap(indxfuelrod, reactor, t)
-        # clad object
-        clad = reactor.solid.fuelrod[indxfuelrod].clad[indx]
-        # fuel thermal conductivity between nodes
-        kb = [0.5*(self.prop['k'][i] + self.prop['k'][i+1]) for i in range(self.nr-1)]
-        # list of heat flux (W/m**2) times heat transfer area per unit height at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
-        Q = [0] + [2*self.rb[i]*kb[i]*(self.temp[i] - self.temp[i+1])/self.dr for i in range(self.nr-1)]
-        # add heat flux (W/m**2) times heat transfer area per unit height from fuel to clad 
-        Q += [(self.ro + clad.ri) * hgap[indx] * (self.temp[self.nr-1] - clad.temp[0])]
-        rhocp = [self.prop['rho'][i]*self.prop['cp'][i] for i in range(self.nr)]
-        dTdt = [(Q[i] - Q[i+1] + reactor.core.qv_average)/rhocp[i] for i in range(self.nr)]
-        rhs += dTdt
-
-        return rhs
+        # heat flux (W/m**2) times heat transfer area per unit height from fuel to clad
+        Qright = reactor.solid.fuelrod[indxfuelrod].qgap[:, indx]
+        # net heat income of radial nodes by conduction
+        dQ = reactor.data.kernel.conduction(temp, self.prop['k'], self.rb, self.dr, 0., Qright)
+        rhocp = self.prop['rho']*self.prop['cp']
+        rhs[:, slot[('fuel',indxfuelrod,indx)]] = (dQ + reactor.core.qv_average)/rhocp
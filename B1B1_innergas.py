@@ -1,3 +1,4 @@
+import numpy
 import sys
 
 #--------------------------------------------------------------------------------------------------
@@ -13,12 +14,14 @@ class InnerGas:
         # number of axial nodes
         nz = len(dictfuelrod['fuelid'])
         self.hgap0 = dictfuelrod['hgap']
-        self.hgap = self.hgap0
-        indx = [x['fuelrodid'] for x in reactor.control.input['innergas']].index(dictfuelrod['id'])
+        self.hgap = numpy.array(self.hgap0, dtype=float)
+        # axial layers of gap conductance calculated from gas properties (the others keep the input values)
+        self.layers = numpy.array([i for i in range(nz) if self.hgap0[i] == 0], dtype=int)
+        indx = reactor.control.registry['innergas'][dictfuelrod['id']]
         matid = [x['matid'] for x in reactor.control.input['innergas']][indx]
         # find the gas material id in the list of materials
         try:
-            igas = [x['id'] for x in reactor.control.input['mat']].index(matid)
+            igas = reactor.control.registry['mat'][matid]
         except:
             print('****ERROR: gas material id ' + matid + ' is not specified in the \'mat\' card of input.')
             sys.exit()
@@ -30,32 +33,41 @@ class InnerGas:
         self.p = mat['p0']
         # initial temperature of gas
         self.temp = [mat['temp0']]*nz
+        # preallocated gap conductance
+        self.construct_batch([self])
 
     #----------------------------------------------------------------------------------------------
-    # calculate gap conductance: self is an 'innergas' object created in B1B
+    # allocate the 2-D array (twin, axial layer) of gap conductances of the list twins of inner gases of fuel rods of the same geometry
+    # (see Solid.construct_batch) and make every twin view its row: self is an 'innergas' object created in B1B
+    def construct_batch(self, twins):
+
+        self.batch = {'hgap':numpy.array([x.hgap for x in twins])}
+        for k, x in enumerate(twins):
+            if x is not self:
+                x.batch = {'hgap':self.batch['hgap'][k:k+1]}
+            x.hgap = x.batch['hgap'][0]
+
+    #----------------------------------------------------------------------------------------------
+    # calculate gap conductance of all twins: self is an 'innergas' object created in B1B
     # indxfuelrod is the fuel rod index
     def calculate_hgap(self, indxfuelrod, reactor, t):
 
-        nz = reactor.solid.fuelrod[indxfuelrod].nz
-        self.hgap = [0]*nz
-        for i in range(nz):
-            if self.hgap0[i] == 0:
-                # fuel surface temperature
-                tfuel = reactor.solid.fuelrod[indxfuelrod].fuel[i].temp[-1]
-                # clad surface temperature
-                tclad = reactor.solid.fuelrod[indxfuelrod].clad[i].temp[0]
-                # average temperature
-                tgap = 0.5*(tfuel + tclad)
-                # gap width
-                dgap = reactor.solid.fuelrod[indxfuelrod].clad[i].r[0] - reactor.solid.fuelrod[indxfuelrod].fuel[i].r[-1]
-                # GAS PROPERTIES:
-                # call material property function
-                pro = reactor.data.matpro( {'type':self.type, 't':tgap} )
-                # thermal conductivity (W/m-K): 
-                k = pro['k']
-                self.hgap[i] = k/dgap
-            else:
-                self.hgap[i] = self.hgap0[i]
+        fuelrod = reactor.solid.fuelrod[indxfuelrod]
+        layers = self.layers
+        if len(layers) > 0:
+            # fuel surface temperature
+            tfuel = reactor.control.states.take(fuelrod.istate['tfuel'][layers], axis = 1)
+            # clad surface temperature
+            tclad = reactor.control.states.take(fuelrod.istate['tcladi'][layers], axis = 1)
+            # average temperature
+            tgap = 0.5*(tfuel + tclad)
+            # gap width
+            dgap = numpy.array([fuelrod.clad[i].r[0] - fuelrod.fuel[i].r[-1] for i in layers])
+            # GAS PROPERTIES:
+            # call material property function
+            pro = reactor.data.matpro( {'type':self.type, 't':tgap} )
+            # thermal conductivity (W/m-K): 
+            k = pro['k']
+            self.batch['hgap'][:, layers] = k/dgap
 
         return self.hgap
-
@@ -1,3 +1,4 @@
+import numpy
 import sys
 
 #--------------------------------------------------------------------------------------------------
@@ -21,7 +22,7 @@ class Clad:
         # list of clad dictionaries specified in input
         list = reactor.control.input['clad']
         # index of the current clad in the list of clad dictionaries
-        i = [x['id'] for x in list].index(cladid)
+        i = reactor.control.registry['clad'][cladid]
 
         # clad inner radius
         self.ri = list[i]['ri']
@@ -34,7 +35,7 @@ class Clad:
         matid = list[i]['matid']
         # find the clad material id in the list of materials
         try:
-            iclad = [x['id'] for x in reactor.control.input['mat']].index(matid)
+            iclad = reactor.control.registry['mat'][matid]
         except:
             print('****ERROR: clad material id ' + matid + ' is not specified in the \'mat\' card of input.')
             sys.exit()
@@ -48,63 +49,34 @@ class Clad:
         # mesh grid step
         self.dr = (self.ro - self.ri)/(self.nr-1)
         # list of node radii (size = nr)
-        self.r = [self.ri + i*self.dr for i in range(self.nr)]
+        self.r = numpy.array([self.ri + i*self.dr for i in range(self.nr)])
         # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
+        self.rb = numpy.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
         # list of node volume per unit height (size = nr)
-        self.vol = [self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2]
+        self.vol = numpy.array([self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2])
 
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'clad' object created in B1B
-    # indx is the axial index of this object in the fuel rod with index indxfuelrod
-    def calculate_rhs(self, indx, indxfuelrod, reactor, t):
+    # calculate right-hand sides of all twins and write them to the 2-D array of right-hand sides rhs: self is a 'clad' object created
+    # in B1B, indx is the axial index of this object in the fuel rod with index indxfuelrod
+    def calculate_rhs(self, indx, indxfuelrod, reactor, t, rhs):
+
+        # temperatures in clad radial nodes of all twins: view of the 2-D array of unknowns
+        slot = reactor.control.slot
+        temp = reactor.control.states[:, slot[('clad',indxfuelrod,indx)]]
 
         # CLAD PROPERTIES:
-        self.prop = {'rho':[], 'cp':[], 'k':[]}
-        for j in range(self.nr):
-            t = self.temp[j]
-            # call material property function
-            pro = reactor.data.matpro( {'type':self.type, 't':self.temp[j]} )
-            # density (kg/m3)
-            self.prop['rho'].append(pro['rho'])
-            # specific heat (J/kg-K)
-            self.prop['cp'].append(pro['cp'])
-            # thermal conductivity (W/m-K)
-            self.prop['k'].append(pro['k'])
+        # call material property function for all radial nodes
+        pro = reactor.data.matpro( {'type':self.type, 't':temp} )
+        # density (kg/m3), specific heat (J/kg-K) and thermal conductivity (W/m-K)
+        self.prop = {'rho':pro['rho'], 'cp':pro['cp'], 'k':pro['k']}
 
         # TIME DERIVATIVE OF CLAD TEMPERATURE:
-        # fuel object
-        fuel = reactor.solid.fuelrod[indxfuelrod].fuel[indx]
-        # inner gas object
-        innergas = reactor.solid.fuelrod[indxfuelrod].innergas
-        # gap conductance list
-        hgap = innergas.calculate_hgap(indxfuelrod, reactor, t)
-
-        # clad thermal conductivity between nodes
-        kb = [0.5*(self.prop['k'][i] + self.prop['k'][i+1]) for i in range(self.nr-1)]
-        # heat flux (W/m**2) times heat transfer area per unit height divided by pi from fuel to clad 
-        Q = [(fuel.ro + self.ri) * hgap[indx] * (fuel.temp[fuel.nr-1] - self.temp[0])]
-        # list of heat flux (W/m**2) times heat transfer area per unit height divided by pi at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
-        Q += [2*self.rb[i]*kb[i]*(self.temp[i] - self.temp[i+1])/self.dr for i in range(self.nr-1)]
-
-        # dictionary of the fuel rod to which the clad belongs
-        dictfuelrod = reactor.control.input['fuelrod'][indxfuelrod]
-        # pipe node indexes
-        jpipe = (reactor.fluid.pipeid.index(dictfuelrod['pipeid'][indx]), dictfuelrod['pipenode'][indx]-1)
-        fluid = {}
-        fluid['t'] = reactor.fluid.temp[jpipe[0]][jpipe[1]]
-        fluid['type'] = reactor.fluid.type[jpipe[0]]
-        # call material property function
-        pro = reactor.data.matpro( {'type':fluid['type'], 't':fluid['t']} )
-        fluid['pe'] = abs(reactor.fluid.vel[jpipe[0]][jpipe[1]]) * reactor.fluid.dhyd[jpipe[0]] * pro['rhol'] * pro['cpl'] / pro['kl']
-        fluid['nu'] = reactor.data.nu( {'pe':fluid['pe'], 'p2d':self.p2d} )
-        # heat exchange coefficient
-        fluid['hex'] = fluid['nu'] * pro['kl'] / reactor.fluid.dhyd[jpipe[0]]
-        # heat flux (W/m**2) times heat transfer area per unit height divided by pi from clad to coolant
-        Q += [2*self.ro * fluid['hex']*(self.temp[self.nr-1] - fluid['t'])]
-
-        rhocpv = [self.prop['rho'][i]*self.prop['cp'][i]*self.vol[i] for i in range(self.nr)]
-        dTdt = [(Q[i] - Q[i+1])/rhocpv[i] for i in range(self.nr)]
-        rhs = dTdt
+        # heat fluxes (W/m**2) times heat transfer area per unit height divided by pi from fuel to clad and from clad to coolant
+        fuelrod = reactor.solid.fuelrod[indxfuelrod]
+        Qleft = fuelrod.qgap[:, indx]
+        Qright = fuelrod.qcool[:, indx]
 
-        return rhs
+        # net heat income of radial nodes by conduction
+        dQ = reactor.data.kernel.conduction(temp, self.prop['k'], self.rb, self.dr, Qleft, Qright)
+        rhocpv = self.prop['rho']*self.prop['cp']*self.vol
+        rhs[:, slot[('clad',indxfuelrod,indx)]] = dQ/rhocpv
@@ -1,3 +1,4 @@
+import numpy
 import sys
 
 from B1B0_fuel import Fuel
@@ -21,15 +22,18 @@ class FuelRod:
         self.nz = len(dictfuelrod['fuelid'])
         # axial mesh size
         self.dz = []
+        # index and hydraulic diameter of the pipe node cooling every axial layer
+        self.node = []
+        self.dhyd = []
         for i in range(self.nz):
             # check existence of neighbouring fluid pipe
             jpipe = (dictfuelrod['pipeid'][i], dictfuelrod['pipenode'][i])
-            if not jpipe[0] in reactor.fluid.pipeid:
+            if not jpipe[0] in reactor.control.registry['pipe']:
                 print('****ERROR: pipe id ' + jpipe[0] + ' given in \'fuelrod\' card is not specified in the \'pipe\' card of input.')
                 sys.exit()
             else:
                 # pipe index
-                ipipe = reactor.fluid.pipeid.index(jpipe[0])
+                ipipe = reactor.control.registry['pipe'][jpipe[0]]
             # check existence of neighbouring fluid pipe node
             if jpipe[1] > reactor.fluid.pipennodes[ipipe]:
                 print('****ERROR: pipe node index (' + str(jpipe[1]) + ') given in \'fuelrod\' card exceeds number of nodes (' + str(reactor.fluid.pipennodes[ipipe]) + ') of pipe ' + jpipe[0])
@@ -37,6 +41,10 @@ class FuelRod:
             # pipe node indexes
             jpipe = (ipipe, jpipe[1]-1)
             self.dz.append(reactor.fluid.len[jpipe[0]]/reactor.fluid.pipennodes[jpipe[0]])
+            self.node.append(reactor.fluid.inode0[jpipe[0]] + jpipe[1])
+            self.dhyd.append(reactor.fluid.dhyd[jpipe[0]])
+        self.node = numpy.array(self.node)
+        self.dhyd = numpy.array(self.dhyd, dtype=float)
 
         # create an object for every axial layer of fuel
         self.fuel = []
@@ -51,14 +59,76 @@ class FuelRod:
         for i in range(self.nz):
             self.clad.append(Clad(i, indx, reactor))
 
+        # arrays of fuel outer radius plus clad inner radius, clad outer radius and pitch-to-diameter ratio of every axial layer
+        self.rgap = numpy.array([self.fuel[i].ro + self.clad[i].ri for i in range(self.nz)])
+        self.ro = numpy.array([self.clad[i].ro for i in range(self.nz)])
+        self.p2d = numpy.array([self.clad[i].p2d for i in range(self.nz)], dtype=float)
+        # indexes of fuel outer, clad inner and clad outer temperatures of every axial layer in the array of unknowns (see
+        # construct_index)
+        self.istate = None
+
+    #----------------------------------------------------------------------------------------------
+    # stack quantities of the list twins of fuel rods of the same geometry (see Solid.construct_batch): self is a 'fuelrod' object
+    # created in B1
+    def construct_batch(self, twins):
+
+        self.innergas.construct_batch([x.innergas for x in twins])
+        for i in range(self.nz):
+            self.fuel[i].construct_batch([x.fuel[i] for x in twins])
+
+    #----------------------------------------------------------------------------------------------
+    # construct arrays of indexes of fuel outer, clad inner and clad outer temperatures of every axial layer in the array of unknowns
+    # once it is constructed: self is a 'fuelrod' object created in B1, indx is the fuel rod index
+    def construct_index(self, indx, reactor):
+
+        slot = reactor.control.slot
+        self.istate = {}
+        self.istate['tfuel'] = numpy.array([slot[('fuel',indx,i)].stop - 1 for i in range(self.nz)], dtype=int)
+        self.istate['tcladi'] = numpy.array([slot[('clad',indx,i)].start for i in range(self.nz)], dtype=int)
+        self.istate['tclado'] = numpy.array([slot[('clad',indx,i)].stop - 1 for i in range(self.nz)], dtype=int)
+        self.istate['tcool'] = slot[('temp',)].start + self.node
+
+    #----------------------------------------------------------------------------------------------
+    # calculate heat fluxes (W/m**2) times heat transfer area per unit height divided by pi from fuel to clad (self.qgap) and from
+    # clad to coolant (self.qcool) in all axial layers of all twins (2-D arrays (twin, axial layer)): self is a 'fuelrod' object
+    # created in B1, indx is the fuel rod index
+    def calculate_heat_flux(self, indx, reactor):
+
+        states = reactor.control.states
+        # fuel outer, clad inner, clad outer and coolant temperatures
+        tfuel = states.take(self.istate['tfuel'], axis = 1)
+        tcladi = states.take(self.istate['tcladi'], axis = 1)
+        tclado = states.take(self.istate['tclado'], axis = 1)
+        tcool = states.take(self.istate['tcool'], axis = 1)
+
+        # from fuel to clad
+        self.qgap = self.rgap * self.innergas.batch['hgap'] * (tfuel - tcladi)
+
+        # coolant properties calculated by the fluid for the current temperatures in all pipe nodes
+        fluid = reactor.fluid
+        fluid.calculate_properties(reactor)
+        rhol = fluid.batch['rhol'].take(self.node, axis = 1)
+        kl = fluid.batch['kl'].take(self.node, axis = 1)
+        cpl = fluid.batch['cpl'].take(self.node, axis = 1)
+        pe = abs(fluid.batch['vel'].take(self.node, axis = 1)) * self.dhyd * rhol * cpl / kl
+        nu = reactor.data.nu( {'pe':pe, 'p2d':self.p2d} )
+        # heat exchange coefficient
+        hex = nu * kl / self.dhyd
+        # from clad to coolant
+        self.qcool = 2*self.ro * hex*(tclado - tcool)
+
     #----------------------------------------------------------------------------------------------
-    # compose right-hand side list: self is a 'fuelrod' object created in B1,
-    # indx is the fuel rod index
-    def compose_rhs(self, indx, reactor, t):
+    # compose right-hand sides of all twins and write them to the 2-D array of right-hand sides rhs: self is a 'fuelrod' object created in B1,
+    # indx is the fuel rod index, subsystem is the subsystem of the multirate scheme (solid or fuelgrain) or None for all unknowns
+    def compose_rhs(self, indx, reactor, t, rhs, subsystem = None):
 
-        # construct right-hand side list
-        rhs = []
+        # gap conductance and heat fluxes shared by fuel and clad of all axial layers
+        if self.istate is None:
+            self.construct_index(indx, reactor)
+        if subsystem != 'fuelgrain':
+            self.innergas.calculate_hgap(indx, reactor, t)
+            self.calculate_heat_flux(indx, reactor)
         for i in range(self.nz):
-            rhs += self.fuel[i].calculate_rhs(i, indx, reactor, t)
-            rhs += self.clad[i].calculate_rhs(i, indx, reactor, t)
-        return rhs
+            self.fuel[i].calculate_rhs(i, indx, reactor, t, rhs, subsystem)
+            if subsystem != 'fuelgrain':
+                self.clad[i].calculate_rhs(i, indx, reactor, t, rhs)
@@ -26,16 +26,24 @@ class Solid:
                 self.htstr.append(HeatStructure(i, reactor))
 
     #----------------------------------------------------------------------------------------------
-    # compose right-hand side list: self is a 'solid' object created in B
-    def compose_rhs(self, reactor, t):
+    # stack quantities of the list twins of solids of the same model structure (this solid alone or the solids of all members of an
+    # ensemble, this one being the first) so that this solid calculates right-hand sides of all twins: self is a 'solid' object
+    # created in B
+    def construct_batch(self, reactor, twins):
 
-        # construct right-hand side list
-        rhs = []
         if 'fuelrod' in reactor.solve:
             for i in range(self.nfuelrods):
-                rhs += self.fuelrod[i].compose_rhs(i, reactor, t)
+                self.fuelrod[i].construct_batch([x.fuelrod[i] for x in twins])
 
-        if 'htstr' in reactor.solve:
+    #----------------------------------------------------------------------------------------------
+    # compose right-hand sides of all twins and write them to the 2-D array of right-hand sides rhs: self is a 'solid' object created in B,
+    # subsystem is the subsystem of the multirate scheme (solid or fuelgrain) or None for all unknowns
+    def compose_rhs(self, reactor, t, rhs, subsystem = None):
+
+        if 'fuelrod' in reactor.solve:
+            for i in range(self.nfuelrods):
+                self.fuelrod[i].compose_rhs(i, reactor, t, rhs, subsystem)
+
+        if 'htstr' in reactor.solve and subsystem != 'fuelgrain':
             for i in range(self.nhtstr):
-                rhs += self.htstr[i].calculate_rhs(reactor, t)
-        return rhs
+                self.htstr[i].calculate_rhs(i, reactor, t, rhs)
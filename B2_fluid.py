@@ -1,6 +1,5 @@
-from scipy import linalg
-
 import math
+import numpy
 import sys
 
 #--------------------------------------------------------------------------------------------------
@@ -11,6 +10,8 @@ class Fluid:
 
         if 'fluid' not in reactor.solve:
             return
+        # scipy subpackages are imported when needed to keep the start fast
+        from scipy import linalg
 
         # INITIALIZATION
         # list of pipe id's
@@ -23,8 +24,8 @@ class Fluid:
         self.npipef = self.pipetype.count('freelevel')
         # list of pipe hydraulic diameters
         self.dhyd = [x['dhyd'] for x in reactor.control.input['pipe']]
-        # list of pipe length
-        self.len = [x['len'] for x in reactor.control.input['pipe']]
+        # array of pipe length
+        self.len = numpy.array([x['len'] for x in reactor.control.input['pipe']], dtype=float)
         # list of pipe direction
         self.dir = [x['dir'] for x in reactor.control.input['pipe']]
         # list of pipe flow area
@@ -47,7 +48,7 @@ class Fluid:
             cool = reactor.control.input['pipe'][i]['matid']
             # find the coolant id in the list of coolants
             try:
-                icool = [x['id'] for x in reactor.control.input['mat']].index(cool)
+                icool = reactor.control.registry['mat'][cool]
             except:
                 print('****ERROR: input coolant id ' + cool + ' is not specified in the \'mat\' card.')
                 sys.exit()
@@ -75,7 +76,7 @@ class Fluid:
                 self.indx.append((i,j))
 
         # list of junction types and subtypes
-        self.juntype = reactor.control.input['junction']['type']
+        self.juntype = list(reactor.control.input['junction']['type'])
         # number of junctions
         self.njun = len(self.juntype)
         # number of independent junctions
@@ -89,15 +90,15 @@ class Fluid:
         for j in range(self.njun):
             idf = reactor.control.input['junction']['from'][j]
             idt = reactor.control.input['junction']['to'][j]
-            if idf not in self.pipeid:
+            if idf not in reactor.control.registry['pipe']:
                 print('****ERROR: pipe id (' + idf + ') in junction (' + idf + '-' + idt + ') does not exist in input.')
                 sys.exit()
-            if idt not in self.pipeid:
+            if idt not in reactor.control.registry['pipe']:
                 print('****ERROR: pipe id (' + idt + ') in junction (' + idf + '-' + idt + ') does not exist in input.')
                 sys.exit()
-            indx = self.pipeid.index(idf)
+            indx = reactor.control.registry['pipe'][idf]
             self.f.append((indx, self.pipennodes[indx]-1))
-            indx = self.pipeid.index(idt)
+            indx = reactor.control.registry['pipe'][idt]
             self.t.append((indx, 0))
         # add internal junctions
         for i in range(self.npipe):
@@ -144,15 +145,16 @@ class Fluid:
         # mass conservation equations differentiated w.r.t. time (self.npipe-self.npipef)
         n = self.njun + sum(self.pipennodes)
         B = [[0]*n for i in range(n)]
+        pipenode = reactor.control.registry['pipenode']
         for j in range(self.njun):
             B[j][j] = l_over_a[j] # dmdot/dt
 
-            i = self.njun + self.indx.index(self.f[j])
+            i = self.njun + pipenode[(self.pipeid[self.f[j][0]], self.f[j][1]+1)]
             B[j][i] = -1 # -P_from
             if self.pipetype[self.f[j][0]] != 'freelevel':
                 B[i][j] = -1 # -dmdot/dt_out
 
-            i = self.njun + self.indx.index(self.t[j])
+            i = self.njun + pipenode[(self.pipeid[self.t[j][0]], self.t[j][1]+1)]
             B[j][i] = 1 # +P_to
             if self.pipetype[self.t[j][0]] != 'freelevel':
                 B[i][j] = 1 # +dmdot/dt_in
@@ -167,210 +169,279 @@ class Fluid:
         # initialize list of flowrate in all junctions
         self.mdot = [0]*self.njun
 
-        # prepare lists to map thermal-hydraulic and fuel-rod nodes
-        indx_i = [x['pipeid'] for x in reactor.control.input['fuelrod']]
-        indx_j = [x['pipenode'] for x in reactor.control.input['fuelrod']]
-        nfuelrods = len(indx_i)
-        self.map_th = []
-        self.map_fr = []
-        for i in range(nfuelrods):
-            for j in range(len(indx_i[i])):
-                self.map_th.append((indx_i[i][j], indx_j[i][j]))
-                self.map_fr.append((i,j))
-
         # analyse thermal boundary conditions
         for x in reactor.control.input['thermbc']:
             # boundary with pipe
             if x['type'] == 2:
                 # check if pipe exists
                 jpipe = (x['pipeid'], x['pipenode'])
-                if jpipe[0] not in self.pipeid:
+                if jpipe[0] not in reactor.control.registry['pipe']:
                     print('****ERROR: pipe id (' + jpipe[0] + ') in \'thermbc\' card (' + x['id'] + ') does not exist in input.')
                     sys.exit()
                 else:
                     # pipe index
-                    ipipe = self.pipeid.index(jpipe[0])
+                    ipipe = reactor.control.registry['pipe'][jpipe[0]]
                 # check if pipenodeid exists
                 if jpipe[1] > self.pipennodes[ipipe]:
                     print('****ERROR: pipe node index (' + str(jpipe[1]) + ') given in \'thermbc\' card (' + x['id'] + ') exceeds number of nodes (' + str(self.pipennodes[ipipe]) + ') of pipe ' + jpipe[0])
                     sys.exit()
+
+        # INDEXES FOR OPERATIONS ON ARRAYS OF ALL PIPE NODES (pipe after pipe, the same order as in the array of unknowns)
+        # total number of pipe nodes
+        self.nnodes = sum(self.pipennodes)
+        # index of the first node of every pipe
+        self.inode0 = numpy.cumsum([0] + self.pipennodes[:-1])
+        # pipe index of every node
+        self.ipipe = numpy.repeat(numpy.arange(self.npipe), self.pipennodes)
+        # hydraulic diameter of every node
+        self.dhydn = numpy.array(self.dhyd, dtype=float)[self.ipipe]
+        # pipe flow area
+        self.areaz = numpy.array(self.areaz, dtype=float)
+        # node indexes of every coolant type
+        self.inodetype = {type:numpy.where(numpy.array(self.type)[self.ipipe] == type)[0] for type in set(self.type)}
+        # mask of nodes of pipes with user-specified temperature signal
+        self.isignaltemp = numpy.array([self.signaltemp[i] != '' for i in self.ipipe], dtype=bool)
+        # indexes of freelevel pipes
+        self.ifree = numpy.array([i for i in range(self.npipe) if self.pipetype[i] == 'freelevel'], dtype=int)
+        freelevel = numpy.array([x == 'freelevel' for x in self.pipetype], dtype=bool)
+
+        # pipe indexes of from and to sides of all junctions
+        self.pf = numpy.array([x[0] for x in self.f])
+        self.pt = numpy.array([x[0] for x in self.t])
+        # node indexes of from and to sides of all junctions
+        self.nf = self.inode0[self.pf] + [x[1] for x in self.f]
+        self.nt = self.inode0[self.pt] + [x[1] for x in self.t]
+        # node index of the density used at the to side of junctions in the gravitational head (from pipe, to node)
+        self.nft = self.inode0[self.pf] + [x[1] for x in self.t]
+        # length of the junction sides per pipe length: half a node, but a whole node in freelevel pipes
+        self.lenfac_f = numpy.where(freelevel[self.pf], 1.0, 0.5)/numpy.array(self.pipennodes)[self.pf]
+        self.lenfac_t = numpy.where(freelevel[self.pt], 1.0, 0.5)/numpy.array(self.pipennodes)[self.pt]
+        # pipe direction of the junction sides (the direction of the other side for freelevel pipes)
+        dir = numpy.array(self.dir, dtype=float)
+        self.dir_f = numpy.where(freelevel[self.pf], dir[self.pt], dir[self.pf])
+        self.dir_t = numpy.where(freelevel[self.pt], dir[self.pf], dir[self.pt])
+        # indexes of independent junctions
+        self.jindep = numpy.array([j for j in range(self.njuni+self.njund) if self.juntype[j] == 'independent'], dtype=int)
+        # indexes (in the list of independent junctions) of junctions with user-specified flowrate signal
+        self.jflowrate = numpy.array([k for k in range(self.njuni) if self.junflowrate[self.jindep[k]] != ''], dtype=int)
+        # indexes of independent junctions with user-specified pump head signal
+        self.jpumphead = [j for j in self.jindep if self.junpumphead[j] != '']
+        # number of internal junctions in every pipe
+        self.njunint = numpy.array(self.pipennodes) - 1
+
+        # preallocated fluid properties in all pipe nodes, valid for the current temperatures if self.propvalid (see
+        # calculate_properties), and quantities calculated by the right-hand sides
+        self.construct_batch([self])
+
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'fluid' object created in B
-    def calculate_rhs(self, reactor, t):
+    # allocate 2-D arrays (twin, node or junction) of fluid properties and quantities calculated by the right-hand sides of the list
+    # twins of fluids of the same model structure (this fluid alone or the fluids of all members of an ensemble, this one being the
+    # first) and make every twin view its row: self is a 'fluid' object created in B
+    def construct_batch(self, twins):
+
+        self.twins = twins
+        # row indexes of twins
+        self.row = numpy.arange(len(twins)).reshape(len(twins), 1)
+        size = {'rhol':self.nnodes, 'visl':self.nnodes, 'kl':self.nnodes, 'cpl':self.nnodes, 'len':self.npipe, 'mdot':self.njun,
+                'p':self.nnodes, 'vel':self.nnodes, 're':self.nnodes, 'pr':self.nnodes, 'pe':self.nnodes}
+        self.batch = {key:numpy.zeros((len(twins), size[key])) for key in size}
+        # copy current values of every twin
+        for k, x in enumerate(twins):
+            self.batch['len'][k] = x.len
+            self.batch['mdot'][k] = x.mdot
+            for key in ['p', 'vel', 're', 'pr', 'pe']:
+                self.batch[key][k] = numpy.concatenate(getattr(x, key))
+        for k, x in enumerate(twins):
+            if x is not self:
+                # the twin views its row and computes nothing but its fluid properties (for signals of its model)
+                x.twins = [x]
+                x.batch = {key:self.batch[key][k:k+1] for key in self.batch}
+            x.prop = {key:x.batch[key][0] for key in ['rhol', 'visl', 'kl', 'cpl']}
+            x.propvalid = False
+            x.len = x.batch['len'][0]
+            x.mdot = x.batch['mdot'][0]
+            # lists of arrays per pipe
+            for key in ['p', 'vel', 're', 'pr', 'pe']:
+                setattr(x, key, numpy.split(x.batch[key][0], self.inode0[1:]))
+
+    #----------------------------------------------------------------------------------------------
+    # map pipe nodes cooling fuel rods and heat structures: self is a 'fluid' object created in B
+    def map_heat_exchange(self, reactor):
 
         if 'fluid' not in reactor.solve:
-            rhs = []
-            return rhs
+            return
 
-        # FLUID PROPERTIES:
-        self.prop = []
+        # fuel rods: node indexes, slot keys of clad temperatures, heat transfer areas and pitch-to-diameter ratios (and indexes of
+        # clad outer temperatures in the array of unknowns, see calculate_rhs)
+        self.hxfr = {'node':[], 'key':[], 'area':[], 'p2d':[], 'state':None}
+        # heat structures: node indexes, slot keys of heat structure temperatures, radial node indexes and heat transfer areas (and
+        # indexes of the temperatures in the array of unknowns)
+        self.hxhs = {'node':[], 'key':[], 'k':[], 'area':[], 'state':None}
         for i in range(self.npipe):
-            dict = {'rhol':[], 'visl':[], 'kl':[], 'cpl':[]}
+            if self.signaltemp[i] != '':
+                continue
             for j in range(self.pipennodes[i]):
+                # check if there is a fuel rod cooled by the node (the first one in the registry of fuel rod layers)
+                if 'fuelrod' in reactor.solve and (self.pipeid[i],j) in reactor.control.registry['fuelrodlayer']:
+                    tuple_fr = reactor.control.registry['fuelrodlayer'][(self.pipeid[i],j)]
+                    clad = reactor.solid.fuelrod[tuple_fr[0]].clad[tuple_fr[1]]
+                    self.hxfr['node'].append(self.inode0[i] + j)
+                    self.hxfr['key'].append(('clad',) + tuple_fr)
+                    self.hxfr['area'].append(2 * math.pi * clad.r[-1] * clad.mltpl)
+                    self.hxfr['p2d'].append(clad.p2d)
+
+                # check if there is a heat structure cooled by the node
+                if 'htstr' in reactor.solve :
+                    for k in range(reactor.solid.nhtstr):
+                        bcleft = reactor.solid.htstr[k].bcleft
+                        bcright = reactor.solid.htstr[k].bcright
+                        if bcleft['type'] == 2 and bcleft['pipeid'] == self.pipeid[i] and bcleft['pipenode']-1 == j:
+                            self.hxhs['node'].append(self.inode0[i] + j)
+                            self.hxhs['key'].append(('htstr',k))
+                            self.hxhs['k'].append(0)
+                            self.hxhs['area'].append(2 * math.pi * reactor.solid.htstr[k].ri)
+                        if bcright['type'] == 2 and bcright['pipeid'] == self.pipeid[i] and bcright['pipenode']-1 == j:
+                            self.hxhs['node'].append(self.inode0[i] + j)
+                            self.hxhs['key'].append(('htstr',k))
+                            self.hxhs['k'].append(-1)
+                            self.hxhs['area'].append(2 * math.pi * reactor.solid.htstr[k].ro)
+        for dict in [self.hxfr, self.hxhs]:
+            for key in ['node', 'area', 'p2d']:
+                if key in dict:
+                    dict[key] = numpy.array(dict[key])
+
+    #----------------------------------------------------------------------------------------------
+    # calculate fluid properties in all pipe nodes of all twins once per right-hand-side call and return those of this fluid: self is
+    # a 'fluid' object created in B. The properties are shared by signals of the model and the right-hand sides and stay valid until
+    # the temperatures change: Control invalidates them when it reads a new array of unknowns (read_from_y) or imposes a pipe
+    # temperature signal
+    def calculate_properties(self, reactor):
+
+        if not all([x.propvalid for x in self.twins]):
+            # temperatures in all pipe nodes of all twins: view of the 2-D array of unknowns (signals are evaluated once before it is
+            # constructed)
+            if reactor.control.state is None:
+                temp = numpy.concatenate(self.temp).reshape(1, -1)
+            else:
+                temp = reactor.control.states[:, reactor.control.slot[('temp',)]]
+            for type in self.inodetype:
+                indx = self.inodetype[type]
                 # call material property function
-                pro = reactor.data.matpro( {'type':self.type[i], 't':self.temp[i][j]} )
-                dict['rhol'].append(pro['rhol'])
-                dict['visl'].append(pro['visl'])
-                dict['kl'].append(pro['kl'])
-                dict['cpl'].append(pro['cpl'])
-            self.prop.append(dict)
+                pro = reactor.data.matpro( {'type':type, 't':temp[:, indx]} )
+                for key in self.prop:
+                    self.batch[key][:, indx] = pro[key]
+            for x in self.twins:
+                x.propvalid = True
+        return self.prop
+
+    #----------------------------------------------------------------------------------------------
+    # calculate right-hand sides of all twins and write them to the 2-D array of right-hand sides rhs (twin, unknown): self is a
+    # 'fluid' object created in B
+    def calculate_rhs(self, reactor, t, rhs):
+
+        if 'fluid' not in reactor.solve:
+            return
+
+        # temperatures in all pipe nodes: view of the 2-D array of unknowns
+        slot = reactor.control.slot
+        temp = reactor.control.states[:, slot[('temp',)]]
+        batch = self.batch
+
+        # FLUID PROPERTIES (evaluated by signals of the model of this call if any):
+        self.calculate_properties(reactor)
+        rhol = batch['rhol']
+        visl = batch['visl']
+        kl = batch['kl']
+        cpl = batch['cpl']
 
         # FLOWRATES IN DEPENDENT JUNCTIONS:
         # construct right hand side of system invA*mdot = b
-        i = 0
-        b = [0]*(self.njuni+self.njund)
-        for j in range(self.njuni+self.njund):
-            if self.juntype[j] == 'independent':
-                b[j] = self.mdoti[i]
-                i += 1
-            elif self.juntype[j] == 'dependent':
-                b[j] = 0        
-        # then multiply matrix by list: invA*mdot = b and convert to list
-        self.mdot = self.invA.dot(b).tolist()
-        # finally calculate flowrates in internal junctions
-        for i in range(self.npipe):
-            mdotpipe = 0
-            for j in range(self.njuni+self.njund):
-                if self.t[j][0] == i:
-                    mdotpipe += self.mdot[j]
-            for j in range(self.pipennodes[i]-1):
-                self.mdot.append(mdotpipe)
-
-        # VELOCITIES AND DIMENSIONLESS NUMBERS IN PIPE NODES:
-        self.vel = [[0]*self.pipennodes[i] for i in range(self.npipe)]
-        for j in range(self.njun):
-            rho_t = self.prop[self.t[j][0]]['rhol'][self.t[j][1]]
-            self.vel[self.t[j][0]][self.t[j][1]] += self.mdot[j]/rho_t/self.areaz[self.t[j][0]]
+        b = numpy.zeros((len(self.twins), self.njuni+self.njund))
+        b[:, self.jindep] = reactor.control.states[:, slot[('mdoti',)]]
+        # then multiply matrix by vector: invA*mdot = b
+        mdot = numpy.dot(b, self.invA.T)
+        # finally calculate flowrates in internal junctions: sum of flowrates entering the pipe
+        mdotpipe = self.bincount(self.pt[:self.njuni+self.njund], mdot, self.npipe)
+        batch['mdot'][:] = numpy.concatenate((mdot, numpy.repeat(mdotpipe, self.njunint, axis = 1)), axis = 1)
+        mdot = batch['mdot']
+
+        # VELOCITIES AND DIMENSIONLESS NUMBERS IN PIPE NODES (arrays viewed by lists of arrays per pipe):
+        vel = batch['vel']
+        vel[:] = self.bincount(self.nt, mdot/rhol.take(self.nt, axis = 1)/self.areaz[self.pt], self.nnodes)
         # Reynolds numbers
-        self.re = [[abs(self.vel[i][j])*self.dhyd[i]/self.prop[i]['visl'][j] for j in range(self.pipennodes[i])] for i in range(self.npipe)]
+        batch['re'][:] = numpy.abs(vel)*self.dhydn/visl
         # Prandtl numbers
-        self.pr = [[self.prop[i]['visl'][j]*self.prop[i]['rhol'][j]*self.prop[i]['cpl'][j]/self.prop[i]['kl'][j] for j in range(self.pipennodes[i])] for i in range(self.npipe)]
+        batch['pr'][:] = visl*rhol*cpl/kl
         # Peclet numbers
-        self.pe = [[self.re[i][j]*self.pr[i][j] for j in range(self.pipennodes[i])] for i in range(self.npipe)]
+        pe = batch['pe']
+        pe[:] = batch['re']*batch['pr']
 
         # TIME DERIVATIVES OF MASS FLOWRATES:
         # construct right-hand side b of system invB*[dmdotdt, P] = b
-        b = [0]*(self.njun + sum(self.pipennodes))
-        for j in range(self.njun):
-            f = self.f[j]
-            t = self.t[j]
-            len_f = 0.5*self.len[f[0]]/self.pipennodes[f[0]]
-            if self.pipetype[f[0]] == 'freelevel': len_f *= 2
-            len_t = 0.5*self.len[t[0]]/self.pipennodes[t[0]]
-            if self.pipetype[t[0]] == 'freelevel': len_t *= 2
-            rho_f = self.prop[f[0]]['rhol'][f[1]]
-            rho_t = self.prop[f[0]]['rhol'][t[1]]
-
-            # gravitational head
-            if self.pipetype[f[0]] != 'freelevel': 
-                rhogh_f = 9.81*rho_f*len_f*self.dir[f[0]]
-            else:
-                rhogh_f = 9.81*rho_f*len_f*self.dir[t[0]]
-            if self.pipetype[t[0]] != 'freelevel': 
-                rhogh_t = 9.81*rho_t*len_t*self.dir[t[0]]
-            else:
-                rhogh_t = 9.81*rho_t*len_t*self.dir[f[0]]
-
-            #friction losses
-            dpfric_f = 0 #reactor.data.fricfac(self.re[f[0]][f[1]]) * 0.5*len_f/self.dhyd[f[0]] * rho_f * self.vel[f[0]][f[1]] * abs(self.vel[f[0]][f[1]])
-            dpfric_t = 0 #reactor.data.fricfac(self.re[t[0]][t[1]]) * 0.5*len_t/self.dhyd[t[0]] * rho_t * self.vel[t[0]][t[1]] * abs(self.vel[t[0]][t[1]])
-            
-            b[j] = -(rhogh_f + rhogh_t) - (dpfric_f + dpfric_t)
-            if self.juntype[j] == 'independent' and self.junpumphead[j] != '':
-                b[j] = reactor.control.signal[self.junpumphead[j]]
-        for i in range(self.npipe):
-            for j in range(self.pipennodes[i]):
-                self.indx.append((i,j))
-        #for i in range(sum(self.pipennodes)):
-        #    n = self.indx[i][0]
-        #    if self.pipetype[n] == 'freelevel': b[self.njun+i] = 0.5*self.prop[n]['rhol'][0]*9.81*self.len[n]
-        invBb = self.invB.dot(b).tolist()
+        b = numpy.zeros((len(self.twins), self.njun + self.nnodes))
+        len_f = self.lenfac_f*batch['len'].take(self.pf, axis = 1)
+        len_t = self.lenfac_t*batch['len'].take(self.pt, axis = 1)
+        # gravitational head
+        rhogh_f = 9.81*rhol.take(self.nf, axis = 1)*len_f*self.dir_f
+        rhogh_t = 9.81*rhol.take(self.nft, axis = 1)*len_t*self.dir_t
+        #friction losses
+        dpfric_f = 0 #reactor.data.fricfac(re[self.nf]) * 0.5*len_f/self.dhydn[self.nf] * rhol[self.nf] * vel[self.nf] * abs(vel[self.nf])
+        dpfric_t = 0 #reactor.data.fricfac(re[self.nt]) * 0.5*len_t/self.dhydn[self.nt] * rhol[self.nft] * vel[self.nt] * abs(vel[self.nt])
+
+        b[:, :self.njun] = -(rhogh_f + rhogh_t) - (dpfric_f + dpfric_t)
+        for j in self.jpumphead:
+            b[:, j] = [x.control.signal[self.junpumphead[j]] for x in reactor.control.members]
+        invBb = numpy.dot(b, self.invB.T)
 
         # read from invBb: time derivatives of flowrate in independent junctions
-        dmdotdt = []
-        for j in range(self.njun):
-            if self.juntype[j] == 'independent':
-                if self.junflowrate[j] != '':
-                    dmdotdt.append(0)
-                else:
-                    dmdotdt.append(invBb[j])
+        dmdotdt = invBb.take(self.jindep, axis = 1)
+        dmdotdt[:, self.jflowrate] = 0
         # read from invBb: pressures in pipe nodes
-        indx = 0
-        for i in range(self.npipe):
-            for j in range(self.pipennodes[i]):
-                self.p[i][j] = invBb[self.njun+indx]
-                indx += 1
+        batch['p'][:] = invBb[:, self.njun:]
 
         # TIME DERIVATIVES OF FREE-LEVEL-VOLUME LENGTH:
-        dlendt = []
-        n = 0
-        for i in range(self.npipe):
-            if self.pipetype[i] == 'freelevel':
-                dlendt.append(0)
-                rhoa = self.prop[i]['rhol'][0]*self.areaz[i]
-                for j in range(self.njun):
-                    if self.f[j][0] == i:
-                        dlendt[n] -= self.mdot[j]/rhoa
-                    if self.t[j][0] == i:
-                        dlendt[n] += self.mdot[j]/rhoa
-                n += 1
-        
+        indx = self.inode0[self.ifree]
+        rhoa = rhol.take(indx, axis = 1)*self.areaz[self.ifree]
+        dlendt = (self.bincount(self.pt, mdot, self.npipe) - self.bincount(self.pf, mdot, self.npipe)).take(self.ifree, axis = 1)/rhoa
+
         # TIME DERIVATIVES OF FLUID TEMPERATURES:
-        dtempdt2d = [[0]*self.pipennodes[i] for i in range(self.npipe)]
-        for j in range(self.njun):
-            f = self.f[j]
-            t = self.t[j]
-            if self.mdot[j] > 0:
-                cp_temp_mdot = self.prop[f[0]]['cpl'][f[1]] *  self.temp[f[0]][f[1]] * self.mdot[j]
-            else:
-                cp_temp_mdot = self.prop[t[0]]['cpl'][t[1]] *  self.temp[t[0]][t[1]] * self.mdot[j]
-            dtempdt2d[f[0]][f[1]] -= cp_temp_mdot
-            dtempdt2d[t[0]][t[1]] += cp_temp_mdot
-        n = 0
-        for i in range(self.npipe):
-            if self.pipetype[i] == 'freelevel':
-                dtempdt2d[i][0] -= self.prop[i]['cpl'][0] *  self.temp[i][0] * dlendt[n] * self.prop[i]['rhol'][0] * self.areaz[i]
-                n += 1
+        # enthalpy flowrates taken from the upstream side of junctions
+        dtempdt = reactor.data.kernel.energy(mdot, temp, cpl, self.nf, self.nt, self.nnodes)
+        dtempdt[:, indx] -= cpl.take(indx, axis = 1) * temp.take(indx, axis = 1) * dlendt * rhol.take(indx, axis = 1) * self.areaz[self.ifree]
 
-        dtempdt = []
-        for i in range(self.npipe):
-            if self.signaltemp[i] != '':
-                for j in range(self.pipennodes[i]):
-                    dtempdt.append(0)
-            else:
-                vol = self.areaz[i] * abs(self.len[i])/self.pipennodes[i]
-                for j in range(self.pipennodes[i]):
-                    # check if there is a fuel rod cooled by the node
-                    if ('fuelrod' in reactor.solve and self.pipeid[i],j) in self.map_th:
-                        indx = self.map_th.index((self.pipeid[i],j))
-                        tuple_fr = self.map_fr[indx]
-                        tclad = reactor.solid.fuelrod[tuple_fr[0]].clad[tuple_fr[1]].temp[-1]
-                        mltpl = reactor.solid.fuelrod[tuple_fr[0]].clad[tuple_fr[1]].mltpl
-                        ro = reactor.solid.fuelrod[tuple_fr[0]].clad[tuple_fr[1]].r[-1]
-                        area_ht = 2 * math.pi * ro * mltpl
-                        p2d = reactor.solid.fuelrod[tuple_fr[0]].clad[tuple_fr[1]].p2d
-                        nu = reactor.data.nu( {'pe':self.pe[i][j], 'p2d':p2d} )
-                        hex = nu * self.prop[i]['kl'][j] / self.dhyd[i]
-                        dtempdt2d[i][j] += hex*(tclad - self.temp[i][j]) * area_ht
-
-                    # check if there is a heat structure cooled by the node
-                    if 'htstr' in reactor.solve :
-                        for k in range(reactor.solid.nhtstr):
-                            bcleft = reactor.solid.htstr[k].bcleft
-                            bcright = reactor.solid.htstr[k].bcright
-                            if bcleft['type'] == 2 and bcleft['pipeid'] == self.pipeid[i] and bcleft['pipenode']-1 == j:
-                                nu = reactor.data.nu( {'pe':self.pe[i][j]} )
-                                hex = nu * self.prop[i]['kl'][j] / self.dhyd[i]
-                                area_ht = 2 * math.pi * reactor.solid.htstr[k].ri
-                                dtempdt2d[i][j] += hex*(reactor.solid.htstr[k].temp[0] - self.temp[i][j]) * area_ht
-                            if bcright['type'] == 2 and bcright['pipeid'] == self.pipeid[i] and bcright['pipenode']-1 == j:
-                                nu = reactor.data.nu( {'pe':self.pe[i][j]} )
-                                hex = nu * self.prop[i]['kl'][j] / self.dhyd[i]
-                                area_ht = 2 * math.pi * reactor.solid.htstr[k].ro
-                                dtempdt2d[i][j] += hex*(reactor.solid.htstr[k].temp[-1] - self.temp[i][j]) * area_ht
-
-                    rho_cp_vol = self.prop[i]['rhol'][j] * self.prop[i]['cpl'][j] * vol
-                    dtempdt.append(dtempdt2d[i][j] / rho_cp_vol)
-
-        rhs = dmdotdt + dlendt + dtempdt
-        return rhs
+        # indexes of clad outer and heat structure temperatures in the array of unknowns (known once the array is constructed)
+        if self.hxfr['state'] is None:
+            self.hxfr['state'] = numpy.array([slot[key].stop - 1 for key in self.hxfr['key']], dtype = int)
+            self.hxhs['state'] = numpy.array([range(slot[key].start, slot[key].stop)[k] for key, k in zip(self.hxhs['key'], self.hxhs['k'])], dtype = int)
+
+        # fuel rods cooled by the nodes
+        if len(self.hxfr['node']) > 0:
+            indx = self.hxfr['node']
+            tclad = reactor.control.states.take(self.hxfr['state'], axis = 1)
+            nu = reactor.data.nu( {'pe':pe.take(indx, axis = 1), 'p2d':self.hxfr['p2d']} )
+            hex = nu * kl.take(indx, axis = 1) / self.dhydn[indx]
+            dtempdt[:, indx] += hex*(tclad - temp.take(indx, axis = 1)) * self.hxfr['area']
+
+        # heat structures cooled by the nodes
+        if len(self.hxhs['node']) > 0:
+            indx = self.hxhs['node']
+            thtstr = reactor.control.states.take(self.hxhs['state'], axis = 1)
+            nu = reactor.data.nu( {'pe':pe.take(indx, axis = 1)} )
+            hex = nu * kl.take(indx, axis = 1) / self.dhydn[indx]
+            numpy.add.at(dtempdt, (slice(None), indx), hex*(thtstr - temp.take(indx, axis = 1)) * self.hxhs['area'])
+
+        vol = (self.areaz * numpy.abs(batch['len']) / self.pipennodes).take(self.ipipe, axis = 1)
+        dtempdt /= rhol * cpl * vol
+        dtempdt[:, self.isignaltemp] = 0
+
+        rhs[:, slot[('mdoti',)]] = dmdotdt
+        rhs[:, slot[('len',)]] = dlendt
+        rhs[:, slot[('temp',)]] = dtempdt
+
+    #----------------------------------------------------------------------------------------------
+    # return the 2-D array (twin, bin) of sums of every row of the 2-D array weights over bins of the array of indexes index (the
+    # bincount of every twin): self is a 'fluid' object created in B
+    def bincount(self, index, weights, n):
+
+        m = len(weights)
+        return numpy.bincount((index + n*self.row).ravel(), weights.ravel(), m*n).reshape(m, n)
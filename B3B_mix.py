@@ -1,5 +1,3 @@
-from scipy.interpolate import interp1d
-
 import math
 import sys
 
@@ -19,6 +17,8 @@ class Mix:
         self.isoid = reactor.control.input['mix'][indx]['isoid']
         # number of isotopes specified in input for mix indx
         self.niso = len(self.isoid)
+        # indexes of isotopes of mix indx in the global list of isotopes core.iso
+        self.isoindx = [reactor.control.registry['iso'][id] for id in self.isoid]
         # number densities of isotopes specified in input for mix indx (list)
         self.numdens = reactor.control.input['mix'][indx]['numdens']
         # list of signals for temperatures of isotopes of mix indx
@@ -68,10 +68,11 @@ class Mix:
     # return matrix of microscopic XSs without temperature dimension
     def interpolate_temp(self, core, reactor, reaction_type):
 
+        from scipy.interpolate import interp1d
         sig = []
         for i in range(self.niso):
             # index of the isotope i in the global list of isotopes core.iso
-            isoindx = [x.isoid for x in core.iso].index(self.isoid[i])
+            isoindx = self.isoindx[i]
             # isotope temperature
             temp = reactor.control.signal[self.signal_isotemp[i]]
             # grid temperatures for this isotope
@@ -140,10 +141,11 @@ class Mix:
     # given microscopic XSs without temperature dimension sig1[iso][ig][isig0] perform sig0 interpolation for energy group ig
     # for all isotopes of the mix and return sig2[iso][ig]: microscopic XSs without sig0 dimension
     def interpolate_sig0(self, ig, core, sig1):
+        from scipy.interpolate import interp1d
         sig2 = [0]*self.niso
         for i in range(self.niso):
             # index of the isotope i in the global list of isotopes core.iso
-            isoindx = [x.isoid for x in core.iso].index(self.isoid[i])
+            isoindx = self.isoindx[i]
             # grid sig0s for this isotope
             grid_sig0 = core.iso[isoindx].sig0
             nsig0 = len(grid_sig0)
@@ -200,7 +202,7 @@ class Mix:
         for ig in range(self.ng):
             for i in range(self.niso):
                 # index of the isotope i in the global list of isotopes core.iso
-                isoindx = [x.isoid for x in core.iso].index(self.isoid[i])
+                isoindx = self.isoindx[i]
                 self.chi[ig] += self.numdens[i]*core.iso[isoindx].xs['chi'][ig]
         # normalize fission spectrum
         s = sum(self.chi)
@@ -209,6 +211,7 @@ class Mix:
     #----------------------------------------------------------------------------------------------
     # calculates macroscopic scattering cross sections for the mix
     def calculate_sigsn(self, core, reactor):
+        from scipy.interpolate import interp1d
         # perform temperature and sig0 interpolations for all isotopes and all groups
         sig_tmp1 = self.interpolate_temp(core, reactor, 'elan')
         self.sigsn = []
@@ -216,7 +219,7 @@ class Mix:
             self.sigsn.append([])
             for i in range(self.niso):
                 # index of the isotope i in the global list of isotopes core.iso
-                isoindx = [x.isoid for x in core.iso].index(self.isoid[i])
+                isoindx = self.isoindx[i]
                 # grid sig0s for this isotope
                 x = core.iso[isoindx].sig0
                 nsig0 = len(x)
@@ -265,7 +268,7 @@ class Mix:
         self.sign2n = []
         for i in range(self.niso):
             # index of the isotope i in the global list of isotopes core.iso
-            isoindx = [x.isoid for x in core.iso].index(self.isoid[i])
+            isoindx = self.isoindx[i]
             # number of entries in n2n matrix for isotope i
             nn2n = len(core.iso[isoindx].xs['n2n'])
             for j in range(nn2n):
@@ -289,7 +292,7 @@ class Mix:
         sig_tmp1 = []
         for i in range(self.niso):
             # index of the isotope i in the global list of isotopes core.iso
-            isoindx = [x.isoid for x in core.iso].index(self.isoid[i])
+            isoindx = self.isoindx[i]
             nsig0 = len(core.iso[isoindx].sig0)
             sig_tmp1.append([[0]*nsig0 for j in range(self.ng)])
             for ig in range(self.ng):
@@ -18,11 +18,9 @@ class Core:
             self.power = 1
             self.ndnp = len(reactor.control.input['betaeff'])
             self.tlife = reactor.control.input['tlife']
-            self.dnplmb = reactor.control.input['dnplmb']
-            self.betaeff = reactor.control.input['betaeff']
-            self.cdnp = [0] * self.ndnp
-            for i in range(self.ndnp) :
-                self.cdnp[i] = self.betaeff[i]*self.power/(self.dnplmb[i]*self.tlife)
+            self.dnplmb = numpy.array(reactor.control.input['dnplmb'], dtype=float)
+            self.betaeff = numpy.array(reactor.control.input['betaeff'], dtype=float)
+            self.cdnp = self.betaeff*self.power/(self.dnplmb*self.tlife)
             if 'power0' not in reactor.control.input:
                 print('***ERROR: there is no card power0 in the input.')
                 sys.exit()
@@ -106,11 +104,8 @@ class Core:
 
             # initialize map
             self.map = {'dz':[], 'imix':[], 'ipipe':[]}
-            mixid_list = [self.mix[i].mixid for i in range(self.nmix)]
             self.nstack = len(reactor.control.input['stack'])
-            stackid_list = [reactor.control.input['stack'][i]['stackid'] for i in range(self.nstack)]
             self.npipe = len(reactor.control.input['pipe'])
-            pipeid_list = [reactor.control.input['pipe'][i]['id'] for i in range(self.npipe)]
             # vacuum is -1 and reflective is -2
             bc = [-1,-2]
             for iz in range(self.nz):
@@ -135,29 +130,29 @@ class Core:
                             if isinstance(id, float):
                                 self.map['imix'][iz][ix].append(bc[int(id)])
                             else:
-                                if id not in stackid_list:
+                                if id not in reactor.control.registry['stack']:
                                     print('****ERROR: stack id (' + id + ') in coremap card not specified in stack card.')
                                     sys.exit()
                                 else:
                                     # index of stack
-                                    istack = stackid_list.index(id)
+                                    istack = reactor.control.registry['stack'][id]
                                     # id of mix at (iy, ix, iz)
                                     mixid = reactor.control.input['stack'][istack]['mixid'][iz-1]
-                                    if mixid not in mixid_list:
+                                    if mixid not in reactor.control.registry['mix']:
                                         print('****ERROR: mix id in stack card (' + mixid + ') not specified in mix card.')
                                         sys.exit()
                                     else:
                                         # index of stack
-                                        imix = mixid_list.index(mixid)
+                                        imix = reactor.control.registry['mix'][mixid]
                                         self.map['imix'][iz][ix].append(imix)
                                     # id of pipe at (iy, ix, iz)
                                     pipeid = reactor.control.input['stack'][istack]['pipeid'][iz-1]
-                                    if pipeid not in pipeid_list:
+                                    if pipeid not in reactor.control.registry['pipe']:
                                         print('****ERROR: pipe id (' + pipeid + ') in stack card not specified in pipe card.')
                                         sys.exit()
                                     else:
                                         # index of pipe
-                                        ipipe = pipeid_list.index(pipeid)
+                                        ipipe = reactor.control.registry['pipe'][pipeid]
                                         # id of pipenode at (iy, ix, iz)
                                         pipenode = reactor.control.input['stack'][istack]['pipenode'][iz-1]
                                         if pipenode > reactor.control.input['pipe'][ipipe]['nnodes']:
@@ -282,35 +277,35 @@ class Core:
                     self.powxy[ix][iy] *= factor
 
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'core' object created in B
-    def calculate_rhs(self, reactor, t):
+    # calculate right-hand sides of all reactors computed by reactor (see Control.construct_batch) and write them to the 2-D array of
+    # right-hand sides rhs: self is a 'core' object created in B
+    def calculate_rhs(self, reactor, t, rhs):
 
-        # construct right-hand side list
-        rhs = []
         if 'pointkinetics' in reactor.solve:
+            # power and precursor concentrations of all reactors: views of the 2-D array of unknowns
+            slot = reactor.control.slot
+            power = reactor.control.states[:, slot[('power',)]]
+            cdnp = reactor.control.states[:, slot[('cdnp',)]]
             # read input parameters
-            rho = reactor.control.signal['RHO_INS']
-            dpowerdt = self.power * (rho - sum(self.betaeff)) / self.tlife
-            dcdnpdt = [0] * self.ndnp
-            for i in range(self.ndnp) :
-                dpowerdt += self.dnplmb[i]*self.cdnp[i]
-                dcdnpdt[i] = self.betaeff[i]*self.power/self.tlife - self.dnplmb[i]*self.cdnp[i]
-            rhs = [dpowerdt] + dcdnpdt
+            rho = numpy.array([[x.control.signal['RHO_INS']] for x in reactor.control.members])
+            # delayed neutron sources
+            dnpsource = self.dnplmb*cdnp
+            rhs[:, slot[('power',)]] = power * (rho - self.betaeff.sum()) / self.tlife + dnpsource.sum(axis = 1, keepdims = True)
+            rhs[:, slot[('cdnp',)]] = self.betaeff*power/self.tlife - dnpsource
 
         if 'spatialkinetics' in reactor.solve:
-            for i in range(self.nmix):
-                if self.mix[i].update_xs:
-                    self.mix[i].calculate_sig0(self, reactor)
-                    self.mix[i].calculate_sigt(self, reactor)
-                    self.mix[i].calculate_siga(self, reactor)
-                    self.mix[i].calculate_sigp(self, reactor)
-                    self.mix[i].calculate_chi(self)
-                    self.mix[i].calculate_sigs(self, reactor)
-                    self.mix[i].calculate_sign2n(self, reactor)
-                    self.mix[i].calculate_kerma(self, reactor)
-                    self.mix[i].update_xs = False
-                    self.mix[i].print_xs = True
-
-            rhs += []
-
-        return rhs
+            # cross sections of every reactor with its own objects
+            for x in reactor.control.members:
+                core = x.core
+                for i in range(core.nmix):
+                    if core.mix[i].update_xs:
+                        core.mix[i].calculate_sig0(core, x)
+                        core.mix[i].calculate_sigt(core, x)
+                        core.mix[i].calculate_siga(core, x)
+                        core.mix[i].calculate_sigp(core, x)
+                        core.mix[i].calculate_chi(core)
+                        core.mix[i].calculate_sigs(core, x)
+                        core.mix[i].calculate_sign2n(core, x)
+                        core.mix[i].calculate_kerma(core, x)
+                        core.mix[i].update_xs = False
+                        core.mix[i].print_xs = True
@@ -0,0 +1,131 @@
+#--------------------------------------------------------------------------------------------------
+# KERNELS OF THE RIGHT-HAND-SIDE PHYSICS: radial heat conduction stencil, material property correlations,
+# heat exchange and friction correlations and fluid energy balance. Every kernel is written once as a
+# function of scalars and numpy arrays: the python backend calls it as it is, the numba backend compiles it.
+#--------------------------------------------------------------------------------------------------
+import numpy
+
+#--------------------------------------------------------------------------------------------------
+# he: helium gas thermal conductivity (W/m-K)
+def he(t):
+
+    return 2.639e-3*t**0.7085
+
+#--------------------------------------------------------------------------------------------------
+# mox: mixed uranium-plutonium oxide fuel density (kg/m3), specific heat (J/kg-K) and thermal conductivity (W/m-K)
+def mox(t, b, por, pu, x):
+
+    rho = (11460*pu + 10960*(1 - pu)) * (1 - por)
+    # D.L. Hagrman, et al., "MATPRO-version 11", TREE-NUREG-1280, Rev 1, Idaho National Engineering Laboratory (1980).
+    cp = 15.496*(19.53*539**2 * numpy.exp(539/t) / (t**2 * (numpy.exp(539/t) - 1)**2) + 2*9.25e-04*t + 6.02e06*4.01e4 / (1.987*t**2) * numpy.exp(-4.01e4/(1.987*t)))
+    # Y. Philipponneau, J. Nuclear Matter., 188 (1992) 194-197
+    k = (1/( 1.528*numpy.sqrt(x+0.00931) - 0.1055 + 0.44*b + 2.855e-4*t ) + 76.38e-12*t**3) * (1-por)/(1+por)/0.864
+    return rho, cp, k
+
+#--------------------------------------------------------------------------------------------------
+# na: liquid sodium density (kg/m3), kinematic viscosity (m2/s), thermal conductivity (W/m-K) and specific heat (J/kg-K)
+def na(t):
+
+    # J.K. Fink and L. Leibowitz "Thermodynamic and Transport Properties of Sodium Liquid and Vapor", ANL/RE-95/2, 1995, https://www.ne.anl.gov/eda/ANL-RE-95-2.pdf
+    rhol = 219.0 + 275.32*(1.0 - t/2503.7) + 511.58*(1.0 - t/2503.7)**0.5
+    visl = numpy.exp(-6.4406 - 0.3958*numpy.log(t) + 556.835/t)/rhol
+    kl = 124.67 - 0.11381*t + 5.5226e-5*t**2 - 1.1842e-8*t**3
+    # Based on fit from J.K. Fink, et. al."Properties for Reactor Safety Analysis", ANL-CEN-RSD-82-2, May 1982.
+    cpl = 1646.97 - 0.831587*t + 4.31182e-04*t**2
+    return rhol, visl, kl, cpl
+
+#--------------------------------------------------------------------------------------------------
+# ss316: stainless steel type of 316 density (kg/m3), specific heat (J/kg-K) and thermal conductivity (W/m-K)
+def ss316(t):
+
+    # @300K equation from Leibowitz, et al, "Properties for LMFBR safety analysis", ANL-CEN-RSD-76-1 (1976), p.117
+    rho = 7954.
+    # Leibowitz, et al, "Properties for LMFBR safety analysis", ANL-CEN-RSD-76-1 (1976), p.100. Note that 1 mol of SS316 = 10.165 kg
+    # (https://www.webqc.org/molecular-weight-of-SS316.html) and 1 cal = 4.184 J
+    cp = (6.181 + 1.788e-3*t)*10.165*4.184
+    # Leibowitz, et al, "Properties for LMFBR safety analysis", ANL-CEN-RSD-76-1 (1976), p.100.
+    k = 9.248 + 1.571e-2*t
+    return rho, cp, k
+
+#--------------------------------------------------------------------------------------------------
+# Nusselt number of forced convection in a pin bundle (Mikityuk, NED 2008): pe is the Peclet number, p2d is the pitch-to-diameter ratio
+def nu_bundle(pe, p2d):
+
+    return 0.047*(1.0-numpy.exp(-3.8*(p2d-1.0))) * ((pe)**0.77 + 250.0)
+
+#--------------------------------------------------------------------------------------------------
+# Nusselt number of a round tube: pe is the Peclet number
+def nu_tube(pe):
+
+    return 4.8 + 0.025 * (pe)**0.8
+
+#--------------------------------------------------------------------------------------------------
+# friction factor: re is the Reynolds number
+def fricfac(re):
+
+    if re == 0:
+        return 1e30
+    elif re <= 2000:
+        # laminar friction factor
+        return 64/re
+    elif re > 4000:
+        # turbulent friction factor
+        return 0.316/re**0.25
+    else:
+        # transition friction factor
+        return 0.032 + 0.0077*(re/2000 - 1)
+
+#--------------------------------------------------------------------------------------------------
+# radial heat conduction: temp and k are 2-D arrays (row, radial node) of temperatures and thermal conductivities, every row being
+# one radial mesh (of a member of an ensemble), rb is the array of node boundary radii, dr is the mesh grid step, qleft and qright
+# are the heat fluxes times heat transfer area per unit height divided by pi through the left (in) and right (out) boundaries
+# (scalars or arrays of rows). Returns the 2-D array of net heat income of nodes
+def conduction(temp, k, rb, dr, qleft, qright):
+
+    m, nr = temp.shape
+    # thermal conductivity between nodes
+    kb = 0.5*(k[:, :-1] + k[:, 1:])
+    # array of heat flux (W/m**2) times heat transfer area per unit height at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
+    q = numpy.zeros((m, nr+1))
+    q[:, 0] = qleft
+    q[:, 1:nr] = 2*rb*kb*(temp[:, :-1] - temp[:, 1:])/dr
+    q[:, nr] = qright
+    return q[:, :-1] - q[:, 1:]
+
+#--------------------------------------------------------------------------------------------------
+# fluid energy balance: mdot is the 2-D array (row, junction) of flowrates in junctions, temp and cpl are 2-D arrays (row, node)
+# of temperatures and specific heats in pipe nodes, every row being one loop (of a member of an ensemble), nf and nt are arrays of
+# indexes of nodes from and to which junctions go, nnodes is the number of pipe nodes. Returns the 2-D array of net enthalpy income
+# of nodes with enthalpy flowrates taken from the upstream side of junctions
+def energy(mdot, temp, cpl, nf, nt, nnodes):
+
+    m = mdot.shape[0]
+    cp_temp_mdot = numpy.where(mdot > 0, cpl[:, nf] * temp[:, nf], cpl[:, nt] * temp[:, nt]) * mdot
+    # node indexes shifted by nnodes for every row, so that one bincount sums all rows
+    shift = nnodes*numpy.arange(m).reshape(m, 1)
+    income = numpy.bincount((nt + shift).ravel(), cp_temp_mdot.ravel(), m*nnodes) - numpy.bincount((nf + shift).ravel(), cp_temp_mdot.ravel(), m*nnodes)
+    return income.reshape(m, nnodes)
+
+#--------------------------------------------------------------------------------------------------
+class Kernel:
+
+    # names of kernels
+    names = ['he', 'mox', 'na', 'ss316', 'nu_bundle', 'nu_tube', 'fricfac', 'conduction', 'energy']
+
+    #----------------------------------------------------------------------------------------------
+    # constructor: self is a 'kernel' object created in B4, backend is 'python' or 'numba' (python if numba is not installed)
+    def __init__(self, backend):
+
+        self.backend = backend
+        if backend == 'numba':
+            try:
+                import numba
+            except ImportError:
+                print('kernel: numba is not installed, python kernels are used')
+                self.backend = 'python'
+        for name in self.names:
+            if self.backend == 'numba':
+                # compiled at the first call for the types of arguments, cached in __pycache__ for next runs
+                setattr(self, name, numba.njit(cache = True)(globals()[name]))
+            else:
+                setattr(self, name, globals()[name])
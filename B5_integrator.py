@@ -0,0 +1,445 @@
+# scipy subpackages are imported in the methods needing them to keep the start fast
+import copy
+import numpy
+import sys
+
+#--------------------------------------------------------------------------------------------------
+class Integrator:
+
+    # names of BDF and LSODA internal variables making the integrator history
+    bdf_history = ['t', 'y', 't_old', 'D', 'order', 'n_equal_steps', 'h_abs', 'h_abs_old', 'error_norm_old', 'J', 'jac_factor', 'nfev', 'njev', 'nlu']
+    lsoda_history = ['rwork', 'iwork', 'state_doubles', 'state_ints']
+
+    #----------------------------------------------------------------------------------------------
+    # constructor: self is an 'integrator' object created in B, in a 'multirate integrator' object or in an 'ensemble' object,
+    # fun is the function returning the array of right-hand sides, t0 is the starting time, y0 is the list of initial unknowns,
+    # subsystem is the subsystem of the multirate scheme whose unknowns are integrated (None for all unknowns) and nmember is
+    # the number of ensemble members with the structure of reactor whose stacked unknowns are integrated with a common step
+    def __init__(self, reactor, fun, t0, y0, subsystem = None, nmember = 1):
+
+        # function returning right-hand sides
+        self.fun = fun
+        # relative and absolute tolerances
+        rtol = reactor.control.input['tol'][0]
+        atol = reactor.control.input['tol'][1]
+        # jacobian evaluation method
+        self.jacobian = reactor.control.input['jacobian']
+        # the subsystem card overrides the jacobian evaluation method and tolerances
+        for s in reactor.control.input['subsystem']:
+            if s['id'] == subsystem:
+                self.jacobian = s['jacobian']
+                rtol, atol = s['tol']
+
+        from scipy.integrate import BDF
+        from scipy.integrate import ode
+        # members of the ensemble do not depend on each other: the jacobian of stacked unknowns is always block-diagonal
+        block = self.jacobian
+        if nmember > 1:
+            self.jacobian = 'sparse'
+        if self.jacobian == 'sparse':
+            # sparsity pattern of the jacobian derived from the model topology
+            sparsity = reactor.control.construct_sparsity(reactor)
+            if subsystem is not None:
+                # block of the unknowns of the subsystem
+                index = reactor.control.subsystem[subsystem]
+                sparsity = sparsity[index][:,index]
+            if nmember > 1:
+                from scipy.sparse import csc_matrix
+                from scipy.sparse import identity
+                from scipy.sparse import kron
+                if block == 'full':
+                    sparsity = csc_matrix(numpy.ones(sparsity.shape))
+                sparsity = kron(identity(nmember), sparsity, format = 'csc')
+            print('jacobian' + ('' if subsystem is None else ' of ' + subsystem) + ': ', sparsity.shape[0], ' unknowns, ', sparsity.nnz, ' nonzeros')
+            # BDF solver estimating the jacobian by finite differences over groups of structurally independent columns.
+            # BDF keeps references to returned right-hand sides, so the preallocated array is copied
+            self.solver = BDF(lambda t, y: fun(t, y).copy(), t0, y0, numpy.inf, rtol = rtol, atol = atol, jac_sparsity = sparsity)
+        else:
+            # LSODA solver estimating the full jacobian by finite differences column by column
+            self.solver = ode(fun, jac = None).set_integrator('lsoda', method = 'bdf', rtol = rtol, atol = atol)
+            self.solver.set_initial_value(y0, t0)
+
+        # time and unknowns at the last output
+        self.t = t0
+        self.y = y0
+        # number of BDF steps (LSODA counts its steps itself)
+        self.nstep = 0
+
+    #----------------------------------------------------------------------------------------------
+    # integrate up to time t and return unknowns at t: self is an 'integrator' object created in B
+    def integrate(self, t):
+
+        if self.jacobian == 'sparse':
+            # step freely past t and interpolate back to t (the same as lsoda does)
+            while self.solver.status == 'running' and self.solver.t < t:
+                self.solver.step()
+                self.nstep += 1
+            if self.solver.status != 'failed':
+                if t == self.solver.t:
+                    # no interpolation at the end of the last step (dense output exists only after the first step)
+                    self.y = self.solver.y.copy()
+                else:
+                    self.y = self.solver.dense_output()(t)
+                self.t = t
+        else:
+            self.y = self.solver.integrate(t)
+            self.t = self.solver.t
+        # the objects keep unknowns of the last right-hand-side call: bring them to the state at t
+        self.fun(self.t, self.y)
+        return self.y
+
+    #----------------------------------------------------------------------------------------------
+    # make one internal step towards time t (the step may end past t) and return the time at its end, where the objects are
+    # brought to: self is an 'integrator' object created in B
+    def advance(self, t):
+
+        if self.jacobian == 'sparse':
+            if self.solver.status == 'running':
+                self.solver.step()
+                self.nstep += 1
+            if self.solver.status != 'failed':
+                self.t = self.solver.t
+                self.y = self.solver.y.copy()
+        else:
+            # history at the start of the step: lsoda interpolates only within the step it is making
+            self.history = self.get_history()
+            # one lsoda step (itask = 2): the ode object does not offer it for lsoda
+            solver = self.solver
+            solver._y, solver.t = solver._integrator.step(solver.f, solver.jac or (lambda: None), solver._y, solver.t, t, solver.f_params, solver.jac_params)
+            self.y = solver._y
+            self.t = solver.t
+        self.fun(self.t, self.y)
+        return self.t
+
+    #----------------------------------------------------------------------------------------------
+    # return unknowns at time t inside the last internal step made by advance: self is an 'integrator' object created in B
+    def interpolate(self, t):
+
+        if self.jacobian == 'sparse':
+            return self.integrate(t)
+        # lsoda repeats the step from its start and interpolates at t
+        self.set_history(copy.deepcopy(self.history))
+        return self.integrate(t)
+
+    #----------------------------------------------------------------------------------------------
+    # check if the last integration was successful: self is an 'integrator' object created in B
+    def successful(self):
+
+        if self.jacobian == 'sparse':
+            return self.solver.status != 'failed'
+        else:
+            return self.solver.successful()
+
+    #----------------------------------------------------------------------------------------------
+    # return statistics of the integrator: numbers of right-hand-side and jacobian evaluations and of steps and the last step size:
+    # self is an 'integrator' object created in B
+    def statistics(self):
+
+        if self.jacobian == 'sparse':
+            return {'nfev':self.solver.nfev, 'njev':self.solver.njev, 'nstep':self.nstep, 'h':self.solver.h_abs}
+        else:
+            # LSODA optional outputs: iwork(11) steps, iwork(12) right-hand-side and iwork(13) jacobian evaluations, rwork(11) last step
+            integrator = self.solver._integrator
+            return {'nfev':int(integrator.iwork[11]), 'njev':int(integrator.iwork[12]), 'nstep':int(integrator.iwork[10]), 'h':float(integrator.rwork[10])}
+
+    #----------------------------------------------------------------------------------------------
+    # return internal history of the integrator to be stored in a checkpoint: self is an 'integrator' object created in B
+    def get_history(self):
+
+        # time and unknowns at the last output and internal variables of the solver
+        history = {'t':self.t, 'y':numpy.array(self.y), 'solver':{}}
+        if self.jacobian == 'sparse':
+            # BDF: differences of unknowns of the current order, step size and jacobian (its LU decomposition is recomputed)
+            for name in self.bdf_history:
+                history['solver'][name] = getattr(self.solver, name)
+        else:
+            # LSODA: Nordsieck history array and step control are kept in the work arrays and the integrator state
+            integrator = self.solver._integrator
+            for name in self.lsoda_history:
+                if hasattr(integrator, name):
+                    history['solver'][name] = getattr(integrator, name).copy()
+            history['solver']['istate'] = integrator.call_args[3]
+        return history
+
+    #----------------------------------------------------------------------------------------------
+    # continue with internal history of the integrator read from a checkpoint: self is an 'integrator' object created in B
+    def set_history(self, history):
+
+        self.t = history['t']
+        self.y = history['y']
+        if self.jacobian == 'sparse':
+            for name in self.bdf_history:
+                setattr(self.solver, name, history['solver'][name])
+            self.solver.LU = None
+        else:
+            integrator = self.solver._integrator
+            for name in self.lsoda_history:
+                if name in history['solver']:
+                    # the work arrays are referenced by the integrator call arguments: copy in place
+                    numpy.copyto(getattr(integrator, name), history['solver'][name])
+            integrator.call_args[3] = history['solver']['istate']
+            # time and unknowns passed by the ode object to the next call
+            self.solver.t = self.t
+            self.solver._y = numpy.array(self.y)
+
+#--------------------------------------------------------------------------------------------------
+class MultirateIntegrator:
+
+    #----------------------------------------------------------------------------------------------
+    # constructor: self is a 'multirate integrator' object created in B, fun is the function returning the array of
+    # right-hand sides (of the slots of the subsystem if its name is given), t0 is the starting time and y0 is the array
+    # of initial unknowns
+    def __init__(self, reactor, fun, t0, y0):
+
+        # function returning right-hand sides
+        self.fun = fun
+        # time interval between synchronization points and coupling order
+        self.dtsync = reactor.control.input['multirate']['dtsync']
+        self.order = reactor.control.input['multirate']['order']
+        # indexes of unknowns of subsystems in the order they are advanced
+        self.index = reactor.control.subsystem
+
+        # time and unknowns at the last synchronization point and at the point before it
+        self.t = t0
+        self.y = numpy.array(y0)
+        self.told = None
+        self.yold = None
+        # between synchronization points a subsystem sees unknowns of other subsystems as self.y + (t - self.t)*self.dydt
+        self.dydt = numpy.zeros(len(self.y))
+        self.success = True
+
+        # integrator of every subsystem with its own step size control
+        self.integrator = {}
+        for name in self.index:
+            self.integrator[name] = Integrator(reactor, self.construct_rhs(name), t0, self.y[self.index[name]], name)
+
+    #----------------------------------------------------------------------------------------------
+    # return the function of right-hand sides of subsystem name: self is a 'multirate integrator' object created in B
+    def construct_rhs(self, name):
+
+        index = self.index[name]
+        def rhs(t, y):
+            # unknowns of the subsystem complemented by coupling fields of other subsystems
+            ycoupled = self.y + (t - self.t)*self.dydt
+            ycoupled[index] = y
+            return self.fun(t, ycoupled, name)[index]
+        return rhs
+
+    #----------------------------------------------------------------------------------------------
+    # integrate up to time t and return unknowns at t: self is a 'multirate integrator' object created in B
+    def integrate(self, t):
+
+        while self.success and self.t < t:
+            # next synchronization point
+            tsync = min(self.t + self.dtsync, t)
+            # coupling fields over the interval: constant or extrapolated from the last two synchronization points
+            if self.order == 1 and self.told is not None:
+                self.dydt = (self.y - self.yold)/(self.t - self.told)
+            else:
+                self.dydt = numpy.zeros(len(self.y))
+            # advance subsystems one after another: the next subsystems see the advanced ones interpolated between
+            # their states at the synchronization points
+            ynew = self.y.copy()
+            for name in self.index:
+                index = self.index[name]
+                ynew[index] = self.integrator[name].integrate(tsync)
+                if not self.integrator[name].successful():
+                    self.success = False
+                    break
+                self.dydt[index] = (ynew[index] - self.y[index])/(tsync - self.t)
+            self.told, self.yold = self.t, self.y
+            self.t, self.y = tsync, ynew
+        # the objects keep unknowns of the last right-hand-side call: bring them to the state at t
+        self.fun(self.t, self.y)
+        return self.y
+
+    #----------------------------------------------------------------------------------------------
+    # advance to the next synchronization point not later than time t and return its time, where the objects are brought to:
+    # self is a 'multirate integrator' object created in B
+    def advance(self, t):
+
+        # history at the last synchronization point to repeat the interval up to interpolation times
+        self.history = copy.deepcopy(self.get_history())
+        self.integrate(min(self.t + self.dtsync, t))
+        return self.t
+
+    #----------------------------------------------------------------------------------------------
+    # return unknowns at time t between the last two synchronization points: self is a 'multirate integrator' object created in B
+    def interpolate(self, t):
+
+        if t != self.t:
+            self.set_history(copy.deepcopy(self.history))
+        return self.integrate(t)
+
+    #----------------------------------------------------------------------------------------------
+    # check if the last integration was successful: self is a 'multirate integrator' object created in B
+    def successful(self):
+
+        return self.success
+
+    #----------------------------------------------------------------------------------------------
+    # return statistics of integrators of all subsystems: self is a 'multirate integrator' object created in B
+    def statistics(self):
+
+        stat = {}
+        for name in self.index:
+            for key, value in self.integrator[name].statistics().items():
+                stat[name + '-' + key] = value
+        return stat
+
+    #----------------------------------------------------------------------------------------------
+    # return internal history of the integrator to be stored in a checkpoint: self is a 'multirate integrator' object created in B
+    def get_history(self):
+
+        history = {'t':self.t, 'y':self.y.copy(), 'solver':{'told':self.told, 'yold':self.yold, 'subsystem':{}}}
+        for name in self.index:
+            history['solver']['subsystem'][name] = self.integrator[name].get_history()
+        return history
+
+    #----------------------------------------------------------------------------------------------
+    # continue with internal history of the integrator read from a checkpoint: self is a 'multirate integrator' object created in B
+    def set_history(self, history):
+
+        self.t = history['t']
+        self.y = history['y']
+        self.told = history['solver']['told']
+        self.yold = history['solver']['yold']
+        for name in self.index:
+            self.integrator[name].set_history(history['solver']['subsystem'][name])
+
+#--------------------------------------------------------------------------------------------------
+class SteadySolver:
+
+    #----------------------------------------------------------------------------------------------
+    # constructor: self is a 'steady solver' object created in B, fun is the function returning the array of right-hand
+    # sides, t0 is the time of the steady state and y0 is the array of unknowns starting the Newton iterations
+    def __init__(self, reactor, fun, t0, y0):
+
+        self.fun = fun
+        self.t0 = t0
+        self.y = numpy.array(y0)
+        # tolerance of the residual norm and maximum number of Newton iterations
+        self.ftol = reactor.control.input['steady']['ftol']
+        self.maxiter = reactor.control.input['steady']['maxiter']
+
+        # unknowns of the steady state: the reactor power is kept at its initial level (the point kinetics is critical only
+        # for one power level with the reactivity given), free-level-volume lengths keep the initial coolant inventory and
+        # fuel grains are kept at their initial state. Flowrates and temperatures imposed by signals are not unknowns
+        control = reactor.control
+        fixed = numpy.zeros(len(self.y), dtype=bool)
+        for key in control.slot:
+            if key[0] in ['power', 'len', 'fuelgrain']:
+                fixed[control.slot[key]] = True
+        if 'fluid' in reactor.solve:
+            fixed[numpy.arange(control.slot[('mdoti',)].start, control.slot[('mdoti',)].stop)[reactor.fluid.jflowrate]] = True
+            fixed[numpy.arange(control.slot[('temp',)].start, control.slot[('temp',)].stop)[reactor.fluid.isignaltemp]] = True
+        self.index = numpy.where(~fixed)[0]
+
+        # flowrates in independent junctions not imposed by signals if free-level volumes are held at their initial lengths (see
+        # solve) and the junction names for error messages
+        self.iflow = []
+        self.junction = []
+        if 'fluid' in reactor.solve and len(reactor.fluid.ifree) > 0:
+            fluid = reactor.fluid
+            for k in range(fluid.njuni):
+                if k not in fluid.jflowrate:
+                    j = fluid.jindep[k]
+                    self.iflow.append(control.slot[('mdoti',)].start + k)
+                    self.junction.append(fluid.pipeid[fluid.f[j][0]] + '-' + fluid.pipeid[fluid.t[j][0]])
+
+        # subsystem of every unknown: the preconditioner neglects the coupling between subsystems
+        self.block = numpy.zeros(len(self.y), dtype=int)
+        for k, name in enumerate(control.subsystem):
+            self.block[control.subsystem[name]] = k
+
+        # groups of structurally independent columns of the jacobian (the coupling between subsystems included, otherwise
+        # it spoils the finite differences) and sparsity pattern of its blocks
+        sparsity = control.construct_sparsity(reactor)[self.index][:,self.index].tocoo()
+        self.group = self.construct_groups(sparsity.row, sparsity.col, len(self.index))
+        inblock = self.block[self.index][sparsity.row] == self.block[self.index][sparsity.col]
+        self.row = sparsity.row[inblock]
+        self.col = sparsity.col[inblock]
+
+    #----------------------------------------------------------------------------------------------
+    # return the array of time derivatives of the steady-state unknowns x: self is a 'steady solver' object created in B
+    def residual(self, x):
+
+        y = self.y.copy()
+        y[self.index] = x
+        return self.fun(self.t0, y)[self.index].copy()
+
+    #----------------------------------------------------------------------------------------------
+    # assign every column to the first group with no common rows: returns the array of group numbers of columns
+    @staticmethod
+    def construct_groups(row, col, n):
+
+        rows = [[] for j in range(n)]
+        for i, j in zip(row, col):
+            rows[j].append(i)
+        group = numpy.zeros(n, dtype=int)
+        used = []
+        for j in range(n):
+            k = 0
+            while k < len(used) and used[k][rows[j]].any():
+                k += 1
+            if k == len(used):
+                used.append(numpy.zeros(n, dtype=bool))
+            used[k][rows[j]] = True
+            group[j] = k
+        return group
+
+    #----------------------------------------------------------------------------------------------
+    # return the preconditioner at the steady-state unknowns x: the LU decomposition of the block-diagonal jacobian estimated
+    # by finite differences over groups of columns: self is a 'steady solver' object created in B
+    def construct_preconditioner(self, x):
+
+        from scipy.sparse import coo_matrix
+        from scipy.sparse import identity
+        from scipy.sparse.linalg import LinearOperator
+        from scipy.sparse.linalg import splu
+        n = len(x)
+        f0 = self.residual(x)
+        h = numpy.sqrt(numpy.finfo(float).eps)*numpy.maximum(1, numpy.abs(x))
+        data = numpy.zeros(len(self.row))
+        for k in range(self.group.max() + 1):
+            dx = numpy.where(self.group == k, h, 0)
+            df = self.residual(x + dx) - f0
+            icol = self.group[self.col] == k
+            data[icol] = df[self.row[icol]]/h[self.col[icol]]
+        jac = coo_matrix((data, (self.row, self.col)), shape = (n, n)).tocsc()
+        # unknowns with zero derivative of their own equation (e.g. temperatures of stagnant coolant) get a unit diagonal
+        diag = jac.diagonal()
+        jac = (jac + identity(n, format = 'csc').multiply((diag == 0).astype(float).reshape(-1,1))).tocsc()
+        lu = splu(jac)
+        return LinearOperator((n, n), matvec = lu.solve)
+
+    #----------------------------------------------------------------------------------------------
+    # solve for the steady state and return the array of unknowns: self is a 'steady solver' object created in B
+    def solve(self):
+
+        from scipy.optimize import newton_krylov
+        from scipy.optimize import NoConvergence
+        x0 = self.y[self.index]
+        print('steady state: ', len(self.index), ' unknowns, initial residual norm ', '{0:12.5e}'.format(numpy.abs(self.residual(x0)).max()))
+        # friction is not modelled, so time derivatives of flowrates do not depend on flowrates: with free-level volumes held at
+        # their initial lengths a steady state exists only if the gravitational heads between the free levels balance
+        dmdotdt = self.fun(self.t0, self.y)[self.iflow]
+        for k in range(len(self.iflow)):
+            if abs(dmdotdt[k]) > self.ftol:
+                print('****ERROR: steady state cannot be found: free-level-volume lengths are held at their initial values and the gravitational heads between the free levels do not balance (time derivative of flowrate in junction ' + self.junction[k] + ' is ' + '{0:12.5e}'.format(dmdotdt[k]) + ' kg/s2 independently of flowrates). Change the initial lengths of free-level pipes or impose the flowrate by a signal.')
+                sys.exit()
+        try:
+            # Jacobian-free Newton-Krylov iterations with the right-hand side as residual function
+            x = newton_krylov(self.residual, x0, method = 'lgmres', inner_M = self.construct_preconditioner(x0), f_tol = self.ftol, maxiter = self.maxiter)
+        except NoConvergence:
+            print('****ERROR: steady state not found in ', self.maxiter, ' Newton iterations with residual norm tolerance ', self.ftol, '.')
+            sys.exit()
+        except ValueError:
+            # residual is not finite
+            print('****ERROR: steady-state iterations diverged.')
+            sys.exit()
+        self.y[self.index] = x
+        print('steady state: final residual norm ', '{0:12.5e}'.format(numpy.abs(self.residual(x)).max()))
+        # the objects keep unknowns of the last right-hand-side call: bring them to the steady state
+        self.fun(self.t0, self.y)
+        return self.y
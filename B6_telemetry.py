@@ -0,0 +1,180 @@
+#--------------------------------------------------------------------------------------------------
+# TELEMETRY: a publisher streaming selected signals and integrator statistics of a running transient at
+# every output time to subscribers of a local endpoint (a Unix socket or a localhost TCP port) and asyncio
+# functions to subscribe. Messages are lines of JSON:
+#     {"type": "hello", "pid": ..., "cwd": ..., "signal": [ids]}          when a subscriber connects
+#     {"type": "step", "t": ..., "wall": ..., "signal": [values], "solver": {...}}   at every output time
+#     {"type": "end", "t": ...}                                         when the transient ends
+# A subscriber sending the line "stop" stops the transient at the next output time (output files are
+# closed and the final checkpoint is written as at the end of the transient).
+#--------------------------------------------------------------------------------------------------
+import asyncio
+import json
+import numbers
+import os
+import sys
+import threading
+import time
+
+#--------------------------------------------------------------------------------------------------
+class Telemetry:
+
+    # bytes queued for a subscriber before it is dropped as too slow to follow the transient
+    maxbuffer = 1 << 20
+
+    # constructor: self is a 'telemetry' object created in B, address is 'unix:PATH' or 'tcp:PORT' (port 0: any free port) and
+    # signal is the list of ids of published signals. The endpoint is served by an event loop in a background thread, so that
+    # the integration never waits for subscribers
+    def __init__(self, reactor, address, signal):
+
+        self.tic0 = reactor.tic0
+        self.signal = signal
+        self.clients = set()
+        self.stop = False
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self.thread = threading.Thread(target = self.run, args = (address, ready), name = 'telemetry', daemon = True)
+        self.thread.start()
+        ready.wait()
+        if self.error is not None:
+            print('****ERROR: telemetry endpoint ' + address + ' cannot be opened: ' + str(self.error))
+            sys.exit()
+        print('telemetry: ' + self.address)
+
+    #----------------------------------------------------------------------------------------------
+    # open the endpoint and run the event loop of the background thread: self is a 'telemetry' object created in B
+    def run(self, address, ready):
+
+        asyncio.set_event_loop(self.loop)
+        try:
+            if address.startswith('unix:'):
+                path = address[5:]
+                # socket file left by a previous run
+                if os.path.exists(path):
+                    os.remove(path)
+                self.server = self.loop.run_until_complete(asyncio.start_unix_server(self.serve, path))
+                self.address = address
+            else:
+                self.server = self.loop.run_until_complete(asyncio.start_server(self.serve, '127.0.0.1', int(address[4:])))
+                self.address = 'tcp:' + str(self.server.sockets[0].getsockname()[1])
+        except (OSError, ValueError) as e:
+            self.error = e
+            ready.set()
+            return
+        ready.set()
+        self.loop.run_forever()
+
+    #----------------------------------------------------------------------------------------------
+    # serve a subscriber: send the hello message and wait for commands: self is a 'telemetry' object created in B
+    async def serve(self, reader, writer):
+
+        self.clients.add(writer)
+        writer.write(self.encode({'type':'hello', 'pid':os.getpid(), 'cwd':os.getcwd(), 'signal':self.signal}))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip() == b'stop':
+                    self.stop = True
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    #----------------------------------------------------------------------------------------------
+    # send message data (bytes) to all subscribers, dropping those which do not read (called in the background thread): self is
+    # a 'telemetry' object created in B
+    def broadcast(self, data):
+
+        for writer in list(self.clients):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.maxbuffer:
+                self.clients.discard(writer)
+                writer.close()
+            else:
+                writer.write(data)
+
+    #----------------------------------------------------------------------------------------------
+    # return message as a line of JSON (bytes)
+    def encode(self, message):
+
+        return (json.dumps(message) + '\n').encode()
+
+    #----------------------------------------------------------------------------------------------
+    # output sink: publish signals and integrator statistics of reactor at time t and stop the transient if a subscriber asked for
+    # it: self is a 'telemetry' object created in B
+    def __call__(self, reactor, t):
+
+        message = {'type':'step', 't':float(t), 'wall':time.time() - self.tic0, 'signal':[float(reactor.control.signal[id]) for id in self.signal], 'solver':{}}
+        # the integrator is created after the output of the initial time
+        if hasattr(reactor, 'solver'):
+            for key, value in reactor.solver.statistics().items():
+                message['solver'][key] = int(value) if isinstance(value, numbers.Integral) else float(value)
+        self.loop.call_soon_threadsafe(self.broadcast, self.encode(message))
+        if self.stop and not reactor.stopped:
+            print('telemetry: transient stopped by a subscriber at time ' + str(t))
+            reactor.stopped = True
+
+    #----------------------------------------------------------------------------------------------
+    # send the end message, close connections and the endpoint and stop the background thread: self is a 'telemetry' object
+    # created in B
+    def close(self, t):
+
+        if not self.thread.is_alive():
+            return
+        asyncio.run_coroutine_threadsafe(self.shutdown(t), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    #----------------------------------------------------------------------------------------------
+    # coroutine of close run in the background thread: self is a 'telemetry' object created in B
+    async def shutdown(self, t):
+
+        self.broadcast(self.encode({'type':'end', 't':float(t)}))
+        for writer in list(self.clients):
+            try:
+                await asyncio.wait_for(writer.drain(), 1.0)
+            except (asyncio.TimeoutError, ConnectionError, OSError):
+                pass
+            writer.close()
+        self.clients.clear()
+        self.server.close()
+        if self.address.startswith('unix:') and os.path.exists(self.address[5:]):
+            os.remove(self.address[5:])
+
+#--------------------------------------------------------------------------------------------------
+# open a connection to the telemetry endpoint address ('unix:PATH' or 'tcp:PORT'): returns the asyncio stream reader and writer
+async def connect(address):
+
+    if address.startswith('unix:'):
+        return await asyncio.open_unix_connection(address[5:])
+    return await asyncio.open_connection('127.0.0.1', int(address[4:]))
+
+#--------------------------------------------------------------------------------------------------
+# subscribe to the telemetry endpoint address: asynchronous generator of messages (dictionaries) up to the end of the transient
+async def subscribe(address):
+
+    reader, writer = await connect(address)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            yield message
+            if message['type'] == 'end':
+                return
+    finally:
+        writer.close()
+
+#--------------------------------------------------------------------------------------------------
+# ask the transient publishing to the telemetry endpoint address to stop
+async def stop(address):
+
+    reader, writer = await connect(address)
+    writer.write(b'stop\n')
+    await writer.drain()
+    writer.close()
@@ -0,0 +1,161 @@
+#--------------------------------------------------------------------------------------------------
+# TREE OF CLASSES:
+#     Ensemble
+#         Reactor (one per member)
+#         Integrator
+#--------------------------------------------------------------------------------------------------
+from B_reactor import Reactor
+from B5_integrator import Integrator
+
+import numpy
+import sys
+import time
+
+#--------------------------------------------------------------------------------------------------
+class Ensemble:
+
+    # constructor: self is an 'ensemble' object created in A or by a program embedding ROOSTER, decks is the list of input decks
+    # (texts or dictionaries of input data) of members having the same model structure and differing in signals or material
+    # parameters, step is 'common' (stacked unknowns of all members integrated by one integrator with a common step size) or
+    # 'member' (every member integrated by its own integrator with its own step size control) and sinks is the list of
+    # functions sink(ensemble, t) called at the initial time and at the end of every step. In the common mode the objects of
+    # member 0 calculate right-hand sides of all members at once if the members differ only in signals, lookup tables, material
+    # parameters, cross sections and cards of output and of the integrator of member 0
+    def __init__(self, decks, step = 'common', sinks = []):
+
+        # starting time
+        self.tic0 = time.time()
+
+        if step not in ['common', 'member']:
+            print('****ERROR: ensemble step should be common or member.')
+            sys.exit()
+        self.step_type = step
+
+        # members: models without output files (and without integrators of their own in the common mode)
+        self.member = [Reactor(deck, files = False, solver = step == 'member') for deck in decks]
+        if len(self.member) == 0:
+            print('****ERROR: ensemble should have at least one member.')
+            sys.exit()
+
+        # members should share the layout of unknowns, the list of signals and the starting time
+        control = self.member[0].control
+        for k, member in enumerate(self.member[1:]):
+            if member.control.slot != control.slot or member.control.input['signalid'] != control.input['signalid'] or member.t != self.member[0].t:
+                print('****ERROR: ensemble member ' + str(k+1) + ' differs from member 0 in the model structure, signals or starting time.')
+                sys.exit()
+            if step == 'common' and member.control.input['t_dt'] != control.input['t_dt']:
+                print('****ERROR: ensemble member ' + str(k+1) + ' differs from member 0 in the t_dt cards.')
+                sys.exit()
+        if step == 'common' and any([len(m.control.input['event']) > 0 or m.control.input['multirate'] for m in self.member]):
+            print('****ERROR: \'event\' and \'multirate\' cards require the ensemble step member.')
+            sys.exit()
+
+        # number of unknowns of a member
+        self.n = len(control.state)
+        self.t = self.member[0].t
+        if step == 'common':
+            # cards of members free to differ from those of member 0 for the objects of member 0 to calculate right-hand sides of all
+            # members: signals, lookup tables, material parameters (but not types), cross sections and cards of output and of the
+            # integrator
+            free = ['checkpoint', 'jacobian', 'kernel', 'lookup', 'mat', 'mix', 'output', 'profile', 'restart', 'signal', 'steady',
+                    'store', 'telemetry', 'tol', 'writer']
+            types = [(x['id'], x['type']) for x in control.input['mat']]
+            self.batch = True
+            for member in self.member[1:]:
+                inp = member.control.input
+                if any([inp.get(key) != control.input.get(key) for key in set(inp) | set(control.input) if key not in free]):
+                    self.batch = False
+                if [(x['id'], x['type']) for x in inp['mat']] != types:
+                    self.batch = False
+            if self.batch:
+                # members view rows of common 2-D arrays of unknowns and right-hand sides (member, unknown)
+                self.member[0].construct_batch(self.member)
+            else:
+                # preallocated array of right-hand sides of stacked unknowns composed member by member
+                self.rhs = numpy.zeros(len(self.member)*self.n)
+            # one integrator of stacked unknowns with the tolerances and the jacobian evaluation method of member 0
+            y0 = self.get_state().ravel()
+            self.solver = Integrator(self.member[0], self.compose_rhs, self.t, y0, nmember = len(self.member))
+            # the objects keep unknowns of the last right-hand-side call of the integrator initialization
+            self.compose_rhs(self.t, y0)
+
+        self.sinks = list(sinks)
+        for sink in self.sinks:
+            sink(self, self.t)
+
+    #----------------------------------------------------------------------------------------------
+    # given t and stacked unknowns y of all members, function returns the array of stacked right-hand sides. called by the ODE
+    # solver: self is an 'ensemble' object created in A
+    def compose_rhs(self, t, y):
+
+        if not self.batch:
+            for k, member in enumerate(self.member):
+                self.rhs[k*self.n:(k+1)*self.n] = member.compose_rhs(t, y[k*self.n:(k+1)*self.n])
+            return self.rhs
+
+        # unknowns and signals of every member, then right-hand sides of all members calculated at once by the objects of member 0
+        for k, member in enumerate(self.member):
+            member.control.read_from_y(member, y[k*self.n:(k+1)*self.n])
+        for member in self.member:
+            member.control.evaluate_signals(member, t)
+        self.member[0].calculate_rhs(t)
+        return self.member[0].control.rhss.ravel()
+
+    #----------------------------------------------------------------------------------------------
+    # advance all members up to time tend and write the solution to output sinks: self is an 'ensemble' object created in A
+    def step(self, tend):
+
+        if self.step_type == 'common':
+            # the integrator brings the objects of all members to the state at tend
+            self.solver.integrate(tend)
+            self.t = self.solver.t
+            for member in self.member:
+                member.t = self.t
+        else:
+            for member in self.member:
+                if not member.stopped:
+                    member.step(tend)
+            self.t = tend
+        for sink in self.sinks:
+            sink(self, self.t)
+        return self.successful()
+
+    #----------------------------------------------------------------------------------------------
+    # check if the last step was successful for all members: self is an 'ensemble' object created in A
+    def successful(self):
+
+        if self.step_type == 'common':
+            return self.solver.successful()
+        return all([member.solver.successful() for member in self.member])
+
+    #----------------------------------------------------------------------------------------------
+    # return the 2-D array of unknowns (member, unknown) at the current time: self is an 'ensemble' object created in A
+    def get_state(self):
+
+        return numpy.array([member.get_state() for member in self.member])
+
+    #----------------------------------------------------------------------------------------------
+    # return the 2-D array of signals (member, signal) at the current time in the order of input['signalid']: self is an
+    # 'ensemble' object created in A
+    def get_signals(self):
+
+        return numpy.array([member.get_signals() for member in self.member])
+
+    #----------------------------------------------------------------------------------------------
+    # solve the transient of all members following the t_dt cards of member 0: self is an 'ensemble' object created in A
+    def run(self):
+
+        if self.member[0].control.input['t_dt'] == []:
+            print('****ERROR: obligatory card t_dt specifying time_end and dtime_out is absent.')
+            sys.exit()
+
+        for t_dt in self.member[0].control.input['t_dt']:
+            tend = t_dt[0]
+            dtout = t_dt[1]
+            while self.successful() and not all([member.stopped for member in self.member]) and self.t < tend:
+                t = self.t + dtout
+                print(t)
+                self.step(t)
+
+        tac = time.time()
+        print('Wall time: ','{0:.3f}'.format(tac - self.tic0), ' s')
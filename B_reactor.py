@@ -2,6 +2,9 @@
 # TREE OF CLASSES:
 #     Reactor
 #         Control
+#             Lookup
+#             Store
+#             Writer
 #         Solid
 #             Structure
 #             FuelRod
@@ -14,30 +17,44 @@
 #             Mix
 #             Isotope
 #         Data
+#             Kernel
+#         Integrator
+#         MultirateIntegrator
+#             Integrator
+#         SteadySolver
+#         Telemetry
 #--------------------------------------------------------------------------------------------------
 from B0_control import Control
 from B4_data import Data
 from B1_solid import Solid
 from B2_fluid import Fluid
 from B3_core import Core
+from B5_integrator import Integrator
+from B5_integrator import MultirateIntegrator
+from B5_integrator import SteadySolver
+from B6_telemetry import Telemetry
 
 # SciPy requires installation : python -m pip install --user numpy scipy matplotlib ipython jupyter pandas sympy nose
-from scipy.integrate import ode
-
+import numpy
+import sys
 import time
 
 #--------------------------------------------------------------------------------------------------
 class Reactor:
 
-    # constructor: self is a 'reactor' object created in A
-    def __init__(self):
+    # constructor: self is a 'reactor' object created in A or by a program embedding ROOSTER, deck is the text of
+    # the input deck, the dictionary of input data (as in input.json) or None to read the file 'input' of the current
+    # folder, files switches output files in a new folder of ./output (by default only when the file 'input' is read),
+    # sinks is the list of functions sink(reactor, t) called at the initial time and at the end of every step and solver
+    # switches the ODE solver off for a member of an ensemble integrated by the integrator of the ensemble
+    def __init__(self, deck = None, files = None, sinks = [], solver = True):
 
         # starting time
         self.tic0 = time.time()
         self.tic = self.tic0
 
         # create control object
-        self.control = Control(self)
+        self.control = Control(self, deck)
 
         # list of objects to be solved
         self.solve = self.control.input['solve']
@@ -46,63 +63,266 @@ class Reactor:
         self.fluid = Fluid(self)
         # create object solid
         self.solid = Solid(self)
+        # map fluid nodes cooling fuel rods and heat structures
+        self.fluid.map_heat_exchange(self)
+        # create object data (material properties of signals of the model)
+        self.data = Data(self)
 
         # evaluate signals
         self.control.evaluate_signals(self, self.control.input['t0'])
 
         # create object core
         self.core = Core(self)
-        # create object data
-        self.data = Data(self)
+
+        # construct array of unknowns and make objects view their slots in it
+        self.control.construct_state(self)
+
+        # replace profiled methods by wrappers counting calls and time
+        if self.control.input['profile']:
+            self.control.construct_profiler(self)
 
         # write list of unknowns from self to y0
         y0 = self.control.write_to_y(self)
 
-        #------------------------------------------------------------------------------------------
-        # given t and y, function returns the list of the right-hand sides. called by the ODE solver
-        def compose_rhs(t, y):
+        # output sinks
+        self.files = deck is None if files is None else files
+        self.sinks = list(sinks)
+        if not self.files and (self.control.input['checkpoint'] > 0 or self.control.input['restart']):
+            print('****ERROR: \'checkpoint\' and \'restart\' cards require output files.')
+            sys.exit()
+        # publisher of signals and integrator statistics to telemetry subscribers
+        self.telemetry = None
+        if self.control.input['telemetry'] is not None:
+            self.telemetry = Telemetry(self, self.control.input['telemetry']['address'], self.control.input['telemetry']['signal'])
+            self.sinks.append(self.telemetry)
+        # flag of the transient stopped by an event or by a telemetry subscriber
+        self.stopped = False
 
-            # read list of unknowns from y to self
-            self.control.read_from_y(self, y)
+        t0 = self.control.input['t0']
+        self.fid = []
+        if self.control.input['restart']:
+            # read time, unknowns and signals from the latest checkpoint
+            checkpoint = self.control.read_checkpoint(self)
+            t0 = checkpoint['t']
+            y0 = checkpoint['y']
+            # reopen output files of the checkpoint
+            self.fid = self.control.open_output_files(self)
+        else:
+            if 'steady' in self.solve:
+                # steady state at the initial time as initial conditions of the transient
+                y0 = SteadySolver(self, self.compose_rhs, t0, y0).solve()
+            if self.files:
+                # prepare an output folder, copy input and open output files
+                self.fid = self.control.open_output_files(self)
+                self.control.print_output_files(self, self.fid, t0, 0)
+        for sink in self.sinks:
+            sink(self, t0)
 
-            # evaluate signals            
-            self.control.evaluate_signals(self, t)
+        # create ODE solver, initialize and set integrator
+        if solver:
+            self.construct_solver(t0, y0)
+            if self.control.input['restart']:
+                # continue with the integrator history of the checkpoint
+                self.solver.set_history(checkpoint['integrator'])
+        # the objects keep unknowns of the last right-hand-side call of the integrator initialization: bring them to the state at t0
+        self.compose_rhs(t0, y0)
+        # current time
+        self.t = t0
 
-            # compose right-hand side vector
-            rhs = []
-            rhs += self.fluid.calculate_rhs(self, t)
-            rhs += self.solid.compose_rhs(self, t)
-            rhs += self.core.calculate_rhs(self, t)
-            return rhs
+    #----------------------------------------------------------------------------------------------
+    # create ODE solver starting from time t0 and unknowns y0: self is a 'reactor' object created in A
+    def construct_solver(self, t0, y0):
 
-        #------------------------------------------------------------------------------------------
-        # prepare an output folder, copy input and open output files
-        fid = self.control.open_output_files(self)
-        t0 = self.control.input['t0']
-        self.control.print_output_files(self, fid, t0, 0)
+        if self.control.input['multirate']:
+            # subsystems advanced by their own integrators between synchronization points
+            self.solver = MultirateIntegrator(self, self.compose_rhs, t0, y0)
+        else:
+            self.solver = Integrator(self, self.compose_rhs, t0, y0)
 
-        # create ODE solver, initialize and set integrator
+    #----------------------------------------------------------------------------------------------
+    # given t and y, function returns the array of the right-hand sides. called by the ODE solver. In the multirate scheme
+    # only the slots of the subsystem (fluid, solid, fuelgrain or core) being advanced are composed
+    def compose_rhs(self, t, y, subsystem = None):
+
+        # read list of unknowns from y to self
+        self.control.read_from_y(self, y)
+
+        # evaluate signals
+        self.control.evaluate_signals(self, t)
+
+        return self.calculate_rhs(t, subsystem)
+
+    #----------------------------------------------------------------------------------------------
+    # calculate right-hand sides at time t for the unknowns and signals the objects hold and return the array of right-hand sides:
+    # self is a 'reactor' object created in A. The objects calculate them for all reactors of the batch at once (this reactor
+    # alone or all members of an ensemble, see construct_batch) and write their slots of the 2-D array of right-hand sides
+    def calculate_rhs(self, t, subsystem = None):
+
+        # (the solid needs flow velocities calculated by the fluid)
+        rhs = self.control.rhss
+        if subsystem in [None, 'fluid', 'solid']:
+            self.fluid.calculate_rhs(self, t, rhs)
+        if subsystem in [None, 'solid', 'fuelgrain']:
+            self.solid.compose_rhs(self, t, rhs, subsystem)
+        if subsystem in [None, 'core']:
+            self.core.calculate_rhs(self, t, rhs)
+        return self.control.rhs
+
+    #----------------------------------------------------------------------------------------------
+    # make the list members of reactors of the same model structure (this one being the first) view rows of common 2-D arrays of
+    # unknowns, right-hand sides and quantities calculated by the right-hand sides, so that calculate_rhs of this reactor
+    # calculates right-hand sides of all members at once: self is a 'reactor' object created in B_ensemble
+    def construct_batch(self, members):
+
+        self.control.construct_batch(self, members)
+        if 'fluid' in self.solve:
+            self.fluid.construct_batch([x.fluid for x in members])
+        self.solid.construct_batch(self, [x.solid for x in members])
+
+    #----------------------------------------------------------------------------------------------
+    # advance the solution up to time tend and write it to output sinks: self is a 'reactor' object created in A. The integrator
+    # steps freely and interpolates the solution at tend. While events are pending the sign of every event function is checked at
+    # the end of every internal step of the integrator (every synchronization point of the multirate scheme), so that a signal
+    # crossing its threshold and back within the output interval is not missed. An event inside the step is located, written to
+    # output sinks and either stops the transient or switches its event signal and restarts the integrator at the event time
+    def step(self, tend):
+
+        # events not yet happened: signal minus threshold signed so that the event happens when it becomes non-negative
+        events = [event for event in self.control.input['event'] if self.control.eventvalue[event['id']] == 0]
+        def g(event):
+            return (1 if event['direction'] == 'up' else -1) * (self.control.signal[event['signal']] - event['threshold'])
+        if len(events) == 0:
+            self.solver.integrate(tend)
+            self.t = self.solver.t
+            self.output(tend)
+            return self.solver.successful()
+
+        # advance internal step by step up to the first step with an event function crossing zero
+        t0 = self.t
+        ta, ga = self.t, [g(event) for event in events]
+        while True:
+            tb = self.solver.advance(tend)
+            if not self.solver.successful():
+                self.t = self.solver.t
+                self.output(tend)
+                return False
+            if tb > tend:
+                # the step ends past tend: signals at tend
+                tb = tend
+                self.solver.interpolate(tb)
+            gb = [g(event) for event in events]
+            crossed = [k for k in range(len(events)) if ga[k] < 0 and gb[k] >= 0]
+            if len(crossed) > 0 or tb == tend:
+                break
+            ta, ga = tb, gb
+        if len(crossed) == 0:
+            self.t = self.solver.t
+            self.output(tend)
+            return self.solver.successful()
+
+        # locate the earliest event by root finding inside the step: every trial interpolates the step up to the trial time
+        def trial(t, event):
+            self.solver.interpolate(t)
+            return g(event)
+        import scipy.optimize
+        tevent, event = tb, None
+        for k in crossed:
+            t = scipy.optimize.brentq(trial, ta, tb, args = (events[k],), xtol = 1e-6*(tend - t0))
+            if t <= tevent:
+                tevent, event = t, events[k]
+
+        # solution at the event
+        y = self.solver.interpolate(tevent)
+        self.t = self.solver.t
+        self.control.eventvalue[event['id']] = 1.0
+        # re-evaluate signals with the event signal switched
+        self.compose_rhs(self.t, y)
+        print('event ' + event['id'] + ': signal ' + event['signal'] + ' crossed ' + str(event['threshold']) + ' at time ' + str(self.t))
+        self.output(self.t)
+        if event['action'] == 'stop':
+            self.stopped = True
+            return self.solver.successful()
+        # right-hand sides change at the event: restart the integrator and continue up to tend
+        self.construct_solver(self.t, y)
+        return self.step(tend)
+
+    #----------------------------------------------------------------------------------------------
+    # write the solution at time t to output sinks: self is a 'reactor' object created in A
+    def output(self, t):
+
+        if self.files:
+            # print to output files
+            self.control.print_output_files(self, self.fid, t, 1)
+            if self.control.input['profile']:
+                self.control.print_profile(self.solver, t)
+        for sink in self.sinks:
+            sink(self, t)
+
+    #----------------------------------------------------------------------------------------------
+    # return the array of unknowns at the current time: self is a 'reactor' object created in A
+    def get_state(self):
+
+        return self.control.write_to_y(self)
+
+    #----------------------------------------------------------------------------------------------
+    # return the array of signals at the current time in the order of input['signalid']: self is a 'reactor' object created in A
+    def get_signals(self):
+
+        return numpy.array([float(self.control.signal[id]) for id in self.control.input['signalid']])
+
+    #----------------------------------------------------------------------------------------------
+    # write output queued for the writer thread, close output files and end the telemetry: self is a 'reactor' object created in A
+    def close(self):
+
+        if self.telemetry is not None:
+            telemetry, self.telemetry = self.telemetry, None
+            self.sinks.remove(telemetry)
+            telemetry.close(self.t)
+        try:
+            if self.control.writer is not None:
+                writer, self.control.writer = self.control.writer, None
+                writer.close()
+        finally:
+            for f in self.fid:
+                f.close()
+            self.fid = []
+
+    #----------------------------------------------------------------------------------------------
+    # solve the transient following the t_dt cards with checkpoints: self is a 'reactor' object created in A
+    def run(self):
+
+        if self.control.input['t_dt'] == []:
+            print('****ERROR: obligatory card t_dt specifying time_end and dtime_out is absent.')
+            sys.exit()
         print(self.control.input['tol'])
-        solver = ode(compose_rhs, jac = None).set_integrator('lsoda', method = 'bdf', rtol = self.control.input['tol'][0], atol = self.control.input['tol'][1])
-        solver.set_initial_value(y0, t0)
-        solver.set_integrator
-
-        # main integration loop
-        for t_dt in self.control.input['t_dt'] :
-            tend = t_dt[0]
-            dtout = t_dt[1]
-            # solve the whole system of ODEs
-            while solver.successful() and solver.t < tend:
-                t = solver.t + dtout
-                print(t)
-                y = solver.integrate(t)
-
-                # print to output files
-                self.control.print_output_files(self, fid, t, 1)
-
-        # close all output files
-        for f in fid:
-            f.close()
+
+        # time of the next checkpoint
+        dtcheck = self.control.input['checkpoint']
+        tcheck = self.t + dtcheck
+
+        try:
+            # main integration loop
+            for t_dt in self.control.input['t_dt'] :
+                tend = t_dt[0]
+                dtout = t_dt[1]
+                # solve the whole system of ODEs
+                while self.solver.successful() and not self.stopped and self.t < tend:
+                    t = self.t + dtout
+                    print(t)
+                    self.step(t)
+
+                    # write checkpoint
+                    if dtcheck > 0 and self.t >= tcheck:
+                        self.control.write_checkpoint(self, self.solver, self.fid)
+                        while tcheck <= self.t:
+                            tcheck += dtcheck
+
+            # write the final checkpoint, so that the transient can be continued with a longer t_dt schedule
+            if dtcheck > 0 and self.solver.successful():
+                self.control.write_checkpoint(self, self.solver, self.fid)
+        finally:
+            # write queued output and close all output files, also when the transient stops on an error
+            self.close()
 
         tac = time.time()
         print('Wall time: ','{0:.3f}'.format(tac - self.tic0), ' s')
@@ -0,0 +1,4 @@
+#--------------------------------------------------------------------------------------------------
+# SYNTHETIC BENCHMARK SUITE: deck generates input decks of configurable size, case runs one deck and
+# records its costs, scaling runs series of decks and writes scaling curves.
+#--------------------------------------------------------------------------------------------------
@@ -0,0 +1,64 @@
+#--------------------------------------------------------------------------------------------------
+# BENCHMARK CASE: runs the input deck of the current folder with the profile card and writes costs
+# to result.json: number of unknowns, import and construction times, total wall time, per-call cost of the
+# right-hand side and of its parts, integrator statistics and peak memory.
+#
+# usage (in the case folder, with the ROOSTER folder on PYTHONPATH): python3 -m benchmark.case
+#--------------------------------------------------------------------------------------------------
+import json
+import numpy
+import os
+import resource
+import sys
+import time
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    # the solver prints its progress: redirect to the case log
+    stdout = sys.stdout
+    sys.stdout = open('log.txt', 'w')
+    tic = time.time()
+    from B_reactor import Reactor
+    toc = time.time()
+    reactor = Reactor()
+    tac = time.time()
+    reactor.run()
+    wall = time.time() - toc
+    sys.stdout.close()
+    sys.stdout = stdout
+
+    # profile of output intervals: wall time, calls and times of profiled methods
+    f = open(reactor.control.path4results + os.sep + 'profile.dat', 'r')
+    names = f.readline().split()[1:]
+    f.close()
+    data = numpy.loadtxt(reactor.control.path4results + os.sep + 'profile.dat', skiprows = 1, ndmin = 2)
+    total = dict(zip(names, data[:,1:].sum(axis = 0)))
+    last = dict(zip(names, data[-1,1:]))
+    ncall = total['Control.read_from_y-n']
+
+    result = {}
+    result['unknowns'] = len(reactor.control.state)
+    result['junctions'] = reactor.fluid.njuni + reactor.fluid.njund
+    result['import(s)'] = toc - tic
+    # construction of objects, state layout, output files and integrator
+    result['construct(s)'] = tac - toc
+    result['wall(s)'] = wall
+    # per-call cost of the right-hand side composed of reading unknowns, evaluating signals and the subsystems
+    parts = {'signals(us)':'Control.evaluate_signals', 'fluid(us)':'Fluid.calculate_rhs', 'solid(us)':'Solid.compose_rhs', 'core(us)':'Core.calculate_rhs'}
+    result['rhs(us)'] = 1e6*sum([total[name + '-t(s)'] for name in ['Control.read_from_y'] + list(parts.values())])/ncall
+    for key, name in parts.items():
+        result[key] = 1e6*total[name + '-t(s)']/ncall
+    result['ncall'] = int(ncall)
+    for key in ['nfev', 'njev', 'nstep']:
+        if key in last:
+            result[key] = int(last[key])
+    # peak resident memory (kB on Linux)
+    result['peak(MB)'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+    f = open('result.json', 'w')
+    f.write(json.dumps(result, indent = 2))
+    f.close()
+
+if __name__ == '__main__':
+    main()
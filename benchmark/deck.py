@@ -0,0 +1,82 @@
+#--------------------------------------------------------------------------------------------------
+# SYNTHETIC INPUT DECK: a sodium loop with a free-level plenum, a downcomer, parallel core channels
+# and a riser. Fuel rods are distributed over the channels, heat structures are cooled by the riser.
+#--------------------------------------------------------------------------------------------------
+import sys
+
+# default size of the synthetic deck
+size0 = {'pipes':2, 'nodes':10, 'rods':2, 'layers':4, 'radial':5, 'htstr':1}
+
+#--------------------------------------------------------------------------------------------------
+# return text of the input deck: size is a dictionary with the number of parallel core channels (pipes),
+# nodes per pipe (nodes), fuel rods (rods), axial layers per rod (layers), radial fuel nodes (radial) and
+# heat structures (htstr), tend is the end time and jacobian is the jacobian evaluation method
+def construct_deck(size, tend = 2.0, jacobian = 'full'):
+
+    s = dict(size0)
+    s.update(size)
+    if s['pipes'] < 1 or s['nodes'] < 1 or s['radial'] < 2:
+        print('****ERROR: synthetic deck should have at least one pipe, one node per pipe and two radial fuel nodes.')
+        sys.exit()
+    if s['layers'] > s['nodes']:
+        print('****ERROR: synthetic deck should have not more axial layers per fuel rod (' + str(s['layers']) + ') than nodes per pipe (' + str(s['nodes']) + ').')
+        sys.exit()
+
+    # words of a card in columns separated by at least one space (long words do not merge with the next one)
+    def card(*word):
+        return ' '.join([str(w).ljust(9) for w in word]).rstrip() + '\n'
+
+    deck = card('t0', 0.0)
+    deck += card('t_dt', tend, tend/2)
+    deck += card('tol', 1e-6, 1e-6)
+    deck += card('jacobian', jacobian)
+    deck += card('signal', 'TIME', 'time')
+    deck += card('signal', 'MDOTS', 'time')
+    deck += card('signal', 'RHO_INS', 0.0)
+    deck += card('lookup', 'MDOTS', 'FLOW', 0, 0.0, 1, 1.0*s['pipes'], 100, 1.0*s['pipes'])
+    deck += card('betaeff', 2e-3, 1e-3)
+    deck += card('dnplmb', 0.08, 0.5)
+    deck += card('tlife', 4e-7)
+    deck += card('power0', 1e4*max(s['rods'], 1))
+    deck += card('solve', 'fluid')
+    if s['rods'] > 0:
+        deck += card('solve', 'fuelrod')
+    if s['htstr'] > 0:
+        deck += card('solve', 'htstr')
+    deck += card('solve', 'pointkinetics')
+    deck += card('mat', 'NA', 'na', 1e5, 673)
+    deck += card('mat', 'MOX1', 'mox', 0.15, 0, 0.02, 0.05, 673)
+    deck += card('mat', 'SS1', 'ss316', 673)
+    deck += card('mat', 'HE1', 'he', 1e6, 673)
+
+    # loop: plenum, downcomer, parallel core channels and riser
+    deck += card('pipe-f', 'PLN', 'NA', 0.1, 1.0, 0.22)
+    deck += card('pipe', 'DOWN', 'NA', 0.01, 4.0, -1, round(0.1*s['pipes'], 6), s['nodes'])
+    for i in range(s['pipes']):
+        deck += card('pipe', 'CH' + str(i+1), 'NA', 0.01, 1.0, 1, 0.1, s['nodes'])
+    deck += card('pipe', 'UP', 'NA', 0.01, 3.0, 1, round(0.1*s['pipes'], 6), s['nodes'])
+    # flowrate into downcomer is imposed, flowrates into all core channels but the last one are independent
+    deck += card('jun-i-f', 'PLN', 'DOWN', 'FLOW')
+    for i in range(s['pipes']):
+        deck += card('jun-i' if i < s['pipes']-1 else 'jun', 'DOWN', 'CH' + str(i+1))
+    for i in range(s['pipes']):
+        deck += card('jun', 'CH' + str(i+1), 'UP')
+    deck += card('jun', 'UP', 'PLN')
+
+    # fuel rods distributed over core channels, every axial layer cooled by a channel node
+    if s['rods'] > 0:
+        deck += card('fuel', 'F1', 'MOX1', 0.0, 0.0027, s['radial'])
+        deck += card('clad', 'C1', 'SS1', 0.0028, 0.0032, 3)
+        for i in range(s['rods']):
+            for j in range(s['layers']):
+                deck += card('fuelrod', 'FR' + str(i+1), 'F1', 1e4, 'C1', 1.2, 100, 'CH' + str(i % s['pipes'] + 1), j+1, 0, 0)
+        for i in range(s['rods']):
+            deck += card('innergas', 'FR' + str(i+1), 'HE1', 1e-5)
+
+    # heat structures with fixed temperature on the inner surface, cooled by riser nodes on the outer surface
+    if s['htstr'] > 0:
+        deck += card('thermbc', 'BC0', 1, 1000, 600)
+        for i in range(s['htstr']):
+            deck += card('thermbc', 'BC' + str(i+1), 2, 'UP', i % s['nodes'] + 1)
+            deck += card('htstr', 'HS' + str(i+1), 'SS1', 0.1, 0.11, s['radial'], 'BC0', 'BC' + str(i+1), 1)
+    return deck
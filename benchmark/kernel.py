@@ -0,0 +1,91 @@
+#--------------------------------------------------------------------------------------------------
+# KERNEL BENCHMARK: checks that the kernels of the right-hand-side physics compiled by numba agree with
+# the python reference kernels to round-off and compares their per-call costs for arrays of growing size.
+# Writes kernel.dat.
+#
+# usage (in the ROOSTER folder): python3 -m benchmark.kernel [-o folder] [-s sizes ...] [-r rtol]
+#--------------------------------------------------------------------------------------------------
+from B4A_kernel import Kernel
+
+import argparse
+import numpy
+import os
+import sys
+import time
+
+#--------------------------------------------------------------------------------------------------
+# return the dictionary of argument tuples of kernels for arrays of n nodes
+def construct_arguments(n):
+
+    rng = numpy.random.default_rng(n)
+    t = rng.uniform(600, 1500, n)
+    nodes = numpy.arange(n)
+    return {
+        'he':(t,),
+        'mox':(t, rng.uniform(0, 0.1, n), 0.05, rng.uniform(0.1, 0.3, n), 0.02),
+        'na':(t,),
+        'ss316':(t,),
+        'nu_bundle':(rng.uniform(0, 1000, n), 1.2),
+        'nu_tube':(rng.uniform(0, 1000, n),),
+        'fricfac':(3000.,),
+        'conduction':(t.reshape(1, n), rng.uniform(2, 20, (1, n)), rng.uniform(1e-3, 1e-2, n-1), 1e-4, 1e3, -1e3),
+        # loop of n nodes with junctions of random flow directions
+        'energy':(rng.uniform(-1, 1, (1, n)), t.reshape(1, n), rng.uniform(1200, 1300, (1, n)), nodes, numpy.roll(nodes, -1), n)}
+
+#--------------------------------------------------------------------------------------------------
+# return the result of a kernel (a scalar, an array or a tuple of them) as a list of arrays
+def as_list(result):
+
+    return [numpy.atleast_1d(x) for x in (result if isinstance(result, tuple) else (result,))]
+
+#--------------------------------------------------------------------------------------------------
+# return the per-call time of the kernel function f with arguments args (s)
+def time_call(f, args):
+
+    f(*args)
+    n, tic = 0, time.perf_counter()
+    while n == 0 or time.perf_counter() - tic < 0.05:
+        f(*args)
+        n += 1
+    return (time.perf_counter() - tic)/n
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Check and time the python and numba kernels of ROOSTER.')
+    parser.add_argument('-o', default = 'benchmark-output', help = 'folder for results')
+    parser.add_argument('-s', type = int, nargs = '*', default = [10, 100, 1000, 10000], help = 'array sizes')
+    parser.add_argument('-r', type = float, default = 1e-12, help = 'relative tolerance of agreement')
+    args = parser.parse_args()
+
+    python = Kernel('python')
+    numba = Kernel('numba')
+    if numba.backend != 'numba':
+        print('****ERROR: numba kernels cannot be checked without numba installed.')
+        sys.exit()
+
+    if not os.path.isdir(args.o): os.mkdir(args.o)
+    f = open(args.o + os.sep + 'kernel.dat', 'w')
+    f.write(' ' + 'kernel'.ljust(13) + 'size'.ljust(13) + 'reldiff'.ljust(13) + 'python(us)'.ljust(13) + 'numba(us)'.ljust(13) + 'speedup\n')
+    failed = []
+    for n in args.s:
+        for name, arg in construct_arguments(n).items():
+            # results of both backends as lists of arrays
+            x = as_list(getattr(python, name)(*arg))
+            y = as_list(getattr(numba, name)(*arg))
+            reldiff = max([numpy.max(numpy.abs(a - b)/numpy.maximum(numpy.abs(a), 1e-300)) for a, b in zip(x, y)])
+            if reldiff > args.r:
+                failed.append(name + '/' + str(n))
+            tpython = time_call(getattr(python, name), arg)
+            tnumba = time_call(getattr(numba, name), arg)
+            line = ' ' + name.ljust(13) + str(n).ljust(13) + '{0:12.5e} {1:12.5e} {2:12.5e} {3:12.5e}'.format(reldiff, 1e6*tpython, 1e6*tnumba, tpython/tnumba)
+            f.write(line + '\n')
+            print(line)
+    f.close()
+    print('kernel: ' + args.o + os.sep + 'kernel.dat')
+    if len(failed) > 0:
+        print('****ERROR: python and numba kernels disagree: ' + ' '.join(failed))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#--------------------------------------------------------------------------------------------------
+# SCALING CURVES: for every size parameter of the synthetic deck (the others kept at their defaults)
+# runs a series of decks, each in its own process and folder, and writes a curve per parameter to
+# scaling-<parameter>.dat and the log-log slopes of all costs to scaling-slope.dat. A change of a
+# slope points at the subsystem (fluid, solid or core) whose cost does not scale as before.
+#
+# usage (in the ROOSTER folder): python3 -m benchmark.scaling [-o folder] [-p parameter ...] [-t tend] [-j full|sparse]
+#--------------------------------------------------------------------------------------------------
+from benchmark.deck import construct_deck
+from benchmark.deck import size0
+
+import argparse
+import json
+import numpy
+import os
+import subprocess
+import sys
+
+# series of sizes for every parameter
+series = {'pipes':[1, 2, 4, 8, 16], 'nodes':[5, 10, 20, 40, 80], 'rods':[1, 2, 4, 8, 16], 'layers':[1, 2, 4, 8], 'radial':[3, 5, 10, 20, 40], 'htstr':[1, 2, 4, 8, 16]}
+# costs written to scaling curves
+columns = ['unknowns', 'junctions', 'import(s)', 'construct(s)', 'wall(s)', 'rhs(us)', 'signals(us)', 'fluid(us)', 'solid(us)', 'core(us)', 'ncall', 'nfev', 'njev', 'nstep', 'peak(MB)']
+
+#--------------------------------------------------------------------------------------------------
+# run the deck in folder path in a separate process: returns dictionary of costs or None if the run failed
+def run_case(path, deck):
+
+    if not os.path.isdir(path): os.makedirs(path)
+    f = open(path + os.sep + 'input', 'w')
+    f.write(deck + 'profile\n')
+    f.close()
+    # the ROOSTER folder is added to the module search path of the case process
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = root + os.pathsep + env.get('PYTHONPATH', '')
+    if os.path.isfile(path + os.sep + 'result.json'): os.remove(path + os.sep + 'result.json')
+    subprocess.run([sys.executable, '-m', 'benchmark.case'], cwd = path, env = env)
+    if not os.path.isfile(path + os.sep + 'result.json'):
+        return None
+    f = open(path + os.sep + 'result.json', 'r')
+    result = json.loads(f.read())
+    f.close()
+    return result
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Run scaling curves of ROOSTER over synthetic decks.')
+    parser.add_argument('-o', default = 'benchmark-output', help = 'folder for cases and curves')
+    parser.add_argument('-p', nargs = '*', default = list(series.keys()), choices = list(series.keys()), help = 'size parameters to vary')
+    parser.add_argument('-t', type = float, default = 2.0, help = 'end time of the transient (s)')
+    parser.add_argument('-j', default = 'full', choices = ['full', 'sparse'], help = 'jacobian evaluation method')
+    args = parser.parse_args()
+
+    slope = {}
+    for parameter in args.p:
+        if not os.path.isdir(args.o): os.makedirs(args.o)
+        f = open(args.o + os.sep + 'scaling-' + parameter + '.dat', 'w')
+        f.write(' ' + parameter.ljust(13) + ''.join([x.ljust(13) for x in columns]) + '\n')
+        curve = []
+        for value in series[parameter]:
+            size = {parameter:value}
+            # axial layers of fuel rods cannot exceed nodes of core channels
+            if parameter == 'layers':
+                size['nodes'] = max(size0['nodes'], value)
+            result = run_case(args.o + os.sep + parameter + '-' + str(value), construct_deck(size, args.t, args.j))
+            if result is None:
+                print(parameter.ljust(8) + str(value).ljust(6) + 'failed')
+                continue
+            print(parameter.ljust(8) + str(value).ljust(6) + ''.join([(x + ' ' + '{0:.4g}'.format(result[x])).ljust(24) for x in ['unknowns', 'rhs(us)', 'wall(s)']]))
+            f.write(' ' + str(value).ljust(13) + ''.join([('{0:12d} ' if isinstance(result.get(x, 0), int) else '{0:12.5e} ').format(result.get(x, 0)) for x in columns]) + '\n')
+            f.flush()
+            curve.append([value] + [result.get(x, 0) for x in columns])
+        f.close()
+
+        # log-log slopes of costs versus the parameter
+        curve = numpy.array(curve, dtype = float)
+        slope[parameter] = {}
+        for j, x in enumerate(columns):
+            if len(curve) > 1 and (curve[:,0] > 0).all() and (curve[:,j+1] > 0).all():
+                slope[parameter][x] = numpy.polyfit(numpy.log(curve[:,0]), numpy.log(curve[:,j+1]), 1)[0]
+            else:
+                slope[parameter][x] = numpy.nan
+
+    f = open(args.o + os.sep + 'scaling-slope.dat', 'w')
+    f.write(' ' + 'parameter'.ljust(13) + ''.join([x.ljust(13) for x in columns]) + '\n')
+    for parameter in slope:
+        f.write(' ' + parameter.ljust(13) + ''.join(['{0:12.5e} '.format(slope[parameter][x]) for x in columns]) + '\n')
+    f.close()
+    print('scaling curves: ' + args.o)
+
+if __name__ == '__main__':
+    main()
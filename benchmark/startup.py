@@ -0,0 +1,100 @@
+#--------------------------------------------------------------------------------------------------
+# STARTUP BENCHMARK: measures in fresh processes the time to import ROOSTER, to construct a model of a
+# synthetic deck and to get the first right-hand side, and lists heavy modules loaded by then. Decks
+# without and with expressions in signal cards are measured. Writes startup.dat.
+#
+# usage (in the ROOSTER folder): python3 -m benchmark.startup [-o folder] [-n repeats] [-j full|sparse]
+#--------------------------------------------------------------------------------------------------
+from benchmark.deck import construct_deck
+
+import argparse
+import json
+import numpy
+import os
+import subprocess
+import sys
+import time
+
+# modules which import takes a large share of the start time
+heavy = ['sympy', 'scipy.integrate', 'scipy.interpolate', 'scipy.optimize', 'scipy.sparse', 'scipy.linalg']
+
+#--------------------------------------------------------------------------------------------------
+# measure the start of the model of the deck in file path: called in a fresh process, prints json of times
+def measure(path):
+
+    tic = time.time()
+    from B_reactor import Reactor
+    result = {'import(s)':time.time() - tic, 'import-modules':[m for m in heavy if m in sys.modules]}
+
+    # the first right-hand side is called during construction by the BDF integrator or the steady-state solver and
+    # otherwise right after it
+    compose_rhs = Reactor.compose_rhs
+    def first_rhs(reactor, *args):
+        rhs = compose_rhs(reactor, *args)
+        if 'first-rhs(s)' not in result:
+            result['first-rhs(s)'] = time.time() - tic
+        return rhs
+    Reactor.compose_rhs = first_rhs
+
+    f = open(path, 'r')
+    deck = f.read()
+    f.close()
+    # the solver prints its progress
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    reactor = Reactor(deck)
+    result['construct(s)'] = time.time() - tic - result['import(s)']
+    reactor.compose_rhs(reactor.t, reactor.get_state())
+    sys.stdout.close()
+    sys.stdout = stdout
+    result['first-rhs-modules'] = [m for m in heavy if m in sys.modules]
+    print(json.dumps(result))
+
+#--------------------------------------------------------------------------------------------------
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Measure the start of ROOSTER in fresh processes.')
+    parser.add_argument('-o', default = 'benchmark-output', help = 'folder for decks and results')
+    parser.add_argument('-n', type = int, default = 5, help = 'number of repeats (medians are reported)')
+    parser.add_argument('-j', default = 'full', choices = ['full', 'sparse'], help = 'jacobian evaluation method')
+    parser.add_argument('-m', help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # child process: measure one deck
+    if args.m is not None:
+        measure(args.m)
+        return
+
+    # decks without and with an expression in signal cards
+    deck = construct_deck({}, jacobian = args.j)
+    cases = {'plain':deck, 'expression':deck.replace('signal    RHO_INS   0.0', 'signal    RHO_INS   -1e-6*TIME')}
+
+    if not os.path.isdir(args.o): os.mkdir(args.o)
+    f = open(args.o + os.sep + 'startup.dat', 'w')
+    f.write(' ' + 'case'.ljust(13) + ''.join([x.ljust(13) for x in ['process(s)', 'import(s)', 'construct(s)', 'first-rhs(s)']]) + 'modules at import | at first rhs\n')
+    for name, text in cases.items():
+        path = os.path.abspath(args.o + os.sep + 'startup-' + name)
+        g = open(path, 'w')
+        g.write(text)
+        g.close()
+        times = []
+        for i in range(args.n):
+            # fresh interpreter every time: nothing is imported yet
+            tic = time.time()
+            out = subprocess.run([sys.executable, '-m', 'benchmark.startup', '-m', path], capture_output = True, text = True)
+            wall = time.time() - tic
+            if out.returncode != 0 or len(out.stdout.split('\n')) < 2:
+                print('****ERROR: startup of case ' + name + ' failed:\n' + out.stdout + out.stderr)
+                sys.exit()
+            result = json.loads(out.stdout.strip().split('\n')[-1])
+            times.append([wall, result['import(s)'], result['construct(s)'], result['first-rhs(s)']])
+        times = numpy.median(numpy.array(times), axis = 0)
+        line = ' ' + name.ljust(13) + ''.join(['{0:12.5e} '.format(x) for x in times])
+        line += ' '.join(result['import-modules']) + ' | ' + ' '.join(result['first-rhs-modules'])
+        f.write(line + '\n')
+        print(line)
+    f.close()
+    print('startup: ' + args.o + os.sep + 'startup.dat')
+
+if __name__ == '__main__':
+    main()